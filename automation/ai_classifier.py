@@ -10,18 +10,40 @@ Usage:
     classifier = AIClassifier(provider="ollama")  # or "openai"
     result = classifier.classify_pr(pr_dict)
     # Returns: {category, priority, summary, confidence}
+
+    # Many issues at once: cached by (title, body, labels) hash, packed several
+    # per prompt where the provider handles it, the rest sent concurrently.
+    results = classifier.classify_issues(issues)
+
+Prompts carry a bounded "project context" block (related wiki passages and
+similar past classifications, see prompt_context.py); AI_CONTEXT=0 disables it.
+Responses are streamed with tight output limits and cut off as soon as the JSON
+answer is usable (JsonStreamParser). Each provider has one pooled Session and a
+circuit breaker whose state is shared across processes (circuit_breaker.py):
+while a provider is down, calls go straight to the rule-based fallback.
 """
 
 from __future__ import annotations
 
+import hashlib
 import json
 import os
 import re
-from dataclasses import dataclass
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
 from enum import Enum
-from typing import Dict, List, Optional
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
 
 import requests
+from requests.adapters import HTTPAdapter
+
+from duplicate_index import DuplicateIndex, jaccard, tokenize
+from circuit_breaker import CircuitBreaker, HealthStore
+from metrics import metrics
+from prompt_context import PromptContextBuilder
 
 
 class Provider(Enum):
@@ -53,6 +75,209 @@ class ClassificationResult:
     reasoning: str
 
 
+FALLBACK_SUMMARY = "Auto-classified (fallback)"
+FAILED_SUMMARY = "Classification failed"
+MIN_BATCH_CONTEXT_TOKENS = 120
+# Output budget per classified item; the JSON answer needs well under this.
+MAX_TOKENS_PER_ITEM = 200
+# A single classification is usable once these are in; the stream stops there.
+REQUIRED_FIELDS = ("category", "priority", "summary")
+# A dead endpoint should fail in seconds; streamed replies may pause longer.
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 30
+# After an early stop from a remote provider, the rest of the stream (bounded
+# by max tokens) is read for up to this long so the pooled
+# TLS connection is reused; a longer tail costs less as a reconnect. Ollama
+# streams are not drained: a local reconnect is free, and dropping the
+# connection makes Ollama stop generating.
+STREAM_DRAIN_SECONDS = 1.0
+
+_registry_lock = threading.Lock()
+_sessions: Dict[Tuple[str, str], Tuple[requests.Session, int]] = {}
+_breakers: Dict[str, CircuitBreaker] = {}
+_health: Optional[HealthStore] = None
+
+
+def provider_health() -> HealthStore:
+    """Provider breaker state shared by every process (collector, daemon, briefing)."""
+    global _health
+    with _registry_lock:
+        if _health is None:
+            default = Path(__file__).resolve().parent / "data" / "ai_provider_health.json"
+            _health = HealthStore(Path(os.getenv("AI_HEALTH_FILE") or default))
+        return _health
+
+
+def provider_session(provider: str, base_url: str, pool_size: int) -> requests.Session:
+    """One pooled Session per (provider, base URL), shared by all classifiers in
+    the process; the pool grows to the largest worker count asked for."""
+    with _registry_lock:
+        session, size = _sessions.get((provider, base_url), (None, 0))
+        if session is None:
+            session = requests.Session()
+        if pool_size > size:
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            size = pool_size
+        _sessions[(provider, base_url)] = (session, size)
+        return session
+
+
+def provider_breaker(provider: str) -> CircuitBreaker:
+    health = provider_health()
+    with _registry_lock:
+        breaker = _breakers.get(provider)
+        if breaker is None:
+            breaker = _breakers[provider] = CircuitBreaker(
+                provider,
+                threshold=int(os.getenv("AI_BREAKER_FAILURES") or 3),
+                cooldown=float(os.getenv("AI_BREAKER_COOLDOWN") or 60),
+                store=health,
+            )
+        return breaker
+
+
+class JsonStreamParser:
+    """Incremental scanner for a JSON object that arrives in chunks.
+
+    Tracks string/escape state and nesting depth across chunks. Each top-level
+    member is decoded as soon as the "," (or closing brace) after it arrives, so
+    a caller can stop the stream once the fields it needs are in. Text before
+    the opening brace (code fences, preambles) is ignored.
+    """
+
+    def __init__(self):
+        self.fields: Dict = {}
+        self.done = False
+        self._text = ""
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._member_start = 0
+
+    def feed(self, chunk: str) -> None:
+        if self.done:
+            return
+        if self._depth == 0:
+            brace = chunk.find("{")
+            if brace < 0:
+                return
+            chunk = chunk[brace:]
+        base = len(self._text)
+        self._text += chunk
+        for i, ch in enumerate(chunk, base):
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+                if self._depth == 1:
+                    self._member_start = i + 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._close_member(i)
+                    self._text = self._text[: i + 1]
+                    self.done = True
+                    return
+            elif ch == "," and self._depth == 1:
+                self._close_member(i)
+                self._member_start = i + 1
+
+    def _close_member(self, end: int) -> None:
+        member = self._text[self._member_start : end].strip()
+        if not member:
+            return
+        try:
+            self.fields.update(json.loads("{" + member + "}"))
+        except ValueError:
+            pass
+
+    def has(self, names: Sequence[str]) -> bool:
+        return all(name in self.fields for name in names)
+
+    def result(self) -> str:
+        """The JSON text: the whole object when it closed, else the complete
+        members received (the stream was cut short) re-serialized."""
+        if self.done:
+            return self._text
+        if self._depth == 1 and not self._in_string:
+            self._close_member(len(self._text))  # e.g. cut by the token limit
+        return json.dumps(self.fields) if self.fields else self._text
+
+
+class ClassificationCache:
+    """Persistent classification results keyed by a (title, body, labels) content hash.
+
+    Entries also keep the title/labels so callers can reuse past classifications.
+    Only real LLM answers are cached; fallback results are retried next run.
+    """
+
+    def __init__(self, path: Path):
+        self._path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = {}
+        self._dirty = False
+        if path.exists():
+            try:
+                self._entries = json.loads(path.read_text(encoding="utf-8"))
+            except Exception:
+                self._entries = {}
+
+    @staticmethod
+    def key(title: str, body: str, labels: Sequence[str]) -> str:
+        payload = json.dumps([title, body, sorted(labels)], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[ClassificationResult]:
+        with self._lock:
+            entry = self._entries.get(key)
+        if not entry:
+            return None
+        try:
+            return ClassificationResult(
+                category=Category(entry["category"]),
+                priority=Priority(entry["priority"]),
+                summary=entry.get("summary", ""),
+                confidence=float(entry.get("confidence", 0.8)),
+                reasoning=entry.get("reasoning", ""),
+            )
+        except Exception:
+            return None
+
+    def put(self, key: str, result: ClassificationResult, *, title: str, labels: Sequence[str]) -> None:
+        if result.summary in (FALLBACK_SUMMARY, FAILED_SUMMARY):
+            return
+        entry = asdict(result)
+        entry.update(category=result.category.value, priority=result.priority.value)
+        entry.update(title=title, labels=list(labels))
+        with self._lock:
+            self._entries[key] = entry
+            self._dirty = True
+
+    def entries(self) -> Dict[str, Dict]:
+        with self._lock:
+            return dict(self._entries)
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = json.dumps(self._entries, ensure_ascii=False)
+            self._dirty = False
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self._path.with_suffix(self._path.suffix + ".tmp")
+        tmp.write_text(payload, encoding="utf-8")
+        tmp.replace(self._path)
+
+
 class AIClassifier:
     """AI-powered classifier for PRs and Issues."""
 
@@ -62,12 +287,26 @@ class AIClassifier:
         model: Optional[str] = None,
         api_key: Optional[str] = None,
         base_url: Optional[str] = None,
+        cache_path: Optional[Path] = None,
+        max_workers: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        context_builder: Optional[PromptContextBuilder] = None,
     ):
         self.provider = Provider(provider)
         self.model = model or self._default_model()
         self.api_key = api_key or os.getenv(f"{provider.upper()}_API_KEY")
         self.base_url = base_url or self._default_base_url()
 
+        default_cache = Path(__file__).resolve().parent / "data" / "classification_cache.json"
+        self.cache = ClassificationCache(cache_path or Path(os.getenv("AI_CACHE_FILE") or default_cache))
+        self.max_workers = max(1, int(max_workers or os.getenv("AI_MAX_WORKERS") or 4))
+        self.batch_size = max(1, int(batch_size or os.getenv("AI_BATCH_SIZE") or self._default_batch_size()))
+        self._session = provider_session(self.provider.value, self.base_url, self.max_workers)
+        self.breaker = provider_breaker(self.provider.value)
+        self.use_context = context_builder is not None or os.getenv("AI_CONTEXT", "1") != "0"
+        self._context_builder = context_builder
+        self._context_lock = threading.Lock()
+
     def _default_model(self) -> str:
         if self.provider == Provider.OLLAMA:
             return "llama3.2:3b"  # Fast, lightweight
@@ -77,6 +316,13 @@ class AIClassifier:
             return "claude-3-haiku-20240307"
         return "llama3.2:3b"
 
+    def _default_batch_size(self) -> int:
+        # Hosted models follow a multi-item JSON schema reliably; the small local
+        # default does not, so Ollama gets one issue per prompt (sent concurrently).
+        if self.provider in (Provider.OPENAI, Provider.ANTHROPIC):
+            return 10
+        return 1
+
     def _default_base_url(self) -> str:
         if self.provider == Provider.OLLAMA:
             return "http://localhost:11434"
@@ -88,6 +334,19 @@ class AIClassifier:
 
 
 
+    @staticmethod
+    def _issue_fields(issue: Dict) -> Tuple[str, str, List[str]]:
+        """(title, body, labels) from a Forgejo issue dict or an IssueRecord-like object."""
+        if isinstance(issue, dict):
+            title = issue.get("title", "") or ""
+            body = issue.get("body", "") or ""
+            labels = [lb.get("name", "") for lb in (issue.get("labels") or [])]
+        else:
+            title = getattr(issue, "title", "") or ""
+            body = getattr(issue, "body", "") or ""
+            labels = list(getattr(issue, "labels", ()) or ())
+        return str(title), str(body), [str(lb) for lb in labels]
+
     def classify_issue(self, issue: Dict) -> ClassificationResult:
         """Classify an issue.
 
@@ -97,51 +356,141 @@ class AIClassifier:
         Returns:
             ClassificationResult with category, priority, summary, confidence
         """
-        title = issue.get("title", "")
-        body = issue.get("body", "")
-        labels = [lb.get("name", "") for lb in (issue.get("labels") or [])]
+        return self.classify_issues([issue])[0]
 
+    def classify_issues(self, issues: Sequence[Dict]) -> List[ClassificationResult]:
+        """Classify many issues; results are returned in input order.
+
+        Issues whose (title, body, labels) hash is cached are not sent again.
+        The rest are packed `batch_size` per prompt and the prompts run on a
+        pool of `max_workers` threads. The cache is saved once at the end.
+        """
+        fields = [self._issue_fields(it) for it in issues]
+        keys = [ClassificationCache.key(*f) for f in fields]
+
+        results: Dict[str, ClassificationResult] = {}
+        pending: Dict[str, Tuple[str, str, List[str]]] = {}
+        for key, f in zip(keys, fields):
+            if key in results or key in pending:
+                continue
+            cached = self.cache.get(key)
+            if cached:
+                results[key] = cached
+            else:
+                pending[key] = f
+        metrics.inc("classification_cache_lookups_total", len(results), result="hit")
+        metrics.inc("classification_cache_lookups_total", len(pending), result="miss")
+
+        items = list(pending.items())
+        chunks = [items[i : i + self.batch_size] for i in range(0, len(items), self.batch_size)]
+        if chunks:
+            workers = min(self.max_workers, len(chunks))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="classify") as pool:
+                for chunk_results in pool.map(self._classify_chunk, chunks):
+                    results.update(chunk_results)
+
+            for key, (title, _, labels) in items:
+                self.cache.put(key, results[key], title=title, labels=labels)
+            self.cache.save()
+            if self._context_builder is not None:
+                self._context_builder.save()
+
+        return [results[k] for k in keys]
+
+    def _classify_one(self, title: str, body: str, labels: List[str]) -> ClassificationResult:
         prompt = self._build_classification_prompt(
             title=title,
             description=body,
             labels=labels,
             item_type="issue",
+            context=self._context_for(title, body, labels),
         )
 
         response = self._call_llm(prompt)
         return self._parse_classification_response(response)
 
+    def _classify_chunk(
+        self, chunk: List[Tuple[str, Tuple[str, str, List[str]]]]
+    ) -> Dict[str, ClassificationResult]:
+        if len(chunk) == 1:
+            key, f = chunk[0]
+            return {key: self._classify_one(*f)}
+
+        prompt = self._build_batch_classification_prompt([f for _, f in chunk])
+        response = self._try_llm(prompt, len(chunk))
+        if response is None:
+            # Provider down or breaker open: retrying item by item would only
+            # repeat the failure, so every item gets the rule-based answer.
+            return {key: self._fallback_result(*f) for key, f in chunk}
+        parsed = self._parse_batch_response(response, len(chunk))
+
+        out: Dict[str, ClassificationResult] = {}
+        for i, (key, f) in enumerate(chunk):
+            # Items the model skipped or mangled get an individual request.
+            out[key] = parsed.get(i) or self._classify_one(*f)
+        return out
+
+    def _fallback_result(self, title: str, body: str, labels: List[str]) -> ClassificationResult:
+        text = f"{title}\n{body}\n{' '.join(labels)}"
+        return self._parse_classification_response(self._fallback_classification(text))
+
     def detect_duplicates(
-        self, item: Dict, existing: List[Dict], threshold: float = 0.8
-    ) -> Optional[int]:
+        self,
+        item: Dict,
+        existing: Optional[List[Dict]] = None,
+        threshold: float = 0.8,
+        index: Optional[DuplicateIndex] = None,
+        item_id: Optional[str] = None,
+    ) -> Optional[Union[int, str]]:
         """Detect if item is duplicate of existing items.
 
         Args:
             item: New PR/Issue dict
-            existing: List of existing PR/Issue dicts
+            existing: List of existing PR/Issue dicts (scanned once)
             threshold: Similarity threshold (0-1)
+            index: Prebuilt DuplicateIndex (e.g. from `sync_from_store`, whose ids
+                are `owner/repo#number`); used instead of `existing` so repeated
+                calls do not re-tokenize the corpus
+            item_id: The item's own id in `index`, so it does not match itself
 
         Returns:
-            ID of duplicate item if found, else None
+            Issue number of the duplicate for `existing` scans and numeric index
+            ids, the index id (`owner/repo#number`) otherwise; None if no match
         """
-        if not existing:
+        title = item.get("title", "") or ""
+        body = item.get("body", "") or ""
+
+        if index is None:
+            if not existing:
+                return None
+            # One-off scan: tokenize the candidate once, each existing item once.
+            tokens = tokenize(f"{title} {body}")
+            for ex in existing:
+                ex_tokens = tokenize(f"{ex.get('title', '')} {ex.get('body', '')}")
+                if jaccard(tokens, ex_tokens) >= threshold:
+                    return ex.get("number")
             return None
 
-        title = item.get("title", "")
-        body = item.get("body", "")
-
-        for ex in existing:
-            ex_title = ex.get("title", "")
-            ex_body = ex.get("body", "")
-
-            similarity = self._calculate_similarity(
-                title, body, ex_title, ex_body
-            )
+        matches = index.query(title, body, threshold, exclude=item_id)
+        if not matches:
+            return None
+        best = matches[0][0]
+        return int(best) if best.isdigit() else best
 
-            if similarity >= threshold:
-                return ex.get("number")
+    def _context(self) -> Optional[PromptContextBuilder]:
+        """The retrieval context builder, created on first use (None when disabled)."""
+        if not self.use_context:
+            return None
+        with self._context_lock:
+            if self._context_builder is None:
+                self._context_builder = PromptContextBuilder.open(self.cache.entries)
+        return self._context_builder
 
-        return None
+    def _context_for(self, title: str, body: str, labels: List[str], budget: Optional[int] = None) -> str:
+        builder = self._context()
+        if builder is None:
+            return ""
+        return builder.build(ClassificationCache.key(title, body, labels), title, body, labels, budget=budget)
 
     def _build_classification_prompt(
         self,
@@ -149,17 +498,19 @@ class AIClassifier:
         description: str,
         labels: List[str],
         item_type: str,
+        context: str = "",
     ) -> str:
+        context_block = f"Project context (for reference, may be partly irrelevant):\n{context}\n\n" if context else ""
         return f"""Analyze this {item_type} and classify it.
 
 Title: {title}
 
 Description:
-{description[:500]}  # Truncate long descriptions
+{description[:500]}
 
 Labels: {', '.join(labels) if labels else 'none'}
 
-Classify into:
+{context_block}Classify into:
 1. Category: Feature, Bug, Enhancement, Maintenance, Documentation
 2. Priority: P0 (critical/urgent), P1 (high impact), P2 (normal)
 3. Summary: One-line summary (max 100 chars)
@@ -174,45 +525,213 @@ Respond in JSON format:
 {{
   "category": "Bug|Feature|Enhancement|Maintenance|Documentation",
   "priority": "P0|P1|P2",
-  "summary": "one-line summary",
   "confidence": 0.0-1.0,
+  "summary": "one-line summary",
   "reasoning": "brief explanation"
 }}"""
 
-    def _call_llm(self, prompt: str) -> str:
-        """Call LLM API and return response text."""
+    def _build_batch_classification_prompt(self, items: List[Tuple[str, str, List[str]]]) -> str:
+        # The context budget is shared by the batch so the prompt stays bounded.
+        builder = self._context()
+        budget = max(MIN_BATCH_CONTEXT_TOKENS, builder.budget // len(items)) if builder else None
+        blocks = []
+        for i, (title, description, labels) in enumerate(items):
+            context = self._context_for(title, description, labels, budget=budget)
+            blocks.append(
+                f"""### Item {i}
+Title: {title}
+Description:
+{description[:500]}
+Labels: {', '.join(labels) if labels else 'none'}"""
+                + (f"\nContext:\n{context}" if context else "")
+            )
+        joined = "\n\n".join(blocks)
+
+        return f"""Analyze these {len(items)} issues and classify each one independently.
+
+{joined}
+
+Classify each into:
+1. Category: Feature, Bug, Enhancement, Maintenance, Documentation
+2. Priority: P0 (critical/urgent), P1 (high impact), P2 (normal)
+3. Summary: One-line summary (max 100 chars)
+
+Consider:
+- Keywords like "fix", "bug", "crash" → Bug
+- Keywords like "urgent", "critical", "production" → P0
+- Keywords like "feature", "add", "new" → Feature
+- Keywords like "improve", "refactor", "optimize" → Enhancement
+
+Respond in JSON format, one entry per item, using the item number as "id":
+{{
+  "results": [
+    {{
+      "id": 0,
+      "category": "Bug|Feature|Enhancement|Maintenance|Documentation",
+      "priority": "P0|P1|P2",
+      "confidence": 0.0-1.0,
+      "summary": "one-line summary",
+      "reasoning": "brief explanation"
+    }}
+  ]
+}}"""
+
+    def _parse_batch_response(self, response: str, count: int) -> Dict[int, ClassificationResult]:
+        """Map item index -> result; missing or invalid entries are left out."""
+        try:
+            data = json.loads(response)
+        except Exception:
+            return {}
+        if not isinstance(data, dict) or not isinstance(data.get("results"), list):
+            return {}
+
+        out: Dict[int, ClassificationResult] = {}
+        for entry in data["results"]:
+            try:
+                idx = int(entry["id"])
+            except Exception:
+                continue
+            if not 0 <= idx < count:
+                continue
+            result = self._parse_classification_response(json.dumps(entry))
+            if result.summary != FAILED_SUMMARY:
+                out[idx] = result
+        return out
+
+    def _call_llm(self, prompt: str, items: int = 1) -> str:
+        """Call LLM API and return response text (the rule-based fallback when
+        the provider is unavailable or its circuit breaker is open).
+
+        Responses are streamed; a single-item prompt is cut off once the
+        required fields are in, a batch once its JSON object closes.
+        """
+        response = self._try_llm(prompt, items)
+        return self._fallback_classification(prompt) if response is None else response
+
+    def _try_llm(self, prompt: str, items: int = 1) -> Optional[str]:
+        """Like `_call_llm`, but None instead of the fallback when no answer came."""
+        metrics.inc("llm_prompt_chars_total", len(prompt), provider=self.provider.value)
         if self.provider == Provider.OLLAMA:
-            return self._call_ollama(prompt)
+            call = self._call_ollama
         elif self.provider == Provider.OPENAI:
-            return self._call_openai(prompt)
+            call = self._call_openai
         elif self.provider == Provider.ANTHROPIC:
-            return self._call_anthropic(prompt)
-        raise ValueError(f"Unsupported provider: {self.provider}")
+            call = self._call_anthropic
+        else:
+            raise ValueError(f"Unsupported provider: {self.provider}")
+
+        if self.provider != Provider.OLLAMA and not self.api_key:
+            return None
+        # While the provider is failing, skip straight to the rule-based answer
+        # instead of waiting out a timeout per issue.
+        if not self.breaker.allow():
+            return None
+        try:
+            with metrics.timer("llm_call_seconds", provider=self.provider.value):
+                response = call(prompt, items)
+        except Exception as e:
+            self.breaker.record_failure(e)
+            return None
+        self.breaker.record_success()
+        return response
+
+    def _post(self, url: str, **kwargs) -> requests.Response:
+        """POST on the shared provider session, with request/latency/byte metrics.
 
-    def _call_ollama(self, prompt: str) -> str:
+        For `stream=True` the latency is time to response headers and bytes are
+        counted by `_read_stream` instead.
+        """
+        provider = self.provider.value
+        start = time.perf_counter()
+        try:
+            resp = self._session.post(url, **kwargs)
+        except Exception:
+            metrics.inc("http_requests_total", client=provider, status="error")
+            raise
+        metrics.observe("http_request_seconds", time.perf_counter() - start, client=provider)
+        metrics.inc("http_requests_total", client=provider, status=str(resp.status_code))
+        if not kwargs.get("stream"):
+            metrics.inc("http_response_bytes_total", len(resp.content), client=provider)
+        return resp
+
+    @staticmethod
+    def _max_tokens(items: int) -> int:
+        """Output token cap for a prompt with `items` issues.
+
+        No stop sequences: a "}" inside a string value (a reason quoting code)
+        would cut the object short. `_read_stream` stops at the real closing
+        brace instead.
+        """
+        return MAX_TOKENS_PER_ITEM * items
+
+    def _read_stream(self, deltas: Iterator[str], started: float, items: int, prefix: str = "") -> str:
+        """Feed streamed text into a JsonStreamParser and stop as early as possible."""
+        provider = self.provider.value
+        parser = JsonStreamParser()
+        parser.feed(prefix)
+        chars = 0
+        for delta in deltas:
+            if not delta:
+                continue
+            if not chars:
+                metrics.observe("llm_ttft_seconds", time.perf_counter() - started, provider=provider)
+            chars += len(delta)
+            parser.feed(delta)
+            if parser.done or (items == 1 and parser.has(REQUIRED_FIELDS)):
+                if not parser.done:
+                    metrics.inc("llm_stream_early_stops_total", provider=provider)
+                if self.provider != Provider.OLLAMA:
+                    chars += self._drain(deltas)
+                break
+        metrics.inc("http_response_bytes_total", chars, client=provider)
+        return parser.result()
+
+    def _drain(self, deltas: Iterator[str]) -> int:
+        """Read what is left of a stream whose answer is complete, so closing the
+        response returns the connection to the pool instead of dropping it.
+
+        Gives up (and the connection is dropped) once STREAM_DRAIN_SECONDS
+        have passed; returns the characters read.
+        """
+        deadline = time.perf_counter() + STREAM_DRAIN_SECONDS
+        chars = 0
+        for delta in deltas:
+            chars += len(delta)
+            if time.perf_counter() > deadline:
+                metrics.inc("llm_stream_drain_aborts_total", provider=self.provider.value)
+                break
+        return chars
+
+    @staticmethod
+    def _iter_sse(resp: requests.Response) -> Iterator[Dict]:
+        """JSON payloads of a server-sent event stream (`data: {...}` lines)."""
+        for raw in resp.iter_lines():
+            line = raw.decode("utf-8")
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data != "[DONE]":  # read on to the end of the body so the connection is reusable
+                yield json.loads(data)
+
+    def _call_ollama(self, prompt: str, items: int = 1) -> str:
         """Call Ollama local API."""
         url = f"{self.base_url}/api/generate"
         payload = {
             "model": self.model,
             "prompt": prompt,
-            "stream": False,
+            "stream": True,
             "format": "json",
+            "options": {"num_predict": self._max_tokens(items)},
         }
 
-        try:
-            resp = requests.post(url, json=payload, timeout=30)
+        started = time.perf_counter()
+        with self._post(url, json=payload, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), stream=True) as resp:
             resp.raise_for_status()
-            data = resp.json()
-            return data.get("response", "")
-        except Exception as e:
-            # Fallback: simple rule-based classification
-            return self._fallback_classification(prompt)
+            deltas = (json.loads(line).get("response", "") for line in resp.iter_lines() if line)
+            return self._read_stream(deltas, started, items)
 
-    def _call_openai(self, prompt: str) -> str:
+    def _call_openai(self, prompt: str, items: int = 1) -> str:
         """Call OpenAI API."""
-        if not self.api_key:
-            return self._fallback_classification(prompt)
-
         url = f"{self.base_url}/chat/completions"
         headers = {
             "Authorization": f"Bearer {self.api_key}",
@@ -222,21 +741,22 @@ Respond in JSON format:
             "model": self.model,
             "messages": [{"role": "user", "content": prompt}],
             "response_format": {"type": "json_object"},
+            "max_tokens": self._max_tokens(items),
+            "stream": True,
         }
 
-        try:
-            resp = requests.post(url, headers=headers, json=payload, timeout=30)
+        started = time.perf_counter()
+        with self._post(url, headers=headers, json=payload, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), stream=True) as resp:
             resp.raise_for_status()
-            data = resp.json()
-            return data["choices"][0]["message"]["content"]
-        except Exception:
-            return self._fallback_classification(prompt)
+            deltas = (
+                (event["choices"][0].get("delta") or {}).get("content") or ""
+                for event in self._iter_sse(resp)
+                if event.get("choices")
+            )
+            return self._read_stream(deltas, started, items)
 
-    def _call_anthropic(self, prompt: str) -> str:
+    def _call_anthropic(self, prompt: str, items: int = 1) -> str:
         """Call Anthropic API."""
-        if not self.api_key:
-            return self._fallback_classification(prompt)
-
         url = f"{self.base_url}/messages"
         headers = {
             "x-api-key": self.api_key,
@@ -245,20 +765,25 @@ Respond in JSON format:
         }
         payload = {
             "model": self.model,
-            "max_tokens": 1024,
-            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": self._max_tokens(items),
+            # Prefilling "{" skips any preamble: the reply is the JSON itself.
+            "messages": [{"role": "user", "content": prompt}, {"role": "assistant", "content": "{"}],
+            "stream": True,
         }
 
-        try:
-            resp = requests.post(url, headers=headers, json=payload, timeout=30)
+        started = time.perf_counter()
+        with self._post(url, headers=headers, json=payload, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), stream=True) as resp:
             resp.raise_for_status()
-            data = resp.json()
-            return data["content"][0]["text"]
-        except Exception:
-            return self._fallback_classification(prompt)
+            deltas = (
+                event["delta"].get("text", "")
+                for event in self._iter_sse(resp)
+                if event.get("type") == "content_block_delta"
+            )
+            return self._read_stream(deltas, started, items, prefix="{")
 
     def _fallback_classification(self, prompt: str) -> str:
         """Rule-based fallback when LLM unavailable."""
+        metrics.inc("llm_fallbacks_total", provider=self.provider.value)
         text = prompt.lower()
 
         # Detect category
@@ -284,7 +809,7 @@ Respond in JSON format:
         return json.dumps({
             "category": category,
             "priority": priority,
-            "summary": "Auto-classified (fallback)",
+            "summary": FALLBACK_SUMMARY,
             "confidence": 0.6,
             "reasoning": "Rule-based classification (LLM unavailable)",
         })
@@ -305,7 +830,7 @@ Respond in JSON format:
             return ClassificationResult(
                 category=Category.MAINTENANCE,
                 priority=Priority.P2,
-                summary="Classification failed",
+                summary=FAILED_SUMMARY,
                 confidence=0.5,
                 reasoning="Failed to parse LLM response",
             )
@@ -315,7 +840,8 @@ Respond in JSON format:
     ) -> float:
         """Calculate similarity between two items (simple approach).
 
-        For production, consider using sentence-transformers embeddings.
+        For bulk lookups use DuplicateIndex (MinHash/LSH) instead of calling this
+        pairwise; for semantic matches use EmbeddingIndex (embedding_index.py).
         """
         # Simple token overlap similarity
         def tokenize(text: str) -> set:
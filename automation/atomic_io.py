@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""Atomic, diff-aware text writes for generated markdown
+
+Generated files (snapshot, BACKLOG.md, CRM backlog, ...) live inside the Obsidian
+vault, where every mtime bump triggers reindexing in Obsidian and sync tools, and
+a daemon killed mid-`write_text` leaves a torn file. This module:
+
+- skips the write when the new content hashes the same as the file on disk
+  (optionally ignoring volatile lines such as a "Generated:" timestamp);
+- writes real changes to a temp file in the same directory, fsyncs it, then
+  `os.replace`s it over the target (and fsyncs the directory);
+- reports per-section change counts: for every H2 section, how many `####`
+  blocks (issues) were added, removed or modified.
+
+Usage:
+    result = write_text_if_changed(path, new_text, previous=old_text)
+    if result.changed:
+        print(f"{result.total_changes} issues changed", result.sections)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from markdown_sections import MarkdownDocument
+
+
+@dataclass
+class WriteResult:
+    path: Path
+    changed: bool
+    sections: Dict[str, int] = field(default_factory=dict)  # header -> changed blocks
+
+    @property
+    def total_changes(self) -> int:
+        return sum(self.sections.values())
+
+
+def _current_umask() -> int:
+    # os.umask can only be read by setting it; do it once, at import, before
+    # worker threads exist that could create files in the meantime.
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+# mkstemp creates 0600 files; new targets get what open() would have given them.
+_NEW_FILE_MODE = 0o666 & ~_current_umask()
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def atomic_write_text(path: Path, content: str, *, encoding: str = "utf-8") -> None:
+    """Write via temp file + fsync + rename so readers never see a partial file."""
+    atomic_write_bytes(path, content.encode(encoding))
+
+
+def atomic_write_bytes(path: Path, data: bytes) -> None:
+    """Binary variant of `atomic_write_text` (compressed indexes, stores)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        mode = path.stat().st_mode & 0o777
+    except FileNotFoundError:
+        mode = _NEW_FILE_MODE
+
+    fd, tmp_name = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_name, mode)
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+
+    try:
+        dir_fd = os.open(str(path.parent), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
+def _block_key(block: List[str]) -> str:
+    """Identify a `####` block by its issue link if any, else by its heading."""
+    for line in block:
+        if "**Link:**" in line:
+            return line.split("**Link:**", 1)[1].strip()
+    heading = block[0].lstrip("#").strip()
+    # Drop CRM-style running numbers ("12. [tag] - title") so renumbering is not a change.
+    num, dot, rest = heading.partition(". ")
+    return rest if dot and num.isdigit() else heading
+
+
+def _blocks(body: str) -> Dict[str, str]:
+    out: Dict[str, str] = {}
+    current: List[str] = []
+
+    def flush() -> None:
+        if current:
+            key = _block_key(current)
+            text = "\n".join(current[1:]).strip()
+            out[key] = f"{key}\n{text}"
+
+    for line in body.splitlines():
+        if line.startswith("#### "):
+            flush()
+            current = [line]
+        elif current:
+            current.append(line)
+    flush()
+    return out
+
+
+def section_changes(old: str, new: str) -> Dict[str, int]:
+    """Changed `####` blocks per H2 section; sections changed outside blocks count 1."""
+    old_doc = MarkdownDocument.parse(old)
+    new_doc = MarkdownDocument.parse(new)
+
+    out: Dict[str, int] = {}
+    headers = list(dict.fromkeys(old_doc.headers + new_doc.headers))
+    for header in headers:
+        old_body = old_doc.body(header) or ""
+        new_body = new_doc.body(header) or ""
+        if old_body == new_body and old_doc.has(header) == new_doc.has(header):
+            continue
+
+        old_blocks = _blocks(old_body)
+        new_blocks = _blocks(new_body)
+        changed = sum(1 for k in new_blocks if old_blocks.get(k) != new_blocks[k])
+        changed += sum(1 for k in old_blocks if k not in new_blocks)
+        out[header] = changed or 1
+    return out
+
+
+def write_text_if_changed(
+    path: Path,
+    content: str,
+    *,
+    previous: Optional[str] = None,
+    normalize: Optional[Callable[[str], str]] = None,
+    encoding: str = "utf-8",
+) -> WriteResult:
+    """Atomically write `content` unless it matches what is on disk.
+
+    previous: current file text if the caller already read it (avoids a re-read).
+    normalize: applied to both sides before hashing, to ignore volatile lines.
+    """
+    if previous is None:
+        try:
+            previous = path.read_text(encoding=encoding)
+        except FileNotFoundError:
+            previous = None
+
+    if previous is not None:
+        norm = normalize or (lambda t: t)
+        if _digest(norm(previous)) == _digest(norm(content)):
+            return WriteResult(path=path, changed=False)
+
+    atomic_write_text(path, content, encoding=encoding)
+    return WriteResult(path=path, changed=True, sections=section_changes(previous or "", content))
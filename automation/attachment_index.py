@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""Attachment Index & Deduplication
+
+Content-addressed index of the vault's binary attachments (images, PDFs, ...),
+which make up most of the wiki's size:
+- every attachment is hashed (SHA-256) on a thread pool; a persistent cache
+  (default: data/attachment_index.json) maps path -> (mtime, size, hash), so a
+  re-scan only hashes new or changed files;
+- exact duplicates are files with the same hash;
+- perceptual near-duplicates (re-saved, resized or re-compressed screenshots)
+  are found with a 64-bit difference hash when Pillow is installed
+  (`--perceptual`); hashes within `--distance` bits are grouped, with 8-bit
+  bands as buckets so only candidates are compared;
+- orphans are attachments no markdown, canvas or base file links to, taken from
+  the link graph (link_graph.py), which resolves embeds the way Obsidian does;
+- `dedupe --apply` rewrites every reference to a duplicate so it points at one
+  canonical copy (the most-linked one, then the shortest path); `--delete` also
+  removes the copies that are no longer referenced.
+
+Usage:
+    python attachment_index.py scan [--perceptual]
+    python attachment_index.py duplicates
+    python attachment_index.py similar --distance 4
+    python attachment_index.py orphans
+    python attachment_index.py dedupe              # dry run: show the plan
+    python attachment_index.py dedupe --apply --delete
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from atomic_io import atomic_write_text
+from link_graph import LinkGraph
+
+try:
+    from PIL import Image
+except ImportError:  # perceptual hashing is optional
+    Image = None
+
+IMAGE_EXTS = {".png", ".jpg", ".jpeg", ".gif", ".webp", ".bmp", ".tiff"}
+READ_CHUNK = 1024 * 1024
+DHASH_BANDS = 8  # 8 bands x 8 bits: any pair within 7 bits shares a band
+
+
+def sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(READ_CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def dhash(path: Path) -> Optional[int]:
+    """64-bit difference hash of an image, or None if it cannot be decoded."""
+    if Image is None:
+        return None
+    try:
+        with Image.open(path) as im:
+            im.draft("L", (64, 64))  # JPEG: decode at reduced size
+            px = list(im.convert("L").resize((9, 8)).getdata())
+    except Exception:
+        return None
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (px[row * 9 + col] < px[row * 9 + col + 1])
+    return bits
+
+
+class AttachmentIndex:
+    """path -> content hash (and optional dHash) for every vault attachment."""
+
+    VERSION = 1
+
+    def __init__(self, graph: LinkGraph, path: Path, *, workers: Optional[int] = None):
+        self.graph = graph
+        self.path = path
+        self.workers = workers or int(os.getenv("ATTACHMENT_WORKERS") or 0) or None
+        # rel path -> [mtime_ns, size, sha256, dhash or None]
+        self._files: Dict[str, List] = {}
+        if path.exists():
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+            except ValueError:
+                data = {}
+            if data.get("version") == self.VERSION and data.get("root") == str(graph.root):
+                self._files = data.get("files", {})
+
+    def save(self) -> None:
+        payload = {"version": self.VERSION, "root": str(self.graph.root), "files": self._files}
+        atomic_write_text(self.path, json.dumps(payload, separators=(",", ":")))
+
+    # ------------------------------------------------------------------
+    # Scanning
+    # ------------------------------------------------------------------
+
+    def _hash_one(self, rel: str, st: os.stat_result, perceptual: bool) -> Tuple[str, List]:
+        path = self.graph.root / rel
+        phash = dhash(path) if perceptual and path.suffix.lower() in IMAGE_EXTS else None
+        return rel, [st.st_mtime_ns, st.st_size, sha256_file(path), phash]
+
+    def update(self, perceptual: bool = False) -> Dict[str, int]:
+        """Hash new/changed attachments (and missing dHashes when `perceptual`)."""
+        if perceptual and Image is None:
+            print("⚠️  Pillow not installed: perceptual duplicates disabled (pip install pillow)")
+            perceptual = False
+
+        current = set(self.graph.attachments())
+        removed = [rel for rel in self._files if rel not in current]
+        for rel in removed:
+            del self._files[rel]
+
+        todo = []
+        for rel in current:
+            try:
+                st = (self.graph.root / rel).stat()
+            except OSError:
+                continue
+            entry = self._files.get(rel)
+            if entry and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+                needs_phash = perceptual and entry[3] is None and Path(rel).suffix.lower() in IMAGE_EXTS
+                if not needs_phash:
+                    continue
+            todo.append((rel, st))
+
+        errors = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = [pool.submit(self._hash_one, rel, st, perceptual) for rel, st in todo]
+            for future in futures:
+                try:
+                    rel, entry = future.result()
+                except OSError:
+                    errors += 1
+                    continue
+                self._files[rel] = entry
+        return {"hashed": len(todo) - errors, "removed": len(removed), "errors": errors, "files": len(self._files)}
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def size(self, rel: str) -> int:
+        return self._files[rel][1]
+
+    def canonical(self, group: List[str]) -> str:
+        """The copy to keep: most referenced, then shortest path, then name."""
+        return min(group, key=lambda rel: (-len(self.graph.backlinks(rel)), rel.count("/"), len(rel), rel))
+
+    def duplicates(self) -> List[List[str]]:
+        """Groups of byte-identical files, canonical copy first."""
+        by_hash: Dict[str, List[str]] = defaultdict(list)
+        for rel, entry in self._files.items():
+            by_hash[entry[2]].append(rel)
+        groups = []
+        for members in by_hash.values():
+            if len(members) > 1:
+                keep = self.canonical(members)
+                groups.append([keep] + sorted(m for m in members if m != keep))
+        return sorted(groups, key=lambda g: -self.size(g[0]) * (len(g) - 1))
+
+    def similar(self, max_distance: int = 4) -> List[List[str]]:
+        """Groups of visually near-identical images with different bytes."""
+        # One representative per exact hash: exact copies are `duplicates()`.
+        reps: Dict[str, Tuple[str, int]] = {}
+        for rel, entry in sorted(self._files.items()):
+            if entry[3] is not None and entry[2] not in reps:
+                reps[entry[2]] = (rel, entry[3])
+        items = list(reps.values())
+
+        buckets: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+        for i, (_, h) in enumerate(items):
+            for band in range(DHASH_BANDS):
+                buckets[(band, (h >> (band * 8)) & 0xFF)].append(i)
+
+        parent = list(range(len(items)))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for members in buckets.values():
+            for a_pos, a in enumerate(members):
+                for b in members[a_pos + 1 :]:
+                    if find(a) != find(b) and bin(items[a][1] ^ items[b][1]).count("1") <= max_distance:
+                        parent[find(a)] = find(b)
+
+        groups: Dict[int, List[str]] = defaultdict(list)
+        for i, (rel, _) in enumerate(items):
+            groups[find(i)].append(rel)
+        return [sorted(g) for g in groups.values() if len(g) > 1]
+
+    def orphans(self) -> List[str]:
+        return sorted(rel for rel in self._files if not self.graph.backlinks(rel))
+
+    # ------------------------------------------------------------------
+    # Deduplication
+    # ------------------------------------------------------------------
+
+    def dedupe(self, *, apply: bool = False, delete: bool = False) -> Dict[str, int]:
+        """Point references to duplicates at the canonical copy.
+
+        Without `apply` nothing is written; the returned counts are the plan.
+        """
+        mapping = {dup: group[0] for group in self.duplicates() for dup in group[1:]}
+        stats = {
+            "duplicates": len(mapping),
+            "references": sum(len(self.graph.backlinks(dup)) for dup in mapping),
+            "rewritten": 0,
+            "deleted": 0,
+            "bytes_freed": 0,
+        }
+        if not apply:
+            stats["bytes_freed"] = sum(self.size(dup) for dup in mapping)
+            return stats
+
+        stats["rewritten"] = len(self.graph.retarget(mapping))
+        if delete:
+            gone = []
+            for dup in mapping:
+                if self.graph.backlinks(dup):
+                    continue  # a reference we could not rewrite; keep the file
+                size = self.size(dup)
+                (self.graph.root / dup).unlink()
+                gone.append(self.graph.root / dup)
+                del self._files[dup]
+                stats["deleted"] += 1
+                stats["bytes_freed"] += size
+            if gone:
+                self.graph.update(gone)
+        return stats
+
+
+def _mb(n: int) -> str:
+    return f"{n / (1024 * 1024):.1f} MB"
+
+
+def main() -> None:
+    script_dir = Path(__file__).resolve().parent
+    parser = argparse.ArgumentParser(description="Vault attachment index and deduplication")
+    parser.add_argument("command", choices=["scan", "duplicates", "similar", "orphans", "dedupe"])
+    parser.add_argument("--root", default=os.getenv("WIKI_ROOT") or str(script_dir.parent))
+    parser.add_argument("--index", default=str(script_dir / "data" / "attachment_index.json"))
+    parser.add_argument("--graph", default=str(script_dir / "data" / "link_graph.json"))
+    parser.add_argument("--perceptual", action="store_true", help="Also compute image dHashes (needs Pillow)")
+    parser.add_argument("--distance", type=int, default=4, help="Max differing dHash bits for `similar`")
+    parser.add_argument("--apply", action="store_true", help="dedupe: rewrite references")
+    parser.add_argument("--delete", action="store_true", help="dedupe --apply: delete unreferenced copies")
+    args = parser.parse_args()
+
+    graph = LinkGraph.load(Path(args.graph), Path(args.root))
+    graph.update()
+    index = AttachmentIndex(graph, Path(args.index))
+    counts = index.update(perceptual=args.perceptual or args.command == "similar")
+
+    try:
+        if args.command == "scan":
+            total = sum(index.size(rel) for rel in index._files)
+            print(f"✅ {counts['files']} attachments ({_mb(total)}): {counts['hashed']} hashed, {counts['removed']} removed")
+            if counts["errors"]:
+                print(f"⚠️  {counts['errors']} files could not be read")
+
+        elif args.command == "duplicates":
+            groups = index.duplicates()
+            wasted = sum(index.size(g[0]) * (len(g) - 1) for g in groups)
+            for group in groups:
+                print(f"\n{_mb(index.size(group[0]))} x {len(group)}")
+                for rel in group:
+                    print(f"  {'★' if rel == group[0] else ' '} {rel}  ({len(graph.backlinks(rel))} refs)")
+            print(f"\n🗂️  {len(groups)} duplicate groups, {_mb(wasted)} redundant")
+
+        elif args.command == "similar":
+            groups = index.similar(args.distance)
+            for group in groups:
+                print("\n" + "\n".join(f"  {rel}" for rel in group))
+            print(f"\n🖼️  {len(groups)} groups of near-identical images")
+
+        elif args.command == "orphans":
+            orphans = index.orphans()
+            for rel in orphans:
+                print(rel)
+            print(f"\n🧹 {len(orphans)} unreferenced attachments ({_mb(sum(index.size(r) for r in orphans))})")
+
+        else:
+            stats = index.dedupe(apply=args.apply, delete=args.delete and args.apply)
+            if not args.apply:
+                print(
+                    f"📝 Plan: {stats['duplicates']} duplicate files, {stats['references']} references to rewrite, "
+                    f"{_mb(stats['bytes_freed'])} reclaimable (run with --apply [--delete])"
+                )
+            else:
+                print(f"✅ Rewrote {stats['rewritten']} files; deleted {stats['deleted']} copies ({_mb(stats['bytes_freed'])})")
+    finally:
+        graph.save()
+        index.save()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""Benchmark Suite for the automation scripts
+
+Times the hot paths against synthetic corpora so regressions can be compared
+across commits:
+
+- ForgejoClient.iter_issues          (against a local stub Forgejo HTTP server)
+- BacklogUpdater.update_backlog      (SQLite store with N issues)
+- CrmIssueBacklogUpdater.sync        (same store + a CRM backlog file)
+- MarkdownOptimizer.process_directory (generated wiki tree, fresh copy per run;
+  optimizer_warm re-runs it over the unchanged tree with the manifest populated)
+- DailyBriefingGenerator.generate    (generated wiki root)
+
+For every target it records wall time (min/median over --repeat runs), peak
+traced memory (tracemalloc), net allocated blocks and GC collections. Results go
+to data/benchmarks/<timestamp>-<commit>.json; pass --compare to diff against a
+previous result file.
+
+Usage:
+    python benchmark.py
+    python benchmark.py --issues 5000 --wiki-files 2000 --repeat 5
+    python benchmark.py --only crm_sync,backlog_update --compare data/benchmarks/prev.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+_WORDS = (
+    "crm tms booking quotation customer partner invoice export import report "
+    "lỗi sửa thêm cập nhật khách hàng đơn hàng báo giá hợp đồng kho vận "
+    "fix add update refactor optimize timeout sync email template pricing"
+).split()
+
+
+# -----------------------------------------------------------------------------
+# Synthetic data
+# -----------------------------------------------------------------------------
+
+
+def _ts(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def make_issue(repo: str, number: int, now: datetime, rng: random.Random) -> Dict:
+    """A Forgejo-shaped issue, including the bulky objects the API really returns."""
+    updated = now - timedelta(minutes=number * 7)
+    closed = number % 3 == 0
+    user = {"id": number % 17, "login": f"user{number % 17}", "full_name": "Dev", "avatar_url": "https://x/a.png"}
+    body = "\n".join(" ".join(rng.choices(_WORDS, k=12)) for _ in range(rng.randint(2, 12)))
+    return {
+        "id": 100000 + number,
+        "number": number,
+        "title": " ".join(rng.choices(_WORDS, k=6)),
+        "body": body + "\n![screenshot](https://x/attachments/img.png)",
+        "state": "closed" if closed else "open",
+        "html_url": f"https://forgejo.local/owner/{repo}/issues/{number}",
+        "created_at": _ts(updated - timedelta(days=3)),
+        "updated_at": _ts(updated),
+        "closed_at": _ts(updated) if closed else None,
+        "user": user,
+        "labels": [{"id": 1, "name": rng.choice(["bug", "feature", "enhancement"]), "color": "ff0000"}],
+        "assignees": [user],
+        "milestone": {"id": 1, "title": "Sprint", "description": "x" * 200},
+        "repository": {"id": 1, "name": repo, "owner": "owner", "full_name": f"owner/{repo}"},
+        "pull_request": None,
+    }
+
+
+def make_corpus(repos: List[str], per_repo: int, seed: int = 7) -> Dict[str, List[Dict]]:
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    return {repo: [make_issue(repo, n, now, rng) for n in range(1, per_repo + 1)] for repo in repos}
+
+
+def make_wiki_tree(root: Path, files: int, seed: int = 11) -> None:
+    """Markdown files spread over a few folders; ~1/3 already carry frontmatter."""
+    rng = random.Random(seed)
+    folders = ["work", "notes", "projects", "setup", "rulebooks"]
+    for i in range(files):
+        folder = root / folders[i % len(folders)]
+        folder.mkdir(parents=True, exist_ok=True)
+        links = " ".join(f"[n{j}](note-{j}.md)" for j in rng.sample(range(files), k=min(3, files)))
+        text = f"# Note {i}\n\n" + "\n\n".join(" ".join(rng.choices(_WORDS, k=40)) for _ in range(8))
+        text += f"\n\n## Related\n{links}\n- [ ] task {i}\n"
+        if i % 3 == 0:
+            text = f"---\ntitle: \"Note {i}\"\ntype: note\n---\n{text}"
+        (folder / f"note-{i}.md").write_text(text, encoding="utf-8")
+
+
+# -----------------------------------------------------------------------------
+# Stub Forgejo server
+# -----------------------------------------------------------------------------
+
+
+class StubForgejo:
+    """Serves /api/v1/repos/{owner}/{repo}/issues from an in-memory corpus.
+
+    Supports state, since, limit, page and ETag/If-None-Match like the real API.
+    """
+
+    def __init__(self, corpus: Dict[str, List[Dict]]):
+        self.corpus = corpus
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args) -> None:
+                return
+
+            def do_GET(self) -> None:
+                stub.requests += 1
+                parts = urlsplit(self.path)
+                q = {k: v[0] for k, v in parse_qs(parts.query).items()}
+                segments = parts.path.strip("/").split("/")
+                items = stub.corpus.get(segments[4] if len(segments) > 4 else "", [])
+
+                if q.get("state") in ("open", "closed"):
+                    items = [it for it in items if it["state"] == q["state"]]
+                if q.get("since"):
+                    items = [it for it in items if it["updated_at"] >= q["since"]]
+
+                limit = int(q.get("limit", 30))
+                page = int(q.get("page", 1))
+                body = json.dumps(items[(page - 1) * limit : page * limit]).encode("utf-8")
+                etag = f'"{hash(body) & 0xFFFFFFFF:x}"'
+
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def __enter__(self) -> "StubForgejo":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+# -----------------------------------------------------------------------------
+# Measurement
+# -----------------------------------------------------------------------------
+
+
+def measure(fn: Callable[[], object], *, repeat: int, setup: Optional[Callable[[], None]] = None) -> Dict:
+    walls: List[float] = []
+    peak = 0
+    blocks: List[int] = []
+    collections: List[int] = []
+
+    for _ in range(repeat):
+        if setup:
+            setup()
+        gc.collect()
+        gc_before = sum(s["collections"] for s in gc.get_stats())
+        blocks_before = sys.getallocatedblocks()
+        tracemalloc.start()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn()
+        walls.append(time.perf_counter() - start)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        blocks.append(sys.getallocatedblocks() - blocks_before)
+        collections.append(sum(s["collections"] for s in gc.get_stats()) - gc_before)
+
+    # Wall times are measured with tracemalloc on, so compare runs of this
+    # harness with each other rather than with untraced timings.
+    return {
+        "wall_min_s": round(min(walls), 6),
+        "wall_median_s": round(statistics.median(walls), 6),
+        "peak_mem_bytes": peak,
+        "net_alloc_blocks": int(statistics.median(blocks)),
+        "gc_collections": int(statistics.median(collections)),
+        "runs": repeat,
+    }
+
+
+# -----------------------------------------------------------------------------
+# Targets
+# -----------------------------------------------------------------------------
+
+
+def bench_collector(args: argparse.Namespace, work: Path, results: Dict) -> None:
+    import forgejo_issue_collector as fic
+
+    repos = [f"repo{i}" for i in range(args.repos)]
+    corpus = make_corpus(repos, args.issues)
+
+    with StubForgejo(corpus) as stub:
+        if _wanted(args, "iter_issues"):
+
+            def fetch() -> None:
+                client = fic.ForgejoClient(stub.url, "token", concurrency=args.repos)
+                for repo in repos:
+                    for _ in client.iter_issues("owner", repo, "all"):
+                        pass
+                client.close()
+
+            before = stub.requests
+            results["iter_issues"] = measure(fetch, repeat=args.repeat)
+            results["iter_issues"]["http_requests"] = (stub.requests - before) // args.repeat
+
+        store_path = work / "store.sqlite3"
+        store = fic.IssueStore(store_path)
+        client = fic.ForgejoClient(stub.url, "token")
+        for repo in repos:
+            store.upsert("owner", repo, client.iter_issues("owner", repo, "all"))
+        client.close()
+
+    cfg = fic.CollectorConfig(
+        base_url="http://unused",
+        token="token",
+        owner="owner",
+        repos=repos,
+        state="all",
+        days_back=None,
+        output_file=work / "snapshot.md",
+        personal_backlog_file=work / "BACKLOG.md",
+        crm_backlog_file=work / "CRM_BACKLOG.md",
+        data_dir=work,
+    )
+
+    try:
+        if _wanted(args, "backlog_update"):
+            seed = "# Backlog\n\n## Current focus\n- [ ] ship\n\n## Automation\n- cron\n"
+
+            def reset_backlog() -> None:
+                cfg.personal_backlog_file.write_text(seed, encoding="utf-8")
+
+            results["backlog_update"] = measure(
+                lambda: fic.BacklogUpdater.update_backlog(cfg, store, None),
+                repeat=args.repeat,
+                setup=reset_backlog,
+            )
+
+        if _wanted(args, "crm_sync"):
+            crm_seed = "# OF1 CRM\n\n## Issues\n\n## Releases\n- v1\n"
+            updater = fic.CrmIssueBacklogUpdater(cfg.crm_backlog_file, fic.CrmIssueBacklogRenderer())
+
+            def reset_crm() -> None:
+                cfg.crm_backlog_file.write_text(crm_seed, encoding="utf-8")
+
+            results["crm_sync"] = measure(lambda: updater.sync(cfg, store), repeat=args.repeat, setup=reset_crm)
+    finally:
+        store.close()
+
+
+def bench_optimizer(args: argparse.Namespace, work: Path, results: Dict) -> None:
+    if not _wanted(args, "optimizer"):
+        return
+    from markdown_optimizer import MarkdownOptimizer
+
+    pristine = work / "wiki-pristine"
+    make_wiki_tree(pristine, args.wiki_files)
+    live = work / "wiki"
+
+    manifest = work / "optimizer_manifest.json"
+    graph = work / "link_graph.json"
+
+    def reset() -> None:
+        shutil.rmtree(live, ignore_errors=True)
+        shutil.copytree(pristine, live)
+        manifest.unlink(missing_ok=True)
+        graph.unlink(missing_ok=True)
+
+    def run() -> None:
+        MarkdownOptimizer(live, manifest_path=manifest, link_graph_path=graph).process_directory(live, recursive=True)
+
+    results["optimizer"] = measure(run, repeat=args.repeat, setup=reset)
+    # Second pass over an unchanged tree: everything is answered by the manifest.
+    results["optimizer_warm"] = measure(run, repeat=args.repeat)
+
+
+def bench_briefing(args: argparse.Namespace, work: Path, results: Dict) -> None:
+    if not _wanted(args, "briefing"):
+        return
+    from daily_briefing_generator import DailyBriefingGenerator
+
+    root = work / "briefing-root"
+    (root / "automation" / "data").mkdir(parents=True, exist_ok=True)
+    inbox = root / "notes" / "00_inbox"
+    inbox.mkdir(parents=True, exist_ok=True)
+    for i in range(args.wiki_files // 10):
+        (inbox / f"idea-{i}.md").write_text(f"# Idea {i}\n", encoding="utf-8")
+
+    summary = ["# Forgejo Issues Snapshot", ""] + [f"- #{i} **issue {i}** — open" for i in range(args.issues)]
+    (root / "automation" / "data" / "team_issues_summary.md").write_text("\n".join(summary), encoding="utf-8")
+    focus = "\n".join(f"- [ ] priority {i}" for i in range(50))
+    filler = "\n".join(f"#### #{i} item\n- **Status:** open\n" for i in range(args.issues))
+    (root / "BACKLOG.md").write_text(f"# Backlog\n\n## Current focus\n{focus}\n\n## BACKLOG - Issues\n\n{filler}\n")
+
+    generator = DailyBriefingGenerator(root)
+    out = work / "briefing.md"
+    results["briefing"] = measure(lambda: generator.generate(out), repeat=args.repeat)
+
+
+# -----------------------------------------------------------------------------
+# CLI
+# -----------------------------------------------------------------------------
+
+TARGETS = ["iter_issues", "backlog_update", "crm_sync", "optimizer", "briefing"]
+
+
+def _wanted(args: argparse.Namespace, name: str) -> bool:
+    return not args.only or name in args.only
+
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=SCRIPT_DIR, capture_output=True, text=True, timeout=10
+        )
+        return out.stdout.strip() or "unknown"
+    except Exception:
+        return "unknown"
+
+
+def _print_comparison(current: Dict, previous: Dict) -> None:
+    print()
+    print(f"📊 vs {previous.get('commit', '?')} ({previous.get('generated', '?')})")
+    for name, res in current["results"].items():
+        old = previous.get("results", {}).get(name)
+        if not old:
+            continue
+        for metric in ("wall_median_s", "peak_mem_bytes"):
+            a, b = old.get(metric) or 0, res.get(metric) or 0
+            delta = ((b - a) / a * 100) if a else 0.0
+            print(f"   {name:15s} {metric:15s} {a:>14} → {b:>14}  ({delta:+.1f}%)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the automation scripts on synthetic data")
+    parser.add_argument("--issues", type=int, default=2000, help="Issues per repo")
+    parser.add_argument("--repos", type=int, default=3)
+    parser.add_argument("--wiki-files", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", type=lambda v: [x.strip() for x in v.split(",") if x.strip()], default=[],
+                        help=f"Comma-separated subset of: {', '.join(TARGETS)}")
+    parser.add_argument("--output", default=None, help="Result JSON path (default: data/benchmarks/...)")
+    parser.add_argument("--compare", default=None, help="Previous result JSON to diff against")
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(SCRIPT_DIR))
+
+    results: Dict[str, Dict] = {}
+    with tempfile.TemporaryDirectory(prefix="wiki-bench-") as tmp:
+        work = Path(tmp)
+        print("⏱️  Running benchmarks...")
+        bench_collector(args, work, results)
+        bench_optimizer(args, work, results)
+        bench_briefing(args, work, results)
+
+    commit = _git_commit()
+    report = {
+        "generated": datetime.now().astimezone().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {"issues": args.issues, "repos": args.repos, "wiki_files": args.wiki_files, "repeat": args.repeat},
+        "results": results,
+    }
+
+    for name, res in results.items():
+        print(f"   {name:15s} {res['wall_median_s'] * 1000:10.1f} ms   peak {res['peak_mem_bytes'] / 1e6:8.1f} MB")
+
+    if args.output:
+        out = Path(args.output)
+    else:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        out = SCRIPT_DIR / "data" / "benchmarks" / f"{stamp}-{commit}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    print(f"✅ Results: {out}")
+
+    if args.compare:
+        _print_comparison(report, json.loads(Path(args.compare).read_text(encoding="utf-8")))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""Circuit Breaker with Cross-process Health State
+
+Stops callers from waiting on a dependency that is down (the AI providers:
+a stopped Ollama costs a full request timeout per issue):
+- closed: calls go through; `threshold` consecutive failures trip the breaker;
+- open: calls are refused at once (the caller uses its fallback) until
+  `cooldown` seconds have passed;
+- half-open: one probe call is let through; success closes the breaker,
+  failure re-opens it for another cooldown.
+
+State transitions are written to a small JSON file (HealthStore) that every
+process using the same dependency reads, so when the collector run trips the
+breaker the daemon's classifier stops calling too, and the other way round. The
+file is re-read only when its mtime changes and is written atomically on
+transitions only. Last writer wins; the worst race costs one extra probe.
+
+Usage:
+    store = HealthStore(Path("data/ai_provider_health.json"))
+    breaker = CircuitBreaker("ollama", threshold=3, cooldown=60, store=store)
+    if breaker.allow():
+        try:
+            call()
+        except Exception as e:
+            breaker.record_failure(e)
+        else:
+            breaker.record_success()
+
+    python circuit_breaker.py data/ai_provider_health.json            # show
+    python circuit_breaker.py data/ai_provider_health.json --reset ollama
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+from atomic_io import atomic_write_text
+from metrics import metrics
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class HealthStore:
+    """name -> breaker state, in a JSON file shared between processes."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime: Optional[int] = None
+        self._data: Dict[str, Dict] = {}
+
+    def _refresh(self) -> None:
+        try:
+            mtime = self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            self._mtime, self._data = None, {}
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            self._data = json.loads(self.path.read_text(encoding="utf-8"))
+        except ValueError:
+            self._data = {}  # torn or hand-edited; the next transition rewrites it
+        self._mtime = mtime
+
+    def get(self, name: str) -> Optional[Dict]:
+        with self._lock:
+            self._refresh()
+            entry = self._data.get(name)
+            return dict(entry) if entry else None
+
+    def all(self) -> Dict[str, Dict]:
+        with self._lock:
+            self._refresh()
+            return {name: dict(entry) for name, entry in self._data.items()}
+
+    def put(self, name: str, entry: Dict) -> None:
+        with self._lock:
+            self._refresh()
+            self._data[name] = entry
+            atomic_write_text(self.path, json.dumps(self._data, indent=2, sort_keys=True))
+            self._mtime = self.path.stat().st_mtime_ns
+
+
+class CircuitBreaker:
+    """Thread-safe closed/open/half-open breaker, optionally shared via a HealthStore."""
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        threshold: int = 3,
+        cooldown: float = 60.0,
+        store: Optional[HealthStore] = None,
+    ):
+        self.name = name
+        self.threshold = max(1, threshold)
+        self.cooldown = cooldown
+        self.store = store
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._updated_at = 0.0
+        self._probing = False
+        metrics.gauge_fn("circuit_breaker_open", lambda: float(self.state != CLOSED), breaker=name)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._sync()
+            return self._state
+
+    def _sync(self) -> None:
+        """Adopt a newer transition published by another process."""
+        if self.store is None:
+            return
+        entry = self.store.get(self.name)
+        if not entry or entry.get("updated_at", 0) <= self._updated_at:
+            return
+        self._state = entry.get("state", CLOSED)
+        self._opened_at = entry.get("opened_at", 0.0)
+        self._updated_at = entry["updated_at"]
+        self._failures = 0
+        self._probing = False
+
+    def _transition(self, state: str, error: str = "") -> None:
+        self._state = state
+        self._updated_at = time.time()
+        if state == OPEN:
+            self._opened_at = self._updated_at
+            metrics.inc("circuit_breaker_trips_total", breaker=self.name)
+        if self.store is not None:
+            self.store.put(
+                self.name,
+                {"state": state, "opened_at": self._opened_at, "updated_at": self._updated_at, "last_error": error[:300]},
+            )
+
+    def allow(self) -> bool:
+        """True if a call may go out now (closed, or the half-open probe)."""
+        with self._lock:
+            self._sync()
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and time.time() - self._opened_at >= self.cooldown:
+                self._state = HALF_OPEN  # local until the probe reports back
+                self._probing = False
+            if self._state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            metrics.inc("circuit_breaker_rejections_total", breaker=self.name)
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._probing = False
+            self._failures = 0
+            if self._state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_failure(self, error: object = "") -> None:
+        with self._lock:
+            self._probing = False
+            self._failures += 1
+            if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self.threshold):
+                self._transition(OPEN, f"{type(error).__name__}: {error}" if isinstance(error, BaseException) else str(error))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Show or reset shared circuit breaker state")
+    parser.add_argument("path", help="Health file, e.g. data/ai_provider_health.json")
+    parser.add_argument("--reset", metavar="NAME", help="Close the named breaker")
+    args = parser.parse_args()
+
+    store = HealthStore(Path(args.path))
+    if args.reset:
+        store.put(args.reset, {"state": CLOSED, "opened_at": 0.0, "updated_at": time.time(), "last_error": ""})
+        print(f"✅ {args.reset}: closed")
+        return
+    entries = store.all()
+    if not entries:
+        print("✅ No breaker has tripped")
+    for name, entry in sorted(entries.items()):
+        icon = "✅" if entry.get("state") == CLOSED else "⛔"
+        since = datetime.fromtimestamp(entry.get("updated_at", 0)).strftime("%Y-%m-%d %H:%M:%S")
+        error = f" — {entry['last_error']}" if entry.get("last_error") else ""
+        print(f"{icon} {name}: {entry.get('state')} since {since}{error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,10 +5,16 @@ Background service chạy automation tasks và gửi kết quả qua Telegram.
 
 Features:
 - Chạy như daemon (background service)
-- Schedule tasks: daily briefing, PR/Issue sync
-- Gửi notifications qua Telegram
-- Health monitoring
-- Graceful shutdown
+- Schedule tasks: daily briefing, PR/Issue sync (cron-style, see scheduler.py)
+- Gửi notifications qua Telegram (outbox async: retry, rate limit, digest,
+  lưu ra disk khi offline; xem telegram_notifier.py)
+- Health monitoring: metrics (Prometheus endpoint + data/metrics.jsonl,
+  xem metrics.py)
+- Jobs chạy song song (JobExecutor): timeout riêng, giới hạn concurrency,
+  blocking I/O chạy trong thread pool
+- Issue collector chạy in-process, dùng lại Forgejo client (connection pool,
+  HTTP cache) và AI classifier giữa các lần chạy
+- Graceful shutdown (SIGTERM huỷ các job đang chạy)
 
 Usage:
     python daemon.py start    # Start daemon
@@ -25,15 +31,20 @@ import logging
 import os
 import signal
 import sys
-from datetime import datetime, time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import partial
 from pathlib import Path
-from typing import Optional
-
-import requests
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
 
 # Import automation modules
-from ai_classifier import AIClassifier
+from ai_classifier import AIClassifier, provider_health
 from daily_briefing_generator import DailyBriefingGenerator
+from forgejo_issue_collector import App as CollectorApp
+from forgejo_issue_collector import CollectorConfig, CollectorResult, ConfigBuilder, ForgejoClient
+from metrics import MetricsFileWriter, MetricsServer, metrics
+from scheduler import Job, Scheduler
+from telegram_notifier import FileIdCache, TelegramNotifier, TelegramOutbox
 
 # Setup logging
 logging.basicConfig(
@@ -47,48 +58,160 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-class TelegramNotifier:
-    """Send notifications via Telegram bot."""
-
-    def __init__(self, bot_token: str, chat_id: str):
-        self.bot_token = bot_token
-        self.chat_id = chat_id
-        self.base_url = f"https://api.telegram.org/bot{bot_token}"
-
-    def send_message(self, text: str, parse_mode: str = "Markdown") -> bool:
-        """Send text message to Telegram."""
+class JobExecutor:
+    """Runs scheduled jobs as asyncio tasks so one slow job never blocks the others.
+
+    - `submit` returns immediately; the job runs in its own task.
+    - At most `max_concurrency` capped jobs run at once; uncapped jobs (heartbeat)
+      bypass the limit.
+    - Jobs sharing a `group` are serialized (e.g. collectors writing the same files).
+    - Each run may have a timeout; on expiry the task is cancelled and any
+      blocking call it made is asked to stop and waited for before its group
+      lock is released.
+    - Blocking calls go through `run_blocking` (thread pool) so the loop stays free.
+    - `shutdown` cancels everything still running (SIGTERM).
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 2,
+        max_threads: int = 4,
+        *,
+        on_timeout: Optional[Callable[[str, float], Awaitable[None]]] = None,
+    ):
+        self._on_timeout = on_timeout
+        self._slots = asyncio.Semaphore(max(1, max_concurrency))
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_threads), thread_name_prefix="daemon-job")
+        self._groups: Dict[str, asyncio.Lock] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._waiting = 0
+        self._closing = False
+        metrics.gauge_fn("daemon_jobs_running", lambda: self.running - self._waiting)
+        metrics.gauge_fn("daemon_jobs_waiting", lambda: self._waiting)
+
+    @property
+    def running(self) -> int:
+        return len(self._tasks)
+
+    async def run_blocking(
+        self,
+        func: Callable[..., Any],
+        *args: Any,
+        on_cancel: Optional[Callable[[], None]] = None,
+        **kwargs: Any,
+    ) -> Any:
+        """Run a blocking callable in the worker pool.
+
+        Threads cannot be interrupted: when the job is cancelled (timeout or
+        shutdown), `on_cancel` asks `func` to stop and the job keeps waiting for
+        the thread to return, so its group lock is not released while the call
+        is still writing files.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._pool, partial(func, *args, **kwargs))
         try:
-            url = f"{self.base_url}/sendMessage"
-            payload = {
-                "chat_id": self.chat_id,
-                "text": text,
-                "parse_mode": parse_mode,
-            }
-            response = requests.post(url, json=payload, timeout=10)
-            response.raise_for_status()
-            logger.info("Telegram message sent successfully")
-            return True
-        except Exception as e:
-            logger.error(f"Failed to send Telegram message: {e}")
-            return False
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if on_cancel is not None:
+                on_cancel()
+            name = getattr(func, "__qualname__", func)
+            if not future.done():
+                logger.info(f"Waiting for {name} to stop")
+                await asyncio.wait([future])
+            if not future.cancelled() and future.exception() is not None:
+                logger.info(f"{name} stopped: {future.exception()}")
+            raise
+
+    def submit(
+        self,
+        name: str,
+        job: Callable[[], Awaitable[None]],
+        *,
+        timeout: Optional[float] = None,
+        group: Optional[str] = None,
+        capped: bool = True,
+    ) -> Optional[asyncio.Task]:
+        if self._closing:
+            logger.warning(f"Executor shutting down, not starting {name}")
+            return None
+        task = asyncio.create_task(self._run(name, job, timeout, group, capped), name=f"job:{name}")
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _run(
+        self,
+        name: str,
+        job: Callable[[], Awaitable[None]],
+        timeout: Optional[float],
+        group: Optional[str],
+        capped: bool,
+    ) -> None:
+        lock = self._groups.setdefault(group, asyncio.Lock()) if group else None
+        if lock is not None and lock.locked():
+            logger.info(f"Job {name} waiting for {group} job to finish")
+
+        self._waiting += 1
+        waiting = True
+        try:
+            async with _maybe(lock), _maybe(self._slots if capped else None):
+                self._waiting -= 1
+                waiting = False
+                await self._run_started(name, job, timeout)
+        finally:
+            if waiting:
+                self._waiting -= 1
 
-    def send_document(self, file_path: Path, caption: str = "") -> bool:
-        """Send document to Telegram."""
+    async def _run_started(self, name: str, job: Callable[[], Awaitable[None]], timeout: Optional[float]) -> None:
+        started = asyncio.get_running_loop().time()
+        outcome = "ok"
+        logger.info(f"Job {name} started")
         try:
-            url = f"{self.base_url}/sendDocument"
-            with open(file_path, 'rb') as f:
-                files = {'document': f}
-                data = {
-                    'chat_id': self.chat_id,
-                    'caption': caption,
-                }
-                response = requests.post(url, files=files, data=data, timeout=30)
-                response.raise_for_status()
-            logger.info(f"Telegram document sent: {file_path.name}")
-            return True
-        except Exception as e:
-            logger.error(f"Failed to send Telegram document: {e}")
-            return False
+            await asyncio.wait_for(job(), timeout=timeout)
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            logger.error(f"Job {name} timed out after {timeout:.0f}s")
+            if self._on_timeout is not None:
+                await self._on_timeout(name, timeout)
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            logger.warning(f"Job {name} cancelled")
+            raise
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            elapsed = asyncio.get_running_loop().time() - started
+            metrics.observe("daemon_job_seconds", elapsed, job=name)
+            metrics.inc("daemon_jobs_total", job=name, outcome=outcome)
+            logger.info(f"Job {name} finished in {elapsed:.1f}s")
+
+    async def shutdown(self, grace: float = 10.0) -> None:
+        """Cancel running jobs, wait up to `grace` seconds for cleanup, stop the pool."""
+        self._closing = True
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            logger.info(f"Cancelling {len(tasks)} running job(s)...")
+            await asyncio.wait(tasks, timeout=grace)
+        # Threads cannot be interrupted; don't wait for blocking calls still in flight.
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class _maybe:
+    """`async with` over an optional lock/semaphore."""
+
+    def __init__(self, lock: Optional[Any]):
+        self._lock = lock
+
+    async def __aenter__(self) -> None:
+        if self._lock is not None:
+            await self._lock.acquire()
+
+    async def __aexit__(self, *exc: Any) -> None:
+        if self._lock is not None:
+            self._lock.release()
 
 
 class WikiAutomationDaemon:
@@ -105,7 +228,11 @@ class WikiAutomationDaemon:
         self.data_dir.mkdir(exist_ok=True)
         
         self.pid_file = self.data_dir / "daemon.pid"
+        self.schedule_state_file = self.data_dir / "scheduler_state.json"
         self.running = False
+        self._stop_event: Optional[asyncio.Event] = None
+        self.executor: Optional[JobExecutor] = None
+        self.max_concurrent_jobs = int(os.getenv("DAEMON_MAX_CONCURRENT_JOBS", "2"))
 
         # Load config
         self._load_env()
@@ -114,16 +241,37 @@ class WikiAutomationDaemon:
         self.telegram = TelegramNotifier(
             bot_token=os.getenv("TELEGRAM_BOT_TOKEN"),
             chat_id=os.getenv("TELEGRAM_CHAT_ID"),
+            file_ids=FileIdCache(self.data_dir / "telegram_file_ids.json"),
+            compress_over=int(os.getenv("TELEGRAM_COMPRESS_OVER_KB", "512")) * 1024,
         )
+        self.outbox: Optional[TelegramOutbox] = None
         self.briefing_gen = DailyBriefingGenerator(self.wiki_root)
 
-        # Schedule config
-        self.schedules = {
-            "daily_briefing": time(7, 0),      # 7:00 AM
-            "issue_collector_morning": time(8, 0),    # 8:00 AM
-            "issue_collector_noon": time(11, 0),      # 11:00 AM
-            "issue_collector_afternoon": time(16, 0), # 4:00 PM
-        }
+        # Long-lived collector dependencies, created on first use
+        self._forgejo_client: Optional[ForgejoClient] = None
+        self._forgejo_client_key: Optional[tuple] = None
+        self._collector_classifier: Optional[AIClassifier] = None
+
+        # Schedule config (cron: minute hour day month weekday, local time)
+        self.schedules = [
+            Job("daily_briefing", cron="0 7 * * *", grace=timedelta(hours=4), timeout=900),  # 7:00 AM
+            *(
+                Job(name, cron=cron, grace=timedelta(hours=3), timeout=1800, group="issue_collector")
+                for name, cron in (
+                    ("issue_collector_morning", "0 8 * * *"),     # 8:00 AM
+                    ("issue_collector_noon", "0 11 * * *"),       # 11:00 AM
+                    ("issue_collector_afternoon", "0 16 * * *"),  # 4:00 PM
+                )
+            ),
+            Job("heartbeat", interval=timedelta(minutes=5), misfire="skip", timeout=60),
+        ]
+        self._jobs = {job.name: job for job in self.schedules}
+
+    def _build_scheduler(self) -> Scheduler:
+        scheduler = Scheduler(self.schedule_state_file, dispatch=self._dispatch)
+        for job in self.schedules:
+            scheduler.add(job)
+        return scheduler
 
     def _load_env(self):
         """Load environment variables from .env."""
@@ -179,13 +327,23 @@ class WikiAutomationDaemon:
 
     def status(self):
         """Check daemon status."""
-        if self.is_running():
+        running = self.is_running()
+        if running:
             pid = self._read_pid()
             print(f"✅ Daemon is running (PID: {pid})")
-            return True
         else:
             print("❌ Daemon is not running")
-            return False
+
+        scheduler = self._build_scheduler()
+        for name, due in scheduler.next_runs():
+            last = scheduler.last_run(name)
+            last_str = last.strftime("%Y-%m-%d %H:%M") if last else "never"
+            print(f"   • {name}: next {due:%Y-%m-%d %H:%M} (last {last_str})")
+
+        for provider, health in sorted(provider_health().all().items()):
+            if health.get("state") != "closed":
+                print(f"   ⛔ AI provider {provider}: circuit {health['state']} ({health.get('last_error') or 'no error recorded'})")
+        return running
 
     def is_running(self) -> bool:
         """Check if daemon is running."""
@@ -201,110 +359,173 @@ class WikiAutomationDaemon:
             return False
 
     async def _main_loop(self):
-        """Main event loop."""
+        """Main event loop: sleep until the next scheduled job is due."""
         logger.info("Entering main loop...")
-        last_run = {}
-
-        while self.running:
-            now = datetime.now()
-            current_time = now.time()
-
-            # Check each scheduled task
-            for task_name, scheduled_time in self.schedules.items():
-                # Check if it's time to run
-                if self._should_run(current_time, scheduled_time, last_run.get(task_name)):
-                    logger.info(f"Running scheduled task: {task_name}")
-                    await self._run_task(task_name)
-                    last_run[task_name] = now
-
-            # Heartbeat check (every 5 minutes)
-            last_heartbeat = last_run.get("heartbeat")
-            if not last_heartbeat or (now - last_heartbeat).total_seconds() >= 300:
-                await self._run_heartbeat()
-                last_run["heartbeat"] = now
-
-            # Sleep for 30 seconds before next check
-            await asyncio.sleep(30)
+        self._stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, self._request_stop)
+
+        if not self.running:
+            return
+        self.executor = JobExecutor(max_concurrency=self.max_concurrent_jobs, on_timeout=self._on_job_timeout)
+        self.outbox = TelegramOutbox(
+            self.telegram,
+            self.data_dir / "telegram_outbox.json",
+            per_chat_per_minute=float(os.getenv("TELEGRAM_PER_CHAT_PER_MINUTE", "20")),
+            digest_interval=float(os.getenv("TELEGRAM_DIGEST_INTERVAL", "3600")),
+            max_retries=int(os.getenv("TELEGRAM_MAX_RETRIES", "8")),
+        )
+        await self.outbox.start()
+        metrics.gauge_fn("telegram_outbox_pending", lambda: self.outbox.pending)
 
-    def _should_run(self, current: time, scheduled: time, last_run: Optional[datetime]) -> bool:
-        """Check if task should run now."""
-        # Within 1 minute of scheduled time
-        current_minutes = current.hour * 60 + current.minute
-        scheduled_minutes = scheduled.hour * 60 + scheduled.minute
+        metrics_server = self._start_metrics_server()
+        metrics_writer = MetricsFileWriter(
+            Path(os.getenv("METRICS_FILE") or self.data_dir / "metrics.jsonl"),
+            interval=float(os.getenv("METRICS_INTERVAL", "60")),
+        )
+        writer_task = asyncio.create_task(metrics_writer.run(self._stop_event), name="metrics-writer")
+        try:
+            await self._build_scheduler().run(self._stop_event)
+        finally:
+            await self.executor.shutdown()
+            await self.outbox.close()
+            self._stop_event.set()
+            await writer_task
+            if metrics_server is not None:
+                metrics_server.stop()
+            if self._forgejo_client is not None:
+                self._forgejo_client.close()
+
+    def _start_metrics_server(self) -> Optional[MetricsServer]:
+        """Local Prometheus endpoint on METRICS_PORT (0 disables)."""
+        port = int(os.getenv("METRICS_PORT", "9464"))
+        if not port:
+            return None
+        try:
+            return MetricsServer(port).start()
+        except OSError as e:
+            logger.warning(f"Metrics endpoint disabled (port {port}): {e}")
+            return None
+
+    async def _dispatch(self, task_name: str):
+        """Hand a due job to the executor without waiting for it to finish."""
+        job = self._jobs[task_name]
+        self.executor.submit(
+            task_name,
+            partial(self._run_task, task_name),
+            timeout=job.timeout,
+            group=job.group,
+            capped=task_name != "heartbeat",
+        )
 
-        if abs(current_minutes - scheduled_minutes) > 1:
-            return False
+    async def _on_job_timeout(self, task_name: str, timeout: float):
+        await self._notify(f"⏱️ *Task Timed Out: {task_name}*\n\nCancelled after {timeout:.0f}s", priority="high")
 
-        # Not run in last hour
-        if last_run:
-            elapsed = (datetime.now() - last_run).total_seconds()
-            if elapsed < 3600:  # 1 hour
-                return False
+    async def _notify(self, text: str, *, priority: str = "normal", coalesce: Optional[str] = None):
+        """Queue a Telegram message on the outbox (delivered in the background)."""
+        self.outbox.send(text, priority=priority, coalesce=coalesce)
 
-        return True
+    def _request_stop(self):
+        """Stop the main loop from inside the event loop (wakes the scheduler)."""
+        logger.info("Shutdown requested")
+        self.running = False
+        if self._stop_event is not None:
+            self._stop_event.set()
 
     async def _run_task(self, task_name: str):
         """Run a scheduled task."""
         try:
             if task_name == "daily_briefing":
                 await self._run_daily_briefing()
+            elif task_name == "heartbeat":
+                await self._run_heartbeat()
             elif "issue_collector" in task_name:
                 # 8AM task looks back 7 days, others 1 day
                 days = 7 if "morning" in task_name else 1
                 await self._run_issue_collector(days_back=days)
         except Exception as e:
             logger.error(f"Task {task_name} failed: {e}")
-            self.telegram.send_message(
-                f"❌ *Task Failed: {task_name}*\n\n{str(e)}"
-            )
+            await self._notify(f"❌ *Task Failed: {task_name}*\n\n{str(e)}", priority="high")
+
+    async def _run_daily_briefing(self):
+        """Generate today's briefing and send it to Telegram."""
+        logger.info("Generating daily briefing...")
+
+        date_str = datetime.now().strftime("%Y-%m-%d")
+        briefing_file = self.wiki_root / "notes" / "daily" / f"{date_str}_briefing.md"
+        briefing = await self.executor.run_blocking(self.briefing_gen.generate, briefing_file)
+
+        preview = briefing if len(briefing) <= 3500 else briefing[:3500] + "\n..."
+        await self._notify(f"☀️ *Daily Briefing {date_str}*\n\n{preview}")
 
         if briefing_file.exists():
-            self.telegram.send_document(
-                briefing_file,
-                caption="📄 Full daily briefing"
-            )
+            self.outbox.send_document(briefing_file, caption="📄 Full daily briefing")
 
         logger.info("Daily briefing sent to Telegram")
 
+    def _collector_client(self, cfg: CollectorConfig) -> ForgejoClient:
+        """Reuse one ForgejoClient across runs while its connection settings are unchanged."""
+        key = (cfg.base_url, cfg.token, cfg.concurrency, cfg.rate_limit, cfg.data_dir, cfg.http_cache_max_bytes)
+        if self._forgejo_client is None or key != self._forgejo_client_key:
+            if self._forgejo_client is not None:
+                self._forgejo_client.close()
+            self._forgejo_client = ForgejoClient.from_config(cfg)
+            self._forgejo_client_key = key
+        return self._forgejo_client
+
     async def _run_issue_collector(self, days_back: int = 7):
-        """Run issue collector."""
+        """Run issue collector in-process."""
         logger.info(f"Running issue collector (days_back={days_back})...")
 
-        import subprocess
-
-        result = subprocess.run(
-            [
-                "bash", "-c",
-                "cd /Users/nqcdan/dev/wiki/automation && "
-                "source .venv/bin/activate && "
-                "set -a && source .env && set +a && "
-                f"python forgejo_issue_collector.py --days-back {days_back}"
-            ],
-            capture_output=True,
-            text=True,
-        )
-
-        if result.returncode == 0:
-            # Parse output
-            output = result.stdout
-            
-            self.telegram.send_message(
-                f"📋 *Issue Collector*\n\n"
-                f"Status: ✅ Success\n"
-                f"Collected issues from last {days_back} days\n"
-                f"BACKLOG updated"
-            )
-        else:
-            self.telegram.send_message(
-                f"❌ *Issue Collector Failed*\n\n{result.stderr[:500]}"
+        try:
+            cfg = ConfigBuilder.build(["--days-back", str(days_back)])
+            app = CollectorApp(cfg, client=self._collector_client(cfg), classifier=self._collector_classifier)
+            self._collector_classifier = app.classifier
+            # On timeout or shutdown the worker thread stops at the next issue
+            # or file boundary; the collector group stays locked until it has.
+            result: CollectorResult = await self.executor.run_blocking(app.run, on_cancel=app.cancel)
+        except (Exception, SystemExit) as e:
+            # Config errors exit the CLI with SystemExit; here they must not stop the daemon.
+            await self._notify(f"❌ *Issue Collector Failed*\n\n{str(e)[:500]}", priority="high")
+            return
+
+        repos = "\n".join(f"• {repo}: {n} fetched" for repo, n in result.changed_by_repo.items())
+        changed = result.changed_issues
+        if not changed:
+            # Nothing to act on: fold into the next digest instead of pinging.
+            await self._notify(
+                f"📋 Issue Collector ({days_back}d): BACKLOG unchanged, {result.fetched} fetched",
+                priority="low",
+                coalesce="issue_collector",
             )
+            logger.info(f"Issue collector completed: {result.fetched} fetched, nothing changed")
+            return
+
+        await self._notify(
+            f"📋 *Issue Collector*\n\n"
+            f"Status: ✅ Success\n"
+            f"Collected issues from last {days_back} days\n"
+            f"{repos}\n"
+            + f"BACKLOG updated ({changed} issues changed)"
+            + f"\n⏱️ {result.timings.get('total', 0):.1f}s"
+        )
 
-        logger.info("Issue collector completed")
+        logger.info(
+            f"Issue collector completed: {result.fetched} fetched, {changed} changed "
+            f"(fetch {result.timings.get('fetch', 0):.1f}s, render {result.timings.get('render', 0):.1f}s)"
+        )
 
     async def _run_heartbeat(self):
         """Send heartbeat message."""
         try:
-            self.telegram.send_message(f"💓 Heartbeat: {datetime.now().strftime('%H:%M:%S')}")
+            down = [name for name, h in provider_health().all().items() if h.get("state") != "closed"]
+            note = f"\n⛔ AI provider down (rule-based fallback): {', '.join(sorted(down))}" if down else ""
+            await self._notify(
+                f"💓 Heartbeat: {datetime.now().strftime('%H:%M:%S')}{note}",
+                priority="low",
+                coalesce="heartbeat",
+            )
         except Exception as e:
             logger.error(f"Heartbeat failed: {e}")
 
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""Near-duplicate Issue Index (MinHash + LSH)
+
+Replaces pairwise Jaccard scans with a persistent index:
+- every item is tokenized once (same `\\w+` lowercase tokens as the classifier's
+  `_calculate_similarity`) and summarized by a MinHash signature;
+- signatures are split into LSH bands, so a lookup only touches items sharing
+  at least one band bucket (sub-linear candidate generation);
+- candidates are verified with exact Jaccard on the stored token sets.
+
+With the defaults (128 permutations, 32 bands x 4 rows) pairs at Jaccard 0.8
+become candidates with probability > 0.99 and pairs below 0.3 rarely do.
+
+The index is saved as JSON (default: data/duplicate_index.json) and can be kept
+in sync with the collector's SQLite store incrementally.
+
+Usage:
+    python duplicate_index.py build      # index new/changed issues from the store
+    python duplicate_index.py clusters   # print duplicate clusters (--threshold 0.8)
+
+    from duplicate_index import DuplicateIndex
+    index = DuplicateIndex.load(path)
+    index.add("of1-crm#12", title, body)
+    index.query(title, body, threshold=0.8)  # -> [(item_id, similarity), ...]
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import random
+import re
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> Set[str]:
+    return set(_TOKEN_RE.findall(text.lower()))
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    union = len(a | b)
+    return len(a & b) / union if union else 0.0
+
+
+class DuplicateIndex:
+    """MinHash/LSH index over item texts with exact Jaccard verification."""
+
+    def __init__(self, num_perm: int = 128, bands: int = 32, *, path: Optional[Path] = None):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.path = path
+        self.indexed_until = 0  # max source updated_ts already indexed (store sync)
+
+        # Fixed seed: signatures must be comparable across runs and processes.
+        rng = random.Random(1)
+        self._perms = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME)) for _ in range(num_perm)
+        ]
+
+        self._tokens: Dict[str, Set[str]] = {}
+        self._sigs: Dict[str, List[int]] = {}
+        self._buckets: List[Dict[Tuple[int, ...], Set[str]]] = [defaultdict(set) for _ in range(bands)]
+
+    # ------------------------------------------------------------------
+    # Signatures
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _token_hash(token: str) -> int:
+        return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=4).digest(), "little")
+
+    def signature(self, tokens: Set[str]) -> List[int]:
+        if not tokens:
+            return [_MAX_HASH] * self.num_perm
+        hashes = [self._token_hash(t) for t in tokens]
+        return [
+            min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes) for a, b in self._perms
+        ]
+
+    def _band_keys(self, sig: List[int]) -> Iterable[Tuple[int, Tuple[int, ...]]]:
+        for band in range(self.bands):
+            start = band * self.rows
+            yield band, tuple(sig[start : start + self.rows])
+
+    # ------------------------------------------------------------------
+    # Mutation
+    # ------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._sigs)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._sigs
+
+    def add(self, item_id: str, title: str, body: str = "") -> None:
+        """Insert or replace an item."""
+        self._add_tokens(item_id, tokenize(f"{title} {body}"))
+
+    def _add_tokens(self, item_id: str, tokens: Set[str], sig: Optional[List[int]] = None) -> None:
+        self.remove(item_id)
+        if not tokens:
+            return
+        sig = sig or self.signature(tokens)
+        self._tokens[item_id] = tokens
+        self._sigs[item_id] = sig
+        for band, key in self._band_keys(sig):
+            self._buckets[band][key].add(item_id)
+
+    def remove(self, item_id: str) -> None:
+        sig = self._sigs.pop(item_id, None)
+        self._tokens.pop(item_id, None)
+        if sig is None:
+            return
+        for band, key in self._band_keys(sig):
+            bucket = self._buckets[band].get(key)
+            if bucket is not None:
+                bucket.discard(item_id)
+                if not bucket:
+                    del self._buckets[band][key]
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+
+    def _candidates(self, sig: List[int]) -> Set[str]:
+        out: Set[str] = set()
+        for band, key in self._band_keys(sig):
+            out |= self._buckets[band].get(key, set())
+        return out
+
+    def query_tokens(
+        self, tokens: Set[str], threshold: float = 0.8, *, exclude: Optional[str] = None
+    ) -> List[Tuple[str, float]]:
+        if not tokens:
+            return []
+        matches = []
+        for cand in self._candidates(self.signature(tokens)):
+            if cand == exclude:
+                continue
+            sim = jaccard(tokens, self._tokens[cand])
+            if sim >= threshold:
+                matches.append((cand, sim))
+        matches.sort(key=lambda m: (-m[1], m[0]))
+        return matches
+
+    def query(
+        self, title: str, body: str = "", threshold: float = 0.8, *, exclude: Optional[str] = None
+    ) -> List[Tuple[str, float]]:
+        """Indexed items with exact Jaccard >= threshold, most similar first
+        (`exclude`: the queried item's own id, if it is indexed)."""
+        return self.query_tokens(tokenize(f"{title} {body}"), threshold, exclude=exclude)
+
+    def clusters(self, threshold: float = 0.8) -> List[List[str]]:
+        """All groups of mutually linked duplicates (size >= 2), largest first."""
+        parent: Dict[str, str] = {}
+
+        def find(x: str) -> str:
+            parent.setdefault(x, x)
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        seen: Set[Tuple[str, str]] = set()
+        for band in self._buckets:
+            for bucket in band.values():
+                if len(bucket) < 2:
+                    continue
+                members = sorted(bucket)
+                for i, a in enumerate(members):
+                    for b in members[i + 1 :]:
+                        if (a, b) in seen:
+                            continue
+                        seen.add((a, b))
+                        if jaccard(self._tokens[a], self._tokens[b]) >= threshold:
+                            parent[find(a)] = find(b)
+
+        groups: Dict[str, List[str]] = defaultdict(list)
+        for item in parent:
+            groups[find(item)].append(item)
+        out = [sorted(g) for g in groups.values() if len(g) > 1]
+        out.sort(key=lambda g: (-len(g), g[0]))
+        return out
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def load(cls, path: Path, num_perm: int = 128, bands: int = 32) -> "DuplicateIndex":
+        if not path.exists():
+            return cls(num_perm, bands, path=path)
+        data = json.loads(path.read_text(encoding="utf-8"))
+        index = cls(int(data.get("num_perm", num_perm)), int(data.get("bands", bands)), path=path)
+        index.indexed_until = int(data.get("indexed_until", 0))
+        for item_id, entry in data.get("items", {}).items():
+            index._add_tokens(item_id, set(entry["tokens"]), entry.get("sig"))
+        return index
+
+    def save(self, path: Optional[Path] = None) -> None:
+        path = path or self.path
+        if path is None:
+            raise ValueError("No path to save the duplicate index to")
+        payload = {
+            "num_perm": self.num_perm,
+            "bands": self.bands,
+            "indexed_until": self.indexed_until,
+            "items": {
+                item_id: {"tokens": sorted(self._tokens[item_id]), "sig": self._sigs[item_id]}
+                for item_id in self._sigs
+            },
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(path)
+
+    # ------------------------------------------------------------------
+    # Store sync
+    # ------------------------------------------------------------------
+
+    def sync_from_store(self, store) -> int:
+        """Index issues changed in the collector's IssueStore since the last sync."""
+        count = 0
+        for owner, repo, number, title, body, updated_ts in store.iter_texts(updated_after=self.indexed_until):
+            self.add(f"{owner}/{repo}#{number}", title, body)
+            self.indexed_until = max(self.indexed_until, int(updated_ts))
+            count += 1
+        return count
+
+
+def main() -> None:
+    script_dir = Path(__file__).resolve().parent
+    parser = argparse.ArgumentParser(description="Near-duplicate issue index (MinHash/LSH)")
+    parser.add_argument("command", choices=["build", "clusters"])
+    parser.add_argument("--index", default=str(script_dir / "data" / "duplicate_index.json"))
+    parser.add_argument("--store", default=str(script_dir / "data" / "forgejo_issues.sqlite3"))
+    parser.add_argument("--threshold", type=float, default=0.8)
+    args = parser.parse_args()
+
+    from forgejo_issue_collector import IssueStore
+
+    index = DuplicateIndex.load(Path(args.index))
+    store = IssueStore(Path(args.store))
+    try:
+        added = index.sync_from_store(store)
+    finally:
+        store.close()
+    index.save()
+    print(f"✅ Indexed {added} new/changed issues ({len(index)} total)")
+
+    if args.command == "clusters":
+        clusters = index.clusters(args.threshold)
+        print(f"🔁 {len(clusters)} duplicate clusters (Jaccard >= {args.threshold})")
+        for group in clusters:
+            print(f"- {', '.join(group)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,598 @@
+#!/usr/bin/env python3
+"""Embedding Index for Semantic Retrieval
+
+One vector index over wiki passages, OCR book passages and Forgejo issues, so
+"what do we know about X" works across all three by meaning, not just words:
+- embeddings come from the Ollama embeddings endpoint (`/api/embed`, default
+  model `bge-m3`, multilingual) or a local CPU sentence-transformers model
+  (`EMBED_BACKEND=local`), always in batches;
+- vectors are content-addressed: one row per distinct text (hash of the text),
+  so unchanged passages, re-synced issues and duplicate texts are never
+  embedded twice; items (`wiki/...#3`, `ocr:<chunk id>`, `issue:owner/repo#12`)
+  point at rows;
+- rows live in a memory-mapped float32 matrix (data/embeddings/<model>/
+  vectors.f32), L2-normalized, appended in place; metadata is JSON next to it
+  and names the current matrix file, so a compaction (written to a new
+  `vectors.<generation>.f32`) becomes visible with the same atomic meta write;
+- search is exact (one matrix-vector product over the memmap) up to
+  IVF_MIN_ROWS rows; beyond that an IVF index (k-means lists, `nprobe` lists
+  scanned, rows added since the build scanned exactly) is built lazily;
+- sync is incremental: wiki files by mtime/size, OCR passages by chunk id
+  (ocr_corpus.py), issues by `updated_ts` from the collector's IssueStore;
+  rows no item references any more are dropped by `compact()`.
+
+Requires numpy (`pip install numpy`); the local backend also needs
+sentence-transformers.
+
+Usage:
+    python embedding_index.py sync                  # wiki + ocr + issues
+    python embedding_index.py search "upload chứng từ lên S3" -k 5 --kind wiki
+    python embedding_index.py similar "issue:bf1/fms#42"
+
+    from embedding_index import EmbeddingIndex
+    index = EmbeddingIndex.open()
+    index.sync()
+    for hit in index.search("kafka consumer lag", k=5):
+        print(hit.score, hit.kind, hit.ref, hit.title)
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import requests
+
+from atomic_io import atomic_write_text
+from metrics import metrics
+from ocr_corpus import OcrCorpus
+from wiki_search import split_passages
+
+try:
+    import numpy as np
+except ImportError:  # the index cannot work without it; callers check NUMPY_AVAILABLE
+    np = None
+NUMPY_AVAILABLE = np is not None
+
+MAX_EMBED_CHARS = 2000
+FLUSH_BLOCK = 256  # texts embedded (and appended) per step
+IVF_MIN_ROWS = 20000
+IVF_REBUILD_TAIL = 0.1  # rebuild when rows added since the build exceed this share
+COMPACT_RATIO = 0.25
+WIKI_SOURCES = ("wiki",)
+
+
+def content_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=12).hexdigest()
+
+
+# ----------------------------------------------------------------------
+# Embedders
+# ----------------------------------------------------------------------
+
+
+class OllamaEmbedder:
+    """Batched embeddings from a local Ollama server (`/api/embed`)."""
+
+    backend = "ollama"
+
+    def __init__(
+        self,
+        model: Optional[str] = None,
+        base_url: Optional[str] = None,
+        *,
+        batch_size: Optional[int] = None,
+        timeout: float = 120,
+        session: Optional[requests.Session] = None,
+    ):
+        self.model = model or os.getenv("EMBED_MODEL") or "bge-m3"
+        self.base_url = (base_url or os.getenv("OLLAMA_BASE_URL") or "http://localhost:11434").rstrip("/")
+        self.batch_size = batch_size or int(os.getenv("EMBED_BATCH_SIZE") or 32)
+        self.timeout = timeout
+        self._session = session or requests.Session()
+
+    def embed(self, texts: Sequence[str]) -> "np.ndarray":
+        vectors: List[List[float]] = []
+        for i in range(0, len(texts), self.batch_size):
+            batch = list(texts[i : i + self.batch_size])
+            with metrics.timer("embedding_batch_seconds", backend=self.backend):
+                resp = self._session.post(
+                    f"{self.base_url}/api/embed",
+                    json={"model": self.model, "input": batch, "truncate": True},
+                    timeout=self.timeout,
+                )
+                resp.raise_for_status()
+                vectors.extend(resp.json()["embeddings"])
+            metrics.inc("embedding_texts_total", len(batch), backend=self.backend)
+        return np.asarray(vectors, dtype=np.float32)
+
+
+class LocalEmbedder:
+    """CPU sentence-transformers model, loaded on first use."""
+
+    backend = "local"
+
+    def __init__(self, model: Optional[str] = None, *, batch_size: Optional[int] = None):
+        self.model = model or os.getenv("EMBED_MODEL") or "paraphrase-multilingual-MiniLM-L12-v2"
+        self.batch_size = batch_size or int(os.getenv("EMBED_BATCH_SIZE") or 32)
+        self._model = None
+
+    def embed(self, texts: Sequence[str]) -> "np.ndarray":
+        if self._model is None:
+            try:
+                from sentence_transformers import SentenceTransformer
+            except ImportError as e:
+                raise RuntimeError("EMBED_BACKEND=local needs sentence-transformers (pip install sentence-transformers)") from e
+            self._model = SentenceTransformer(self.model, device="cpu")
+        with metrics.timer("embedding_batch_seconds", backend=self.backend):
+            vectors = self._model.encode(list(texts), batch_size=self.batch_size, convert_to_numpy=True)
+        metrics.inc("embedding_texts_total", len(texts), backend=self.backend)
+        return vectors.astype(np.float32, copy=False)
+
+
+def default_embedder():
+    backend = os.getenv("EMBED_BACKEND", "ollama")
+    if backend == "local":
+        return LocalEmbedder()
+    if backend == "ollama":
+        return OllamaEmbedder()
+    raise ValueError(f"Unknown EMBED_BACKEND {backend!r} (ollama | local)")
+
+
+# ----------------------------------------------------------------------
+# Index
+# ----------------------------------------------------------------------
+
+
+@dataclass
+class Hit:
+    item_id: str
+    score: float
+    kind: str  # wiki | ocr | issue | ...
+    ref: str  # where to look: path:line, chunk id, owner/repo#number
+    title: str
+
+
+class EmbeddingIndex:
+    """Content-addressed float32 vector store with exact / IVF search."""
+
+    VERSION = 1
+
+    def __init__(self, store_dir: Path, embedder, *, base: Optional[Path] = None):
+        if np is None:
+            raise RuntimeError("The embedding index needs numpy (pip install numpy)")
+        self.embedder = embedder
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", f"{embedder.backend}-{embedder.model}")
+        self.dir = store_dir / slug
+        self.base = Path(base or Path(__file__).resolve().parent.parent).resolve()
+        self._generation = 0
+        self.vectors_path = self.dir / self._vectors_name(0)
+        self.meta_path = self.dir / "meta.json"
+        self.ivf_path = self.dir / "ivf.npz"
+
+        self.dim = 0
+        self._hashes: List[str] = []  # row -> content hash
+        self._rows: Dict[str, int] = {}  # content hash -> row
+        # item id -> [content hash, kind, ref, title]
+        self._items: Dict[str, List] = {}
+        # wiki file -> [mtime_ns, size, [item ids]]
+        self._files: Dict[str, List] = {}
+        self._issues_until = 0
+        self._pending: Dict[str, str] = {}  # content hash -> text awaiting embedding
+        self._matrix: Optional["np.ndarray"] = None
+        self._row_items: Optional[Dict[int, List[str]]] = None
+        self._ivf: Optional[Dict] = None
+        self._load()
+
+    @staticmethod
+    def _vectors_name(generation: int) -> str:
+        return f"vectors.{generation}.f32" if generation else "vectors.f32"
+
+    @classmethod
+    def open(cls, store_dir: Optional[Path] = None, embedder=None) -> "EmbeddingIndex":
+        script_dir = Path(__file__).resolve().parent
+        return cls(
+            store_dir or script_dir / "data" / "embeddings",
+            embedder or default_embedder(),
+            base=Path(os.getenv("WIKI_ROOT") or script_dir.parent),
+        )
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def _load(self) -> None:
+        if not self.meta_path.exists():
+            return
+        try:
+            meta = json.loads(self.meta_path.read_text(encoding="utf-8"))
+        except ValueError:
+            return
+        if meta.get("version") != self.VERSION or meta.get("model") != self.embedder.model:
+            return
+        vectors_path = self.dir / meta.get("vectors", self._vectors_name(0))
+        expected = len(meta["hashes"]) * meta["dim"] * 4
+        size = vectors_path.stat().st_size if vectors_path.exists() else 0
+        if size < expected:
+            # Committed rows are missing (file lost or truncated): the row
+            # numbers in meta cannot be trusted, so start over and re-embed.
+            print(f"⚠️  {vectors_path.name} has {size} of {expected} bytes, rebuilding the index")
+            vectors_path.unlink(missing_ok=True)
+            return
+        self._generation = meta.get("generation", 0)
+        self.vectors_path = vectors_path
+        self.dim = meta["dim"]
+        self._hashes = meta["hashes"]
+        self._rows = {h: i for i, h in enumerate(self._hashes)}
+        self._items = meta["items"]
+        self._files = meta["files"]
+        self._issues_until = meta["issues_until"]
+        # Rows appended after the last metadata save were never committed.
+        if size > expected:
+            with open(self.vectors_path, "r+b") as f:
+                f.truncate(expected)
+
+    def save(self) -> None:
+        self.flush()
+        if self._dead_rows() > COMPACT_RATIO * max(len(self._hashes), 1):
+            self.compact()
+        meta = {
+            "version": self.VERSION,
+            "model": self.embedder.model,
+            "dim": self.dim,
+            "generation": self._generation,
+            "vectors": self.vectors_path.name,
+            "hashes": self._hashes,
+            "items": self._items,
+            "files": self._files,
+            "issues_until": self._issues_until,
+        }
+        atomic_write_text(self.meta_path, json.dumps(meta, ensure_ascii=False, separators=(",", ":")))
+        # Matrices of earlier generations (or of a compaction that never got
+        # committed) are unreferenced now.
+        for path in self.dir.glob("vectors*.f32*"):
+            if path != self.vectors_path:
+                path.unlink(missing_ok=True)
+
+    def _vectors(self) -> "np.ndarray":
+        if self._matrix is None:
+            if not self._hashes:
+                self._matrix = np.zeros((0, max(self.dim, 1)), dtype=np.float32)
+            else:
+                self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(len(self._hashes), self.dim))
+        return self._matrix
+
+    # ------------------------------------------------------------------
+    # Items
+    # ------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._items
+
+    def add(self, item_id: str, text: str, *, kind: str, ref: str = "", title: str = "") -> None:
+        """Add or replace an item; its text is embedded on the next flush unless
+        the same text was embedded before."""
+        text = text[:MAX_EMBED_CHARS]
+        digest = content_hash(text)
+        self._items[item_id] = [digest, kind, ref or item_id, title]
+        self._row_items = None
+        if digest in self._rows or digest in self._pending:
+            metrics.inc("embedding_cache_hits_total")
+            return
+        self._pending[digest] = text
+
+    def remove(self, item_id: str) -> None:
+        if self._items.pop(item_id, None) is not None:
+            self._row_items = None
+
+    def flush(self) -> int:
+        """Embed pending texts in blocks and append them to the matrix."""
+        pending = list(self._pending.items())
+        if not pending:
+            return 0
+        self.dir.mkdir(parents=True, exist_ok=True)
+        done = 0
+        for i in range(0, len(pending), FLUSH_BLOCK):
+            block = pending[i : i + FLUSH_BLOCK]
+            vectors = self.embedder.embed([text for _, text in block])
+            if not self.dim:
+                self.dim = int(vectors.shape[1])
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.maximum(norms, 1e-12)
+            with open(self.vectors_path, "ab") as f:
+                f.write(vectors.astype(np.float32).tobytes())
+            for digest, _ in block:
+                self._rows[digest] = len(self._hashes)
+                self._hashes.append(digest)
+                del self._pending[digest]
+            done += len(block)
+        self._matrix = None
+        self._row_items = None
+        return done
+
+    def _live_map(self) -> Dict[int, List[str]]:
+        if self._row_items is None:
+            row_items: Dict[int, List[str]] = {}
+            for item_id, (digest, *_rest) in self._items.items():
+                row = self._rows.get(digest)
+                if row is not None:
+                    row_items.setdefault(row, []).append(item_id)
+            self._row_items = row_items
+        return self._row_items
+
+    def _dead_rows(self) -> int:
+        return len(self._hashes) - len(self._live_map())
+
+    def compact(self) -> None:
+        """Rewrite the matrix with referenced rows only, into the next generation's
+        file; the committed matrix stays untouched until `save` switches meta."""
+        live = sorted(self._live_map())
+        generation = self._generation + 1
+        path = self.dir / self._vectors_name(generation)
+        matrix = self._vectors()
+        with open(path, "wb") as f:
+            for i in range(0, len(live), 4096):
+                f.write(np.ascontiguousarray(matrix[live[i : i + 4096]]).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        self._matrix = None
+        self._generation, self.vectors_path = generation, path
+        self._hashes = [self._hashes[row] for row in live]
+        self._rows = {h: i for i, h in enumerate(self._hashes)}
+        self._row_items = None
+        self._ivf = None
+        self.ivf_path.unlink(missing_ok=True)
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+
+    def embed_query(self, text: str) -> "np.ndarray":
+        vector = self.embedder.embed([text[:MAX_EMBED_CHARS]])[0]
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def search(self, query: str, k: int = 10, *, kind: Optional[str] = None, exact: Optional[bool] = None) -> List[Hit]:
+        if not self._hashes:
+            return []
+        return self.search_vector(self.embed_query(query), k, kind=kind, exact=exact)
+
+    def similar(self, item_id: str, k: int = 10, *, kind: Optional[str] = None) -> List[Hit]:
+        """Nearest items to an indexed item (excluding itself)."""
+        self.flush()
+        row = self._rows.get(self._items[item_id][0])
+        if row is None:
+            return []
+        hits = self.search_vector(np.asarray(self._vectors()[row]), k + 1, kind=kind)
+        return [h for h in hits if h.item_id != item_id][:k]
+
+    def search_vector(self, q: "np.ndarray", k: int = 10, *, kind: Optional[str] = None, exact: Optional[bool] = None) -> List[Hit]:
+        live = self._live_map()
+        if not live:
+            return []
+        matrix = self._vectors()
+        use_ivf = (not exact) and len(live) >= IVF_MIN_ROWS
+        if use_ivf:
+            rows = self._ivf_candidates(q)
+            scores = matrix[rows] @ q
+        else:
+            rows = None
+            scores = matrix @ q
+
+        # Rows can be shared by several items (same text) or unreferenced.
+        want = min(len(scores), max(k * 4, k + 8))
+        top = np.argpartition(-scores, want - 1)[:want] if want < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+
+        hits: List[Hit] = []
+        for idx in top:
+            row = int(rows[idx]) if rows is not None else int(idx)
+            for item_id in live.get(row, ()):
+                digest, item_kind, ref, title = self._items[item_id]
+                if kind and item_kind != kind:
+                    continue
+                hits.append(Hit(item_id, round(float(scores[idx]), 4), item_kind, ref, title))
+            if len(hits) >= k:
+                break
+        if len(hits) < k and kind and want < len(scores):
+            # A rare kind can be crowded out of the candidate set: scan it exactly.
+            kind_rows = np.fromiter((r for r, ids in live.items() if any(self._items[i][1] == kind for i in ids)), dtype=np.int64)
+            if len(kind_rows):
+                kind_scores = matrix[kind_rows] @ q
+                hits = []
+                for idx in np.argsort(-kind_scores)[: k * 2]:
+                    for item_id in live[int(kind_rows[idx])]:
+                        digest, item_kind, ref, title = self._items[item_id]
+                        if item_kind == kind:
+                            hits.append(Hit(item_id, round(float(kind_scores[idx]), 4), item_kind, ref, title))
+        return hits[:k]
+
+    # ------------------------------------------------------------------
+    # IVF
+    # ------------------------------------------------------------------
+
+    def _ivf_candidates(self, q: "np.ndarray", nprobe: Optional[int] = None) -> "np.ndarray":
+        ivf = self._ivf_index()
+        nprobe = nprobe or max(1, int(math.sqrt(len(ivf["centroids"]))))
+        nearest = np.argsort(-(ivf["centroids"] @ q))[:nprobe]
+        parts = [ivf["rows"][ivf["offsets"][c] : ivf["offsets"][c + 1]] for c in nearest]
+        parts.append(np.arange(ivf["built_rows"], len(self._hashes)))  # added since the build
+        return np.concatenate(parts)
+
+    def _ivf_index(self) -> Dict:
+        n = len(self._hashes)
+        if self._ivf is None and self.ivf_path.exists():
+            data = np.load(self.ivf_path)
+            self._ivf = {key: data[key] for key in data.files}
+            self._ivf["built_rows"] = int(self._ivf["built_rows"])
+            # Built over another matrix generation (e.g. an uncommitted compaction).
+            if int(self._ivf.get("generation", 0)) != self._generation or self._ivf["built_rows"] > n:
+                self._ivf = None
+        if self._ivf is None or n - self._ivf["built_rows"] > IVF_REBUILD_TAIL * n:
+            self._ivf = self._build_ivf()
+            np.savez(self.ivf_path, **self._ivf)
+        return self._ivf
+
+    def _build_ivf(self, iterations: int = 8) -> Dict:
+        """Spherical k-means over a sample, then every row assigned to its list."""
+        matrix = self._vectors()
+        n = len(self._hashes)
+        nlist = max(1, int(math.sqrt(n)))
+        rng = np.random.default_rng(0)
+        sample = matrix[np.sort(rng.choice(n, size=min(n, nlist * 64), replace=False))]
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = sample[assign == c]
+                if len(members):
+                    mean = members.sum(axis=0)
+                    centroids[c] = mean / max(float(np.linalg.norm(mean)), 1e-12)
+
+        assign = np.empty(n, dtype=np.int64)
+        for i in range(0, n, 8192):
+            assign[i : i + 8192] = np.argmax(matrix[i : i + 8192] @ centroids.T, axis=1)
+        order = np.argsort(assign, kind="stable")
+        offsets = np.searchsorted(assign[order], np.arange(nlist + 1))
+        return {"centroids": centroids, "rows": order, "offsets": offsets, "built_rows": n, "generation": self._generation}
+
+    # ------------------------------------------------------------------
+    # Sources
+    # ------------------------------------------------------------------
+
+    def sync_wiki(self, sources: Sequence[str] = WIKI_SOURCES) -> Dict[str, int]:
+        """Index passages of new/changed markdown files; forget removed files."""
+        found: Dict[str, os.stat_result] = {}
+        for source in sources:
+            for path in (self.base / source).rglob("*.md"):
+                rel = path.relative_to(self.base).as_posix()
+                if not any(part.startswith(".") for part in rel.split("/")):
+                    found[rel] = path.stat()
+
+        changed = removed = 0
+        for rel in [r for r in self._files if r not in found]:
+            for item_id in self._files.pop(rel)[2]:
+                self.remove(item_id)
+            removed += 1
+        for rel, st in found.items():
+            entry = self._files.get(rel)
+            if entry and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+                continue
+            for item_id in entry[2] if entry else ():
+                self.remove(item_id)
+            text = (self.base / rel).read_text(encoding="utf-8", errors="replace")
+            title = Path(rel).stem
+            ids = []
+            for i, (heading, line, body) in enumerate(split_passages(text)):
+                item_id = f"{rel}#{i}"
+                self.add(item_id, body, kind="wiki", ref=f"{rel}:{line}", title=heading or title)
+                ids.append(item_id)
+            self._files[rel] = [st.st_mtime_ns, st.st_size, ids]
+            changed += 1
+        return {"files": changed, "removed": removed}
+
+    def sync_ocr(self, corpus: OcrCorpus) -> Dict[str, int]:
+        """Mirror the OCR passage store (chunk ids are stable content ids)."""
+        live = set()
+        added = 0
+        for chunk in corpus.iter_chunks():
+            item_id = f"ocr:{chunk.id}"
+            live.add(item_id)
+            title = f"{chunk.heading} (p. {chunk.page})" if chunk.page else chunk.heading
+            if item_id not in self._items:
+                added += 1
+            self.add(item_id, chunk.text, kind="ocr", ref=f"{chunk.source}:{chunk.line}", title=title)
+        stale = [i for i, meta in self._items.items() if meta[1] == "ocr" and i not in live]
+        for item_id in stale:
+            self.remove(item_id)
+        return {"added": added, "removed": len(stale)}
+
+    def sync_issues(self, store) -> int:
+        """Index issues changed in the collector's IssueStore since the last sync."""
+        count = 0
+        for owner, repo, number, title, body, updated_ts in store.iter_texts(updated_after=self._issues_until):
+            ref = f"{owner}/{repo}#{number}"
+            self.add(f"issue:{ref}", f"{title}\n\n{body}", kind="issue", ref=ref, title=title)
+            self._issues_until = max(self._issues_until, int(updated_ts))
+            count += 1
+        return count
+
+    def sync(self, *, corpus: Optional[OcrCorpus] = None, store=None) -> Dict[str, int]:
+        """Wiki + OCR corpus + issues (each when available), embedded and saved."""
+        stats = {"wiki_files": self.sync_wiki()["files"]}
+        if corpus is not None:
+            stats["ocr_added"] = self.sync_ocr(corpus)["added"]
+        if store is not None:
+            stats["issues"] = self.sync_issues(store)
+        stats["embedded"] = len(self._pending)
+        self.save()
+        return stats
+
+    def stats(self) -> Dict[str, int]:
+        kinds: Dict[str, int] = {}
+        for meta in self._items.values():
+            kinds[meta[1]] = kinds.get(meta[1], 0) + 1
+        return {"items": len(self._items), "rows": len(self._hashes), "dead_rows": self._dead_rows(), "dim": self.dim, **kinds}
+
+
+def main() -> None:
+    script_dir = Path(__file__).resolve().parent
+    parser = argparse.ArgumentParser(description="Semantic index over wiki, OCR passages and issues")
+    parser.add_argument("command", choices=["sync", "search", "similar", "stats", "compact"])
+    parser.add_argument("query", nargs="?", help="Search text, or an item id for `similar`")
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--kind", choices=["wiki", "ocr", "issue"])
+    parser.add_argument("--exact", action="store_true", help="Skip the IVF index")
+    parser.add_argument("--store", default=str(script_dir / "data" / "forgejo_issues.sqlite3"))
+    parser.add_argument("--no-issues", action="store_true")
+    args = parser.parse_args()
+
+    if not NUMPY_AVAILABLE:
+        raise SystemExit("❌ numpy is required: pip install numpy")
+    index = EmbeddingIndex.open()
+
+    if args.command == "sync":
+        corpus = OcrCorpus.open()
+        corpus.ingest()
+        store = None
+        if not args.no_issues and Path(args.store).exists():
+            from forgejo_issue_collector import IssueStore
+
+            store = IssueStore(Path(args.store))
+        try:
+            s = index.sync(corpus=corpus, store=store)
+        finally:
+            if store is not None:
+                store.close()
+        print(f"✅ Synced: {s}")
+    elif args.command == "compact":
+        index.compact()
+        index.save()
+    elif args.command in ("search", "similar"):
+        if not args.query:
+            raise SystemExit(f"❌ {args.command} needs a query")
+        if args.command == "similar" and args.query not in index:
+            raise SystemExit(f"❌ Unknown item {args.query!r}")
+        hits = (
+            index.search(args.query, args.k, kind=args.kind, exact=args.exact or None)
+            if args.command == "search"
+            else index.similar(args.query, args.k, kind=args.kind)
+        )
+        for hit in hits:
+            print(f"{hit.score:.3f}  [{hit.kind}] {hit.ref}  {hit.title}")
+        return
+
+    print(f"📐 {index.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -21,6 +21,10 @@ Quick run
     # Optional:
     ISSUE_STATE=all          # open|closed|all (default: all)
     DAYS_BACK=3              # only include issues updated within N days (default: 3; set None for all)
+    FORGEJO_CONCURRENCY=4    # repos fetched in parallel over one keep-alive pool (default: 4)
+    FORGEJO_RATE_LIMIT=5     # max requests/second per host (default: 5; 0 disables)
+    SYNC_DATA_DIR=...        # where sync cursors + local issue store live (default: ./data)
+    HTTP_CACHE_MAX_MB=64     # on-disk conditional-GET cache size (default: 64; 0 disables)
     OUTPUT_ISSUES_FILE=/Users/nqcdan/dev/wiki/automation/team_issues_summary.md
 
 3) Run:
@@ -36,18 +40,51 @@ Purpose
 Notes
 - Uses /api/v1/repos/{owner}/{repo}/issues?type=issues so PRs are excluded.
 - If DAYS_BACK is set, filters by updated_at >= now - DAYS_BACK.
+- Repos are fetched concurrently (bounded by FORGEJO_CONCURRENCY) through a single
+  pooled `requests.Session`; pages within one repo stay sequential.
+- Sync is incremental: the last seen `updated_at` per repo is kept in
+  data/forgejo_sync_state.json and sent as `since=`, deltas are upserted into
+  the SQLite store data/forgejo_issues.sqlite3 keyed by (owner, repo, number).
+  An unchanged repo costs a single request. Use --full-sync to refetch.
+- Pages go through an ETag/Last-Modified cache (data/http_cache/), so an
+  unchanged page is answered with 304 and served from disk.
+- Pages are parsed element by element and projected straight into slim
+  `IssueRecord`s (no user/repository/milestone objects); workers upsert each page
+  into the store, and bodies are only read back when the CRM renderer needs them.
+- The snapshot, personal backlog and CRM backlog are all rendered by querying
+  that store (DAYS_BACK window or full history), never from API pages directly.
+- Outputs are written atomically (temp file + fsync + rename) and only when their
+  content changed; the run ends with a "Changed issues: N" line.
+- In-process use (e.g. the daemon): `App(cfg, client=..., classifier=...).run()`
+  returns a `CollectorResult` (changed counts per repo, write results, timings);
+  pass a long-lived `ForgejoClient` to keep its connections and cache warm, and
+  call `App.cancel()` from another thread to stop a run between issues.
 """
 
 from __future__ import annotations
 
 import argparse
+import codecs
+import json
 import os
-from dataclasses import dataclass
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
 
 import requests
+from requests.adapters import HTTPAdapter
+
+from atomic_io import WriteResult, write_text_if_changed
+from http_cache import HttpCache
+from markdown_sections import MarkdownDocument
+from metrics import metrics
 
 try:
     from ai_classifier import AIClassifier, ClassificationResult
@@ -77,6 +114,17 @@ class CollectorConfig:
     personal_backlog_file: Path
     crm_backlog_file: Optional[Path]
 
+    # Fetching
+    concurrency: int = 4
+    rate_limit: Optional[float] = 5.0
+
+    # Incremental sync (cursor + local issue store)
+    data_dir: Path = Path(__file__).resolve().parent / "data"
+    full_sync: bool = False
+
+    # HTTP response cache under data_dir/http_cache (0 disables)
+    http_cache_max_bytes: int = 64 * 1024 * 1024
+
 
 class ConfigBuilder:
     @staticmethod
@@ -135,6 +183,34 @@ class ConfigBuilder:
             help="OF1_Crm backlog markdown file to update (Features + Bugs/Enhancements/Maintenance sections). Use None to disable.",
         )
 
+        parser.add_argument(
+            "--concurrency",
+            default=os.getenv("FORGEJO_CONCURRENCY", "4"),
+            help="Max repos fetched in parallel (also the HTTP connection pool size)",
+        )
+        parser.add_argument(
+            "--rate-limit",
+            default=os.getenv("FORGEJO_RATE_LIMIT", "5"),
+            help="Max requests per second per host (0/None disables)",
+        )
+
+        parser.add_argument(
+            "--data-dir",
+            default=os.getenv("SYNC_DATA_DIR") or str(script_dir / "data"),
+            help="Directory for the sync cursor file and local issue store",
+        )
+        parser.add_argument(
+            "--full-sync",
+            action="store_true",
+            help="Ignore saved cursors and refetch the whole window",
+        )
+
+        parser.add_argument(
+            "--http-cache-max-mb",
+            default=os.getenv("HTTP_CACHE_MAX_MB", "64"),
+            help="Size bound of the on-disk HTTP response cache in MB (0 disables)",
+        )
+
         args = parser.parse_args(argv)
 
         if not args.url:
@@ -157,6 +233,13 @@ class ConfigBuilder:
         if args.crm_backlog_file not in (None, "", "None"):
             crm_file = Path(args.crm_backlog_file).expanduser().resolve()
 
+        concurrency = max(1, int(args.concurrency))
+
+        if args.rate_limit in (None, "", "None") or float(args.rate_limit) <= 0:
+            rate_limit: Optional[float] = None
+        else:
+            rate_limit = float(args.rate_limit)
+
         return CollectorConfig(
             base_url=str(args.url),
             token=str(args.token),
@@ -167,6 +250,11 @@ class ConfigBuilder:
             output_file=Path(args.output_file).expanduser().resolve(),
             personal_backlog_file=Path(args.backlog_file).expanduser().resolve(),
             crm_backlog_file=crm_file,
+            concurrency=concurrency,
+            rate_limit=rate_limit,
+            data_dir=Path(args.data_dir).expanduser().resolve(),
+            full_sync=bool(args.full_sync),
+            http_cache_max_bytes=int(float(args.http_cache_max_mb) * 1024 * 1024),
         )
 
 
@@ -175,14 +263,114 @@ class ConfigBuilder:
 # -----------------------------------------------------------------------------
 
 
+class HostRateLimiter:
+    """Thread-safe per-host request pacing (at most `rate` requests/second per host)."""
+
+    def __init__(self, rate: Optional[float]):
+        self._interval = (1.0 / rate) if rate else 0.0
+        self._lock = threading.Lock()
+        self._next_slot: Dict[str, float] = {}
+
+    def wait(self, url: str) -> None:
+        if not self._interval:
+            return
+
+        host = urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self._interval
+
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
 class ForgejoClient:
-    def __init__(self, base_url: str, token: str):
+    """Forgejo API client sharing one keep-alive connection pool across threads."""
+
+    def __init__(
+        self,
+        base_url: str,
+        token: str,
+        *,
+        concurrency: int = 4,
+        rate_limit: Optional[float] = None,
+        cache: Optional[HttpCache] = None,
+    ):
         self._base_url = base_url.rstrip("/")
         self._headers = {
             "Authorization": f"token {token}",
             "Content-Type": "application/json",
         }
 
+        # One pool sized for the worker count, so concurrent repos reuse TLS connections
+        # instead of opening a new one per page.
+        self._session = requests.Session()
+        self._session.headers.update(self._headers)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, concurrency))
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+
+        self._limiter = HostRateLimiter(rate_limit)
+        self._cache = cache
+
+    @classmethod
+    def from_config(cls, cfg: CollectorConfig) -> "ForgejoClient":
+        return cls(
+            cfg.base_url,
+            cfg.token,
+            concurrency=cfg.concurrency,
+            rate_limit=cfg.rate_limit,
+            cache=HttpCache(cfg.data_dir / "http_cache", cfg.http_cache_max_bytes)
+            if cfg.http_cache_max_bytes
+            else None,
+        )
+
+    def flush(self) -> None:
+        """Persist the HTTP cache index; the session stays open for reuse."""
+        if self._cache:
+            self._cache.flush()
+
+    def close(self) -> None:
+        self.flush()
+        self._session.close()
+
+    def _iter_page(self, url: str, params: Dict) -> Iterator[Dict]:
+        """Yield the elements of one JSON array page without materializing the page."""
+        self._limiter.wait(url)
+        start = time.perf_counter()
+        if self._cache:
+            try:
+                cached = self._cache.get(self._session, url, params=params, timeout=30)
+            except Exception:
+                metrics.inc("http_requests_total", client="forgejo", status="error")
+                raise
+            metrics.observe("http_request_seconds", time.perf_counter() - start, client="forgejo")
+            metrics.inc("http_requests_total", client="forgejo", status=str(cached.status_code))
+            metrics.inc("http_cache_lookups_total", client="forgejo", result="hit" if cached.from_cache else "miss")
+            if not cached.from_cache:
+                metrics.inc("http_response_bytes_total", len(cached.content), client="forgejo")
+            yield from iter_json_array([cached.content])
+            return
+
+        with self._session.get(url, params=params, timeout=30, stream=True) as resp:
+            # Time to headers: the body is consumed lazily by the caller.
+            metrics.observe("http_request_seconds", time.perf_counter() - start, client="forgejo")
+            metrics.inc("http_requests_total", client="forgejo", status=str(resp.status_code))
+            resp.raise_for_status()
+            yield from iter_json_array(self._counted(resp.iter_content(chunk_size=64 * 1024)))
+
+    @staticmethod
+    def _counted(chunks: Iterable[bytes]) -> Iterator[bytes]:
+        received = 0
+        try:
+            for chunk in chunks:
+                received += len(chunk)
+                yield chunk
+        finally:
+            metrics.inc("http_response_bytes_total", received, client="forgejo")
+
     def iter_issues(
         self,
         owner: str,
@@ -190,7 +378,12 @@ class ForgejoClient:
         state: str,
         *,
         limit: int = 100,
-    ) -> Iterable[Dict]:
+        since: Optional[str] = None,
+    ) -> Iterable[IssueRecord]:
+        """Yield issues newest-updated first; `since` (RFC 3339) filters server-side.
+
+        Pages are fetched lazily, so callers can stop iterating to stop paging.
+        """
         url = f"{self._base_url}/api/v1/repos/{owner}/{repo}/issues"
 
         page = 1
@@ -203,20 +396,66 @@ class ForgejoClient:
                 "limit": limit,
                 "page": page,
             }
+            if since:
+                params["since"] = since
 
-            resp = requests.get(url, headers=self._headers, params=params, timeout=30)
-            resp.raise_for_status()
+            count = 0
+            for raw in self._iter_page(url, params):
+                count += 1
+                yield IssueRecord.from_api(raw)
 
-            data = resp.json() or []
-            if not data:
+            if count < limit:
                 break
+            page += 1
+
 
-            for issue in data:
-                yield issue
+def iter_json_array(chunks: Iterable[bytes]) -> Iterator[Dict]:
+    """Incrementally decode a top-level JSON array from byte chunks.
 
-            if len(data) < limit:
+    Only one element is alive at a time; `null`/empty bodies yield nothing.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buf = ""
+    pos = 0
+    started = False
+
+    def skip_ws(i: int) -> int:
+        while i < len(buf) and buf[i] in " \t\r\n":
+            i += 1
+        return i
+
+    for chunk in chunks:
+        buf = buf[pos:] + utf8.decode(chunk)
+        pos = 0
+        while True:
+            pos = skip_ws(pos)
+            if pos >= len(buf):
                 break
-            page += 1
+            if not started:
+                if buf[pos] != "[":
+                    break  # not an array (e.g. null): handled once all data is in
+                started = True
+                pos += 1
+                continue
+            if buf[pos] == ",":
+                pos += 1
+                continue
+            if buf[pos] == "]":
+                return
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                break  # element split across chunks
+            if end == len(buf) and not isinstance(obj, (dict, list)):
+                break  # a bare scalar may continue in the next chunk
+            pos = end
+            yield obj
+
+    rest = (buf[pos:] + utf8.decode(b"", final=True)).strip()
+    if not started and rest in ("", "null"):
+        return
+    raise ValueError(f"Unexpected JSON page payload: {rest[:80]!r}")
 
 
 # -----------------------------------------------------------------------------
@@ -241,6 +480,101 @@ class Iso:
             return str(dt)[:10]
 
 
+class IssueRecord:
+    """Slim projection of a Forgejo issue: only the fields the renderers read.
+
+    `body` is either set at projection time (fresh from the API, on its way into
+    the store) or loaded on first access through `body_loader` (read back from the
+    store), so listing thousands of issues never holds their bodies.
+    """
+
+    __slots__ = (
+        "number",
+        "title",
+        "state",
+        "html_url",
+        "user_login",
+        "created_at",
+        "updated_at",
+        "closed_at",
+        "labels",
+        "assignees",
+        "is_pull",
+        "_body",
+        "_body_loader",
+    )
+
+    def __init__(
+        self,
+        *,
+        number: Optional[int],
+        title: str,
+        state: str,
+        html_url: str = "",
+        user_login: str = "",
+        created_at: str = "",
+        updated_at: str = "",
+        closed_at: str = "",
+        labels: Tuple[str, ...] = (),
+        assignees: Tuple[str, ...] = (),
+        is_pull: bool = False,
+        body: Optional[str] = None,
+        body_loader: Optional[Callable[[], str]] = None,
+    ):
+        self.number = number
+        self.title = title
+        self.state = state
+        self.html_url = html_url
+        self.user_login = user_login
+        self.created_at = created_at
+        self.updated_at = updated_at
+        self.closed_at = closed_at
+        self.labels = labels
+        self.assignees = assignees
+        self.is_pull = is_pull
+        self._body = body
+        self._body_loader = body_loader
+
+    @property
+    def body(self) -> str:
+        if self._body is None:
+            self._body = self._body_loader() if self._body_loader else ""
+        return self._body
+
+    @staticmethod
+    def _str(v: object) -> str:
+        return str(v or "").strip()
+
+    @classmethod
+    def from_api(cls, issue: Dict) -> "IssueRecord":
+        try:
+            number: Optional[int] = int(issue.get("number"))  # type: ignore[arg-type]
+        except Exception:
+            number = None
+
+        labels = tuple(
+            name for name in (cls._str((lb or {}).get("name")) for lb in issue.get("labels") or []) if name
+        )
+        assignees = tuple(
+            login for login in (cls._str((a or {}).get("login")) for a in issue.get("assignees") or []) if login
+        )
+
+        return cls(
+            number=number,
+            title=cls._str(issue.get("title")),
+            state=cls._str(issue.get("state")),
+            html_url=cls._str(issue.get("html_url")),
+            user_login=cls._str((issue.get("user") or {}).get("login")),
+            created_at=cls._str(issue.get("created_at")),
+            updated_at=cls._str(issue.get("updated_at")),
+            closed_at=cls._str(issue.get("closed_at")),
+            labels=labels,
+            assignees=assignees,
+            is_pull=issue.get("pull_request") is not None,
+            body=cls._str(issue.get("body")),
+        )
+
+
 class Issue:
     IGNORE_TITLES = {
         "Excel Jobs (BEE HPH)",
@@ -250,27 +584,23 @@ class Issue:
     }
 
     @staticmethod
-    def id(issue: Dict) -> Optional[int]:
-        v = issue.get("number")
-        try:
-            return int(v)
-        except Exception:
-            return None
+    def id(issue: IssueRecord) -> Optional[int]:
+        return issue.number
 
     @staticmethod
-    def title(issue: Dict) -> str:
-        return str(issue.get("title") or "").strip()
+    def title(issue: IssueRecord) -> str:
+        return issue.title
 
     @staticmethod
-    def should_ignore(issue: Dict) -> bool:
+    def should_ignore(issue: IssueRecord) -> bool:
         return Issue.title(issue) in Issue.IGNORE_TITLES
 
     @staticmethod
-    def body(issue: Dict) -> str:
-        return str(issue.get("body") or "").strip()
+    def body(issue: IssueRecord) -> str:
+        return issue.body
 
     @staticmethod
-    def body_without_images(issue: Dict) -> str:
+    def body_without_images(issue: IssueRecord) -> str:
         """Return issue body with image-only markdown lines removed.
 
         Remove lines that look like: ![alt](url)
@@ -292,54 +622,305 @@ class Issue:
         return out
 
     @staticmethod
-    def desc_full(issue: Dict) -> str:
+    def desc_full(issue: IssueRecord) -> str:
         """Full description (body) excluding image lines."""
         txt = Issue.body_without_images(issue)
         return txt if txt else ""  # omit when empty
 
     @staticmethod
-    def html_url(issue: Dict) -> str:
-        return str(issue.get("html_url") or "").strip()
+    def html_url(issue: IssueRecord) -> str:
+        return issue.html_url
 
     @staticmethod
-    def state(issue: Dict) -> str:
-        return str(issue.get("state") or "").strip()
+    def state(issue: IssueRecord) -> str:
+        return issue.state
 
     @staticmethod
-    def updated_at(issue: Dict) -> str:
-        return str(issue.get("updated_at") or "").strip()
+    def updated_at(issue: IssueRecord) -> str:
+        return issue.updated_at
 
     @staticmethod
-    def created_at(issue: Dict) -> str:
-        return str(issue.get("created_at") or "").strip()
+    def created_at(issue: IssueRecord) -> str:
+        return issue.created_at
 
     @staticmethod
-    def closed_at(issue: Dict) -> str:
-        return str(issue.get("closed_at") or "").strip()
+    def closed_at(issue: IssueRecord) -> str:
+        return issue.closed_at
 
     @staticmethod
-    def user_login(issue: Dict) -> str:
-        user = issue.get("user") or {}
-        return str(user.get("login") or "").strip()
+    def user_login(issue: IssueRecord) -> str:
+        return issue.user_login
 
     @staticmethod
-    def labels(issue: Dict) -> List[str]:
-        labels = issue.get("labels") or []
-        out: List[str] = []
-        for lb in labels:
-            name = str((lb or {}).get("name") or "").strip()
-            if name:
-                out.append(name)
-        return out
+    def labels(issue: IssueRecord) -> List[str]:
+        return list(issue.labels)
 
     @staticmethod
-    def assignees(issue: Dict) -> List[str]:
-        assignees = issue.get("assignees") or []
-        out: List[str] = []
-        for a in assignees:
-            login = str((a or {}).get("login") or "").strip()
-            if login:
-                out.append(login)
+    def assignees(issue: IssueRecord) -> List[str]:
+        return list(issue.assignees)
+
+
+# -----------------------------------------------------------------------------
+# Incremental sync (cursor file + local issue store)
+# -----------------------------------------------------------------------------
+
+
+class SyncState:
+    """Per-repo sync cursors persisted as JSON.
+
+    For each `owner/repo`:
+    - `cursor`: newest `updated_at` seen so far (sent back as `since=`).
+    - `complete_from`: the store holds every issue updated at/after this time
+      (None = full history), so a later, wider window knows it must backfill.
+    """
+
+    def __init__(self, path: Path):
+        self._path = path
+        self._repos: Dict[str, Dict[str, Optional[str]]] = {}
+        if path.exists():
+            try:
+                self._repos = json.loads(path.read_text(encoding="utf-8")).get("repos", {})
+            except Exception:
+                self._repos = {}
+
+    def get(self, key: str) -> Optional[Dict[str, Optional[str]]]:
+        return self._repos.get(key)
+
+    def set(self, key: str, *, cursor: Optional[str], complete_from: Optional[str]) -> None:
+        self._repos[key] = {"cursor": cursor, "complete_from": complete_from}
+
+    @staticmethod
+    def covers(entry: Optional[Dict[str, Optional[str]]], floor: Optional[datetime]) -> bool:
+        """True if the stored history reaches back to `floor` (None = all history)."""
+        if not entry or not entry.get("cursor"):
+            return False
+        complete_from = entry.get("complete_from")
+        if complete_from is None:
+            return True
+        if floor is None:
+            return False
+        try:
+            return Iso.parse(complete_from) <= floor
+        except Exception:
+            return False
+
+    def save(self) -> None:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {"version": 1, "repos": self._repos}
+        self._path.write_text(json.dumps(payload, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+
+class IssueStore:
+    """SQLite issue store keyed by (owner, repo, number); the renderers' data source.
+
+    `updated_ts`/`closed_ts` are UTC epoch seconds for indexed window queries;
+    the original timestamp strings are kept for rendering. Labels and assignees
+    are JSON arrays of names. Reads return `IssueRecord`s without bodies; a body is
+    fetched by primary key the first time `record.body` is accessed.
+
+    Sync workers write pages concurrently, so the connection is shared across
+    threads behind a lock.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS issues (
+            owner       TEXT    NOT NULL,
+            repo        TEXT    NOT NULL,
+            number      INTEGER NOT NULL,
+            title       TEXT    NOT NULL,
+            state       TEXT    NOT NULL,
+            html_url    TEXT    NOT NULL DEFAULT '',
+            user_login  TEXT    NOT NULL DEFAULT '',
+            created_at  TEXT    NOT NULL DEFAULT '',
+            updated_at  TEXT    NOT NULL DEFAULT '',
+            closed_at   TEXT    NOT NULL DEFAULT '',
+            updated_ts  INTEGER NOT NULL DEFAULT 0,
+            closed_ts   INTEGER,
+            labels      TEXT    NOT NULL DEFAULT '[]',
+            assignees   TEXT    NOT NULL DEFAULT '[]',
+            body        TEXT    NOT NULL DEFAULT '',
+            PRIMARY KEY (owner, repo, number)
+        );
+        CREATE INDEX IF NOT EXISTS idx_issues_repo_updated ON issues (owner, repo, updated_ts DESC);
+        CREATE INDEX IF NOT EXISTS idx_issues_state_updated ON issues (state, updated_ts DESC);
+    """
+
+    _COLUMNS = (
+        "owner, repo, number, title, state, html_url, user_login, created_at, "
+        "updated_at, closed_at, updated_ts, closed_ts, labels, assignees, body"
+    )
+    _LIST_COLUMNS = (
+        "owner, repo, number, title, state, html_url, user_login, created_at, "
+        "updated_at, closed_at, labels, assignees"
+    )
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(self._SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    @staticmethod
+    def _ts(dt: str) -> Optional[int]:
+        if not dt:
+            return None
+        try:
+            return int(Iso.parse(dt).timestamp())
+        except Exception:
+            return None
+
+    def upsert(self, owner: str, repo: str, issues: Iterable[IssueRecord]) -> int:
+        rows = []
+        for issue in issues:
+            if issue.number is None or issue.is_pull:
+                continue
+            rows.append(
+                (
+                    owner,
+                    repo,
+                    issue.number,
+                    issue.title,
+                    issue.state,
+                    issue.html_url,
+                    issue.user_login,
+                    issue.created_at,
+                    issue.updated_at,
+                    issue.closed_at,
+                    self._ts(issue.updated_at) or 0,
+                    self._ts(issue.closed_at),
+                    json.dumps(issue.labels, ensure_ascii=False),
+                    json.dumps(issue.assignees, ensure_ascii=False),
+                    issue.body,
+                )
+            )
+
+        placeholders = ", ".join("?" * 15)
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT INTO issues ({self._COLUMNS}) VALUES ({placeholders}) "
+                "ON CONFLICT (owner, repo, number) DO UPDATE SET "
+                "title=excluded.title, state=excluded.state, html_url=excluded.html_url, "
+                "user_login=excluded.user_login, created_at=excluded.created_at, "
+                "updated_at=excluded.updated_at, closed_at=excluded.closed_at, "
+                "updated_ts=excluded.updated_ts, closed_ts=excluded.closed_ts, "
+                "labels=excluded.labels, assignees=excluded.assignees, body=excluded.body",
+                rows,
+            )
+        return len(rows)
+
+    def count(self, owner: str, repo: str) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM issues WHERE owner = ? AND repo = ?", (owner, repo)
+            ).fetchone()
+        return int(row[0])
+
+    def body(self, owner: str, repo: str, number: int) -> str:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body FROM issues WHERE owner = ? AND repo = ? AND number = ?",
+                (owner, repo, number),
+            ).fetchone()
+        return str(row[0]) if row else ""
+
+    def iter_texts(self, *, updated_after: int = 0, batch: int = 500) -> Iterator[Tuple[str, str, int, str, str, int]]:
+        """(owner, repo, number, title, body, updated_ts) for rows with updated_ts >= updated_after.
+
+        Reads in batches so indexers can walk full history without loading every body.
+        """
+        last = (updated_after, "", "", -1)
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT owner, repo, number, title, body, updated_ts FROM issues "
+                    "WHERE (updated_ts, owner, repo, number) > (?, ?, ?, ?) "
+                    "ORDER BY updated_ts, owner, repo, number LIMIT ?",
+                    (*last, batch),
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield (row[0], row[1], int(row[2]), row[3], row[4], int(row[5]))
+            tail = rows[-1]
+            last = (int(tail[5]), tail[0], tail[1], int(tail[2]))
+
+    def _as_record(self, row: sqlite3.Row) -> IssueRecord:
+        owner, repo, number = row["owner"], row["repo"], row["number"]
+        return IssueRecord(
+            number=number,
+            title=row["title"],
+            state=row["state"],
+            html_url=row["html_url"],
+            user_login=row["user_login"],
+            created_at=row["created_at"],
+            updated_at=row["updated_at"],
+            closed_at=row["closed_at"],
+            labels=tuple(json.loads(row["labels"])),
+            assignees=tuple(json.loads(row["assignees"])),
+            body_loader=lambda: self.body(owner, repo, number),
+        )
+
+    def items(
+        self,
+        owner: str,
+        repos: List[str],
+        *,
+        state: str = "all",
+        since: Optional[datetime] = None,
+        order: str = "updated",
+    ) -> List[Tuple[str, IssueRecord]]:
+        """(repo, issue) pairs across `repos` in one ordered query, ignored titles excluded.
+
+        order:
+        - "updated": updated_at desc (API order, snapshot)
+        - "backlog": open first, then updated_at desc, then number desc
+        - "crm": open first, then closed date (or updated date) desc, then number desc
+        """
+        order_sql = {
+            "updated": "updated_ts DESC, number DESC",
+            "backlog": "(state = 'open') DESC, updated_ts DESC, number DESC",
+            "crm": "(state = 'open') DESC, "
+            "CASE WHEN state = 'open' THEN '' "
+            "ELSE date(COALESCE(closed_ts, updated_ts), 'unixepoch') END DESC, number DESC",
+        }[order]
+
+        if not repos:
+            return []
+
+        where = [f"owner = ? AND repo IN ({', '.join('?' * len(repos))})"]
+        args: List[object] = [owner, *repos]
+        if state != "all":
+            where.append("state = ?")
+            args.append(state)
+        if since is not None:
+            where.append("updated_ts >= ?")
+            args.append(int(since.timestamp()))
+        where.append(f"title NOT IN ({', '.join('?' * len(Issue.IGNORE_TITLES))})")
+        args.extend(sorted(Issue.IGNORE_TITLES))
+
+        sql = f"SELECT {self._LIST_COLUMNS} FROM issues WHERE {' AND '.join(where)} ORDER BY {order_sql}"
+        with self._lock:
+            rows = self._conn.execute(sql, args).fetchall()
+        return [(row["repo"], self._as_record(row)) for row in rows]
+
+    def query(
+        self,
+        owner: str,
+        repos: List[str],
+        *,
+        state: str = "all",
+        since: Optional[datetime] = None,
+        order: str = "updated",
+    ) -> Dict[str, List[IssueRecord]]:
+        """Same as `items`, grouped per repo (keys in `repos` order)."""
+        out: Dict[str, List[IssueRecord]] = {repo: [] for repo in repos}
+        for repo, issue in self.items(owner, repos, state=state, since=since, order=order):
+            out[repo].append(issue)
         return out
 
 
@@ -350,7 +931,14 @@ class Issue:
 
 class MarkdownRenderer:
     @staticmethod
-    def render_snapshot(cfg: CollectorConfig, by_repo: Dict[str, List[Dict]]) -> str:
+    def without_generated(md: str) -> str:
+        """Snapshot text minus its timestamp line, for no-op write detection."""
+        return "\n".join(line for line in md.splitlines() if not line.startswith("- Generated: "))
+
+    @staticmethod
+    def render_snapshot(cfg: CollectorConfig, store: IssueStore, cutoff: Optional[datetime]) -> str:
+        by_repo = store.query(cfg.owner, cfg.repos, state=cfg.state, since=cutoff)
+
         now_local = datetime.now().astimezone().strftime("%Y-%m-%d %H:%M")
         lines: List[str] = []
         lines.append("# Forgejo Issues Snapshot")
@@ -415,40 +1003,15 @@ class BacklogUpdater:
     _SECTION_HEADER = "## BACKLOG - Issues"
 
     @staticmethod
-    def _find_section_range(md: str, header: str) -> Optional[tuple[int, int]]:
-        """Return (start_idx, end_idx) slice for the whole section, or None."""
-        lines = md.splitlines(keepends=True)
-
-        start_line = None
-        for i, line in enumerate(lines):
-            if line.strip() == header:
-                start_line = i
-                break
-
-        if start_line is None:
-            return None
-
-        end_line = len(lines)
-        for j in range(start_line + 1, len(lines)):
-            if lines[j].startswith("## "):
-                end_line = j
-                break
-
-        start_idx = sum(len(l) for l in lines[:start_line])
-        end_idx = sum(len(l) for l in lines[:end_line])
-        return start_idx, end_idx
+    def _insert_before(doc: MarkdownDocument) -> Optional[str]:
+        """Insert before the first '## Automation...' section if present, else append."""
+        for header in doc.headers:
+            if header.startswith("## Automation"):
+                return header
+        return None
 
     @staticmethod
-    def _insert_pos(md: str) -> int:
-        """Insert before '## Automation' if present, else append."""
-        needle = "\n## Automation"
-        idx = md.find(needle)
-        if idx >= 0:
-            return idx + 1  # keep leading newline
-        return len(md)
-
-    @staticmethod
-    def _render_issue_block(repo: str, issue: Dict) -> str:
+    def _render_issue_block(repo: str, issue: IssueRecord) -> str:
         iid = Issue.id(issue)
         title = Issue.title(issue)
         url = Issue.html_url(issue)
@@ -477,35 +1040,14 @@ class BacklogUpdater:
         return "\n".join(out) + "\n\n"
 
     @staticmethod
-    def _sort_key(issue: Dict) -> tuple:
-        # open first, then closed; then updated_at desc; then id desc
-        state = Issue.state(issue)
-        state_rank = 0 if state == "open" else 1
-
-        updated = Issue.updated_at(issue)
-        try:
-            updated_ts = Iso.parse(updated).timestamp() if updated else 0
-        except Exception:
-            updated_ts = 0
-
-        iid = Issue.id(issue) or 0
-        return (state_rank, -updated_ts, -iid)
-
-    @staticmethod
-    def update_backlog(cfg: CollectorConfig, by_repo: Dict[str, List[Dict]]) -> None:
+    def update_backlog(cfg: CollectorConfig, store: IssueStore, cutoff: Optional[datetime]) -> WriteResult:
         backlog_path = cfg.personal_backlog_file
         md = backlog_path.read_text(encoding="utf-8") if backlog_path.exists() else ""
 
-        blocks: List[str] = []
-        blocks.append(BacklogUpdater._SECTION_HEADER + "\n")
-        blocks.append("\n")
-
-        all_items: List[tuple[str, Dict]] = []
-        for repo, items in by_repo.items():
-            for it in items:
-                all_items.append((repo, it))
+        blocks: List[str] = ["\n"]
 
-        all_items.sort(key=lambda x: BacklogUpdater._sort_key(x[1]))
+        # open first, then closed; then updated_at desc; then id desc
+        all_items = store.items(cfg.owner, cfg.repos, state=cfg.state, since=cutoff, order="backlog")
 
         if not all_items:
             blocks.append("- (none)\n")
@@ -513,18 +1055,16 @@ class BacklogUpdater:
             for repo, it in all_items:
                 blocks.append(BacklogUpdater._render_issue_block(repo, it))
 
-        new_section = "".join(blocks).rstrip() + "\n\n"
+        new_body = "".join(blocks).rstrip() + "\n\n"
 
-        rng = BacklogUpdater._find_section_range(md, BacklogUpdater._SECTION_HEADER)
-        if rng:
-            start, end = rng
-            md2 = md[:start] + new_section + md[end:]
+        doc = MarkdownDocument.parse(md)
+        header = BacklogUpdater._SECTION_HEADER
+        if doc.has(header):
+            doc.set_body(header, new_body)
         else:
-            pos = BacklogUpdater._insert_pos(md)
-            sep = "\n" if md and not md.endswith("\n") else ""
-            md2 = md[:pos] + sep + new_section + md[pos:]
+            doc.insert(header, new_body, before=BacklogUpdater._insert_before(doc))
 
-        backlog_path.write_text(md2, encoding="utf-8")
+        return write_text_if_changed(backlog_path, doc.render(), previous=md if backlog_path.exists() else None)
 
 
 # -----------------------------------------------------------------------------
@@ -535,7 +1075,7 @@ class BacklogUpdater:
 class CrmIssueBacklogRenderer:
     """Render an Issue block template for OF1_Crm backlog (numbering applied later)."""
 
-    def render_template(self, repo: str, issue: Dict) -> str:
+    def render_template(self, repo: str, issue: IssueRecord) -> str:
         state = Issue.state(issue)
         if state == "open":
             tag = "In Progress"
@@ -569,155 +1109,80 @@ class CrmIssueBacklogRenderer:
 class CrmIssueBacklogUpdater:
     """Update OF1_Crm backlog by syncing issue blocks under `## [Unreleased]`.
 
-    Key behavior (the original intent):
-    - Append/update issue blocks.
-    - Detect duplicates by issue id in URL (`/issues/<id>`).
-
-    IMPORTANT FIX:
-    - When we run with a cutoff window (DAYS_BACK != None), the API result is partial.
-      In that mode we must NOT prune existing blocks that fall outside the window,
-      otherwise we can wipe the whole section when "0 issues" are fetched.
+    Blocks for every stored issue of the configured repos (any state, full
+    history, not just the fetched window) are re-rendered from the local issue
+    store. Existing blocks the store does not know (hand-written entries, repos
+    dropped from FORGEJO_REPOS) are never pruned: they are kept as-is and merged
+    into the same order (In Progress first, then date desc, then id desc).
     """
 
     SECTION_ISSUES = "## [Unreleased]"
+    _BLOCK_RE = re.compile(r"(?ms)^####\s+\d+\.\s+\[[^\]]+\]\s+-\s+.*?(?=^####\s+\d+\.\s+\[|\Z)")
+    # Only the block's own Link line: issue bodies (rendered above it) may cite other issues.
+    _LINK_RE = re.compile(r"^\s*\*\*Link:\*\*\s*(\S+)", re.MULTILINE)
+    _NUMBER_RE = re.compile(r"/issues/(\d+)\b")
+    _TAG_RE = re.compile(r"\[(\d{4}-\d{2}-\d{2}|In Progress)\]")
 
-    def __init__(self, path: Path, renderer: CrmIssueBacklogRenderer, *, prune_stale: bool):
+    def __init__(self, path: Path, renderer: CrmIssueBacklogRenderer):
         self._path = path
         self._renderer = renderer
-        self._prune_stale = prune_stale
 
-    def sync(self, by_repo: Dict[str, List[Dict]]) -> None:
+    def sync(self, cfg: CollectorConfig, store: IssueStore) -> WriteResult:
         text = self._path.read_text(encoding="utf-8")
 
-        # Normalize legacy header names/levels
-        text = text.replace("## Issues", self.SECTION_ISSUES)
-        text = text.replace("### [Unreleased]", self.SECTION_ISSUES)
-
-        text = self._ensure_section(text, self.SECTION_ISSUES)
-
-        items: List[Tuple[str, Dict]] = []
-        for repo, issues in by_repo.items():
-            for it in issues:
-                items.append((repo, it))
-
-        issues_body = self._build_section_body(text, self.SECTION_ISSUES, items)
-        text = self._replace_section_body(text, self.SECTION_ISSUES, issues_body)
-
-        self._path.write_text(text, encoding="utf-8")
-        print(f"✅ CRM backlog updated: {self._path}")
-
-    @staticmethod
-    def _ensure_section(text: str, header: str) -> str:
-        if header in text:
-            return text
-
-        # Insert after first H1 if possible, else append
-        import re
-
-        m = re.search(r"^#\s+.*$", text, flags=re.M)
-        insert_at = m.end(0) + 1 if m else len(text)
-        return text[:insert_at] + f"\n\n{header}\n\n" + text[insert_at:]
-
-    @staticmethod
-    def _get_section_body(text: str, header: str) -> str:
-        import re
-
-        start = text.find(header)
-        if start == -1:
-            return ""
-
-        start_line_end = text.find("\n", start)
-        body_start = start_line_end + 1 if start_line_end != -1 else len(text)
-
-        m_next = re.search(r"^##\s+", text[body_start:], flags=re.M)
-        body_end = body_start + m_next.start(0) if m_next else len(text)
-        return text[body_start:body_end]
-
-    @staticmethod
-    def _replace_section_body(text: str, header: str, new_body: str) -> str:
-        import re
-
-        start = text.find(header)
-        if start == -1:
-            return text
-
-        start_line_end = text.find("\n", start)
-        body_start = start_line_end + 1 if start_line_end != -1 else len(text)
+        # Normalize legacy header names/levels while tokenizing
+        doc = MarkdownDocument.parse(
+            text,
+            aliases={"## Issues": self.SECTION_ISSUES, "### [Unreleased]": self.SECTION_ISSUES},
+        )
 
-        m_next = re.search(r"^##\s+", text[body_start:], flags=re.M)
-        body_end = body_start + m_next.start(0) if m_next else len(text)
+        if not doc.has(self.SECTION_ISSUES):
+            # Insert right after the H1 (as the first section) if there is one, else append
+            has_h1 = any(line.startswith("# ") for line in doc.preamble.splitlines())
+            doc.insert(self.SECTION_ISSUES, "\n", index=0 if has_h1 else None)
 
-        before = text[:body_start]
-        after = text[body_end:]
+        # Every state: closing an issue (or running with --state open) must not drop its block
+        items = store.items(cfg.owner, cfg.repos, state="all", order="crm")
+        issues_body = self._build_section_body(items, doc.body(self.SECTION_ISSUES) or "")
 
-        nb = new_body.rstrip() + "\n"
+        nb = issues_body.rstrip() + "\n"
         if nb.strip():
             nb = "\n" + nb
+        doc.set_body(self.SECTION_ISSUES, nb)
 
-        prefix = before if before.endswith("\n") else before + "\n"
-        return prefix + nb + after
-
-    @staticmethod
-    def _extract_blocks_by_id(body: str) -> Dict[int, str]:
-        """Map ISSUE_ID -> template block (normalize numbering to #### {n}.)"""
-        import re
-
-        block_re = re.compile(r"(?ms)^####\s+\d+\.\s+\[[^\]]+\]\s+-\s+.*?(?=^####\s+\d+\.\s+\[|^##\s+|\Z)")
-
-        out: Dict[int, str] = {}
-        for m in block_re.finditer(body):
-            blk = m.group(0)
-            blk = re.sub(r"^####\s+\d+\.", "#### {n}.", blk, flags=re.M)
-            m_id = re.search(r"/issues/(\d+)\b", blk)
-            if not m_id:
-                continue
-            iid = int(m_id.group(1))
-            out[iid] = blk.strip()
-        return out
-
-    def _build_section_body(self, full_text: str, header: str, items: List[Tuple[str, Dict]]) -> str:
-        section_body = self._get_section_body(full_text, header)
-        by_id = self._extract_blocks_by_id(section_body)
-
-        fetched_ids: set[int] = set()
+        return write_text_if_changed(self._path, doc.render(), previous=text)
 
+    def _build_section_body(self, items: List[Tuple[str, IssueRecord]], old_body: str) -> str:
+        blocks: List[str] = []
+        known_urls = set()
         for repo, issue in items:
-            iid = Issue.id(issue)
-            if iid is None:
-                continue
-            fetched_ids.add(iid)
-
-            tmpl = self._renderer.render_template(repo, issue).strip()
-            if by_id.get(iid, "").strip() != tmpl:
-                by_id[iid] = tmpl
+            known_urls.add(Issue.html_url(issue))
+            blocks.append(self._renderer.render_template(repo, issue).strip())
 
-        # Remove stale entries only when we believe we have a full view.
-        # If we're running with a cutoff window (partial fetch), keep existing blocks.
-        if self._prune_stale:
-            for existing_id in list(by_id.keys()):
-                if existing_id not in fetched_ids:
-                    by_id.pop(existing_id, None)
-
-        # Sort: In Progress first, then date desc, then id desc
-        sorted_items = sorted(by_id.items(), key=self._crm_sort_key, reverse=True)
+        kept = 0
+        for m in self._BLOCK_RE.finditer(old_body):
+            url = self._LINK_RE.search(m.group(0))
+            if url and url.group(1) in known_urls:
+                continue
+            blocks.append(re.sub(r"^####\s+\d+\.", "#### {n}.", m.group(0).strip(), count=1))
+            kept += 1
+        if kept:
+            print(f"ℹ️  CRM backlog: kept {kept} existing blocks not in the issue store")
 
         rebuilt: List[str] = []
-        for i, (_, tmpl) in enumerate(sorted_items, start=1):
+        for i, tmpl in enumerate(sorted(blocks, key=self._sort_key, reverse=True), start=1):
             # Do NOT use str.format here because issue bodies may contain '{...}'
             rebuilt.append(tmpl.replace("{n}", str(i)).rstrip())
 
         return "\n\n".join(rebuilt).rstrip()
 
-    @staticmethod
-    def _crm_sort_key(item: Tuple[int, str]) -> Tuple[str, int]:
-        import re
-
-        iid, blk = item
-        m = re.search(r"\[(\d{4}-\d{2}-\d{2}|In Progress)\]", blk)
-        tag = m.group(1) if m else "In Progress"
-
-        tag_key = "9999-99-99" if tag == "In Progress" else tag
-        return (tag_key, iid)
+    @classmethod
+    def _sort_key(cls, block: str) -> Tuple[str, int]:
+        tag = cls._TAG_RE.search(block.split("\n", 1)[0])
+        tag_key = "9999-99-99" if not tag or tag.group(1) == "In Progress" else tag.group(1)
+        link = cls._LINK_RE.search(block)
+        number = cls._NUMBER_RE.search(link.group(1)) if link else None
+        return (tag_key, int(number.group(1)) if number else 0)
 
 
 # -----------------------------------------------------------------------------
@@ -725,14 +1190,43 @@ class CrmIssueBacklogUpdater:
 # -----------------------------------------------------------------------------
 
 
+class CollectorCancelled(Exception):
+    """Raised inside a run after `App.cancel()`."""
+
+
+@dataclass
+class CollectorResult:
+    changed_by_repo: Dict[str, int]  # issues upserted per repo this run
+    outputs: Dict[str, WriteResult]  # "snapshot" / "backlog" / "crm" -> write result
+    timings: Dict[str, float] = field(default_factory=dict)  # phase -> seconds
+
+    @property
+    def fetched(self) -> int:
+        return sum(self.changed_by_repo.values())
+
+    @property
+    def changed_issues(self) -> int:
+        """Issues whose backlog block changed (the larger of personal / CRM backlog)."""
+        return max((r.total_changes for k, r in self.outputs.items() if k != "snapshot"), default=0)
+
+
 class App:
-    def __init__(self, cfg: CollectorConfig):
+    def __init__(
+        self,
+        cfg: CollectorConfig,
+        *,
+        client: Optional[ForgejoClient] = None,
+        classifier: Optional[AIClassifier] = None,
+    ):
         self._cfg = cfg
-        self._client = ForgejoClient(cfg.base_url, cfg.token)
+        # A caller-supplied client is long-lived: flushed after a run, never closed here.
+        self._owns_client = client is None
+        self._client = client or ForgejoClient.from_config(cfg)
+        self._cancelled = threading.Event()
 
         # Initialize AI classifier if available
-        self._classifier: Optional[AIClassifier] = None
-        if AI_AVAILABLE:
+        self._classifier: Optional[AIClassifier] = classifier
+        if self._classifier is None and AI_AVAILABLE:
             try:
                 provider = os.getenv("AI_PROVIDER", "ollama")
                 self._classifier = AIClassifier(provider=provider)
@@ -741,64 +1235,183 @@ class App:
                 print(f"⚠️  AI Classifier unavailable: {e}")
                 print("   Falling back to rule-based classification")
 
+    @property
+    def classifier(self) -> Optional[AIClassifier]:
+        return self._classifier
+
+    def cancel(self) -> None:
+        """Ask a running `run()` (possibly in another thread) to stop early."""
+        self._cancelled.set()
+
     def _cutoff(self) -> Optional[datetime]:
         if self._cfg.days_back is None:
             return None
         return datetime.now(timezone.utc) - timedelta(days=int(self._cfg.days_back))
 
-    def run(self) -> None:
+    @staticmethod
+    def _format_since(dt: datetime) -> str:
+        return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    def _sync_repo(
+        self,
+        store: IssueStore,
+        repo: str,
+        entry: Optional[Dict[str, Optional[str]]],
+        floor: Optional[datetime],
+        *,
+        limit: int = 100,
+    ) -> Tuple[int, Dict[str, Optional[str]]]:
+        """Fetch the delta for one repo into `store`; returns (changed count, new sync entry).
+
+        Always fetches state=all so open→closed (and back) transitions reach the
+        store; the configured state is applied when reading the store. Records are
+        upserted page by page, so memory stays at one page regardless of history size.
+        """
+        if not self._cfg.full_sync and SyncState.covers(entry, floor):
+            since_dt: Optional[datetime] = Iso.parse(str(entry["cursor"]))
+            complete_from = entry.get("complete_from")
+        else:
+            since_dt = floor
+            complete_from = self._format_since(floor) if floor else None
+
+        since = self._format_since(since_dt) if since_dt else None
+        cursor = entry.get("cursor") if entry else None
+        cursor_dt = Iso.parse(cursor) if cursor else None
+
+        changed = 0
+        batch: List[IssueRecord] = []
+        for issue in self._client.iter_issues(self._cfg.owner, repo, "all", limit=limit, since=since):
+            if self._cancelled.is_set():
+                raise CollectorCancelled(repo)
+
+            updated_dt: Optional[datetime] = None
+            if issue.updated_at:
+                try:
+                    updated_dt = Iso.parse(issue.updated_at)
+                except Exception:
+                    pass
+
+            # Sorted by updated desc: everything after this is older too.
+            if since_dt and updated_dt and updated_dt < since_dt:
+                break
+
+            batch.append(issue)
+            if updated_dt and (cursor_dt is None or updated_dt > cursor_dt):
+                cursor, cursor_dt = issue.updated_at, updated_dt
+
+            if len(batch) >= limit:
+                changed += store.upsert(self._cfg.owner, repo, batch)
+                batch = []
+
+        changed += store.upsert(self._cfg.owner, repo, batch)
+        return changed, {"cursor": cursor or since, "complete_from": complete_from}
+
+    def _timed_sync_repo(self, store: IssueStore, repo: str, *args) -> Tuple[int, Dict[str, Optional[str]]]:
+        with metrics.timer("collector_repo_sync_seconds", repo=repo):
+            return self._sync_repo(store, repo, *args)
+
+    def _fetch_all(self, store: IssueStore, floor: Optional[datetime]) -> Dict[str, int]:
+        """Sync every configured repo concurrently into `store`; returns changed counts."""
+        sync_state = SyncState(self._cfg.data_dir / "forgejo_sync_state.json")
+        owner = self._cfg.owner
+
+        workers = min(self._cfg.concurrency, len(self._cfg.repos)) or 1
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="forgejo") as pool:
+            futures = {}
+            for repo in self._cfg.repos:
+                # A cursor without stored rows (e.g. a fresh store) must not skip history.
+                entry = sync_state.get(f"{owner}/{repo}") if store.count(owner, repo) else None
+                print(f"📥 Fetching issues from {repo}...")
+                futures[repo] = pool.submit(self._timed_sync_repo, store, repo, entry, floor)
+
+            changed_by_repo: Dict[str, int] = {}
+            for repo in self._cfg.repos:
+                changed, entry = futures[repo].result()
+                changed_by_repo[repo] = changed
+                sync_state.set(f"{owner}/{repo}", cursor=entry["cursor"], complete_from=entry["complete_from"])
+                print(f"   ✓ {repo}: {changed} changed")
+
+        sync_state.save()
+        return changed_by_repo
+
+    def run(self) -> CollectorResult:
         print("🚀 Forgejo Issue Collector")
         print("=" * 50)
+        started = time.perf_counter()
+        timings: Dict[str, float] = {}
+        outputs: Dict[str, WriteResult] = {}
 
         cutoff = self._cutoff()
         if cutoff:
             print(f"🕒 Filtering: updated_at >= {cutoff.isoformat()}")
 
-        by_repo: Dict[str, List[Dict]] = {}
-
-        for repo in self._cfg.repos:
-            print(f"📥 Fetching issues from {repo}...")
-            items: List[Dict] = []
-            for issue in self._client.iter_issues(self._cfg.owner, repo, self._cfg.state):
-                # Safety: ensure PRs are excluded even if server ignores type param
-                if issue.get("pull_request") is not None:
-                    continue
-
-                # Ignore internal tracking/meta tasks by title
-                if Issue.should_ignore(issue):
-                    continue
-
-                if cutoff:
-                    updated_at = Issue.updated_at(issue)
-                    if updated_at:
-                        try:
-                            if Iso.parse(updated_at) < cutoff:
-                                continue
-                        except Exception:
-                            pass
-                items.append(issue)
-
-            print(f"   ✓ Found {len(items)} issues")
-            by_repo[repo] = items
-
-        content = MarkdownRenderer.render_snapshot(self._cfg, by_repo)
-        self._cfg.output_file.parent.mkdir(parents=True, exist_ok=True)
-        self._cfg.output_file.write_text(content, encoding="utf-8")
-        print(f"✅ Wrote snapshot: {self._cfg.output_file}")
-
-        BacklogUpdater.update_backlog(self._cfg, by_repo)
-        print(f"✅ Backlog updated: {self._cfg.personal_backlog_file}")
-
-        if self._cfg.crm_backlog_file:
-            # If DAYS_BACK is set, we only fetched a partial window → do not prune older entries.
-            prune_stale = self._cfg.days_back is None
-            CrmIssueBacklogUpdater(
-                self._cfg.crm_backlog_file,
-                CrmIssueBacklogRenderer(),
-                prune_stale=prune_stale,
-            ).sync(by_repo)
+        # The CRM backlog renders full history, so the store must cover all of it
+        # (a one-time backfill; later runs are incremental either way).
+        floor = None if self._cfg.crm_backlog_file else cutoff
 
+        store = IssueStore(self._cfg.data_dir / "forgejo_issues.sqlite3")
+        try:
+            try:
+                changed_by_repo = self._fetch_all(store, floor)
+            finally:
+                if self._owns_client:
+                    self._client.close()
+                else:
+                    self._client.flush()
+            timings["fetch"] = time.perf_counter() - started
+
+            self._check_cancelled("before rendering")
+            content = MarkdownRenderer.render_snapshot(self._cfg, store, cutoff)
+            snapshot = write_text_if_changed(
+                self._cfg.output_file,
+                content,
+                normalize=MarkdownRenderer.without_generated,
+            )
+            self._report("Snapshot", snapshot)
+            outputs["snapshot"] = snapshot
+
+            self._check_cancelled("before BACKLOG")
+            backlog = BacklogUpdater.update_backlog(self._cfg, store, cutoff)
+            self._report("Backlog", backlog)
+            outputs["backlog"] = backlog
+
+            if self._cfg.crm_backlog_file:
+                self._check_cancelled("before CRM backlog")
+                crm = CrmIssueBacklogUpdater(
+                    self._cfg.crm_backlog_file,
+                    CrmIssueBacklogRenderer(),
+                ).sync(self._cfg, store)
+                self._report("CRM backlog", crm)
+                outputs["crm"] = crm
+        finally:
+            store.close()
+
+        timings["render"] = time.perf_counter() - started - timings["fetch"]
+        timings["total"] = time.perf_counter() - started
+        result = CollectorResult(changed_by_repo=changed_by_repo, outputs=outputs, timings=timings)
+        for phase, seconds in timings.items():
+            metrics.observe("collector_phase_seconds", seconds, phase=phase)
+        for repo, n in changed_by_repo.items():
+            metrics.inc("collector_issues_fetched_total", n, repo=repo)
+        metrics.inc("collector_backlog_changes_total", result.changed_issues)
+
+        print(f"📝 Changed issues: {result.changed_issues}")
         print("✨ Done!")
+        return result
+
+    def _check_cancelled(self, where: str) -> None:
+        # Each output file is written atomically; stopping between them leaves
+        # every file either fully old or fully new.
+        if self._cancelled.is_set():
+            raise CollectorCancelled(where)
+
+    @staticmethod
+    def _report(label: str, result: WriteResult) -> None:
+        if not result.changed:
+            print(f"⏭️  {label} unchanged: {result.path}")
+            return
+        detail = ", ".join(f"{header}: {n}" for header, n in result.sections.items())
+        print(f"✅ {label} updated: {result.path}" + (f" ({detail})" if detail else ""))
 
 
 def main() -> None:
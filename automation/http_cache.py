@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""On-disk HTTP response cache with conditional requests (ETag / If-Modified-Since)
+
+Sits under API clients (e.g. ForgejoClient) that issue repeated GETs against the
+same URLs. For every URL+params it remembers the validators from the last 200
+response and sends them back as `If-None-Match` / `If-Modified-Since`; a 304 is
+served from the cached body on disk, so unchanged pages cost a header exchange
+instead of a full download + server-side render.
+
+Layout (under the cache directory):
+- index.json      URL key -> {url, etag, last_modified, size, atime}
+- <key>.body      raw response body bytes
+
+The cache is bounded by total body size; least-recently-used entries are evicted
+first. The index is flushed on `flush()` (clients call it from `close()`); entries
+whose body file is missing are dropped on load.
+
+Usage:
+    cache = HttpCache(Path("data/http_cache"), max_bytes=64 * 1024 * 1024)
+    resp = cache.get(session, url, params={"page": 1}, timeout=30)
+    data = json.loads(resp.content)
+    cache.flush()
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Mapping, Optional
+from urllib.parse import urlencode
+
+import requests
+
+from atomic_io import atomic_write_bytes, atomic_write_text
+
+
+@dataclass
+class CachedResponse:
+    status_code: int  # status of the network exchange (200 or 304)
+    content: bytes
+    from_cache: bool
+
+
+class HttpCache:
+    """Conditional-GET cache persisted on disk with size-bounded LRU eviction."""
+
+    INDEX_FILE = "index.json"
+
+    def __init__(self, directory: Path, max_bytes: int = 64 * 1024 * 1024):
+        self._dir = directory
+        self._max_bytes = max(0, int(max_bytes))
+        self._lock = threading.Lock()
+        self._index: Dict[str, Dict] = {}
+        self._total = 0
+        self._dirty = False
+
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._load()
+
+    # ------------------------------------------------------------------
+    # Index persistence
+    # ------------------------------------------------------------------
+
+    def _load(self) -> None:
+        path = self._dir / self.INDEX_FILE
+        if not path.exists():
+            return
+        try:
+            index = json.loads(path.read_text(encoding="utf-8"))
+        except Exception:
+            return
+
+        for key, entry in index.items():
+            if (self._dir / f"{key}.body").exists():
+                self._index[key] = entry
+                self._total += int(entry.get("size") or 0)
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = json.dumps(self._index, sort_keys=True)
+            self._dirty = False
+
+        atomic_write_text(self._dir / self.INDEX_FILE, payload)
+
+    # ------------------------------------------------------------------
+    # Entries
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def key(url: str, params: Optional[Mapping[str, object]] = None) -> str:
+        query = urlencode(sorted((str(k), str(v)) for k, v in (params or {}).items()))
+        return hashlib.sha256(f"{url}?{query}".encode("utf-8")).hexdigest()
+
+    def _body_path(self, key: str) -> Path:
+        return self._dir / f"{key}.body"
+
+    def _read_body(self, key: str) -> Optional[bytes]:
+        try:
+            return self._body_path(key).read_bytes()
+        except OSError:
+            return None
+
+    def _store(self, key: str, url: str, resp: requests.Response) -> None:
+        etag = resp.headers.get("ETag")
+        last_modified = resp.headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+
+        body = resp.content
+        if len(body) > self._max_bytes:
+            return
+
+        atomic_write_bytes(self._body_path(key), body)
+
+        with self._lock:
+            old = self._index.get(key)
+            if old:
+                self._total -= int(old.get("size") or 0)
+            self._index[key] = {
+                "url": url,
+                "etag": etag,
+                "last_modified": last_modified,
+                "size": len(body),
+                "atime": time.time(),
+            }
+            self._total += len(body)
+            self._dirty = True
+            self._evict_locked()
+
+    def _evict_locked(self) -> None:
+        if self._total <= self._max_bytes:
+            return
+        for key, entry in sorted(self._index.items(), key=lambda kv: kv[1].get("atime", 0)):
+            if self._total <= self._max_bytes:
+                break
+            self._total -= int(entry.get("size") or 0)
+            del self._index[key]
+            self._body_path(key).unlink(missing_ok=True)
+
+    def _drop(self, key: str) -> None:
+        with self._lock:
+            entry = self._index.pop(key, None)
+            if entry:
+                self._total -= int(entry.get("size") or 0)
+                self._dirty = True
+        self._body_path(key).unlink(missing_ok=True)
+
+    # ------------------------------------------------------------------
+    # Requests
+    # ------------------------------------------------------------------
+
+    def get(
+        self,
+        session: requests.Session,
+        url: str,
+        *,
+        params: Optional[Mapping[str, object]] = None,
+        timeout: float = 30,
+    ) -> CachedResponse:
+        """GET with conditional headers; raises for HTTP errors like `raise_for_status`."""
+        key = self.key(url, params)
+
+        with self._lock:
+            entry = dict(self._index.get(key) or {})
+
+        headers: Dict[str, str] = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+        resp = session.get(url, params=params, headers=headers, timeout=timeout)
+
+        if resp.status_code == 304 and entry:
+            body = self._read_body(key)
+            if body is not None:
+                with self._lock:
+                    if key in self._index:
+                        self._index[key]["atime"] = time.time()
+                        self._dirty = True
+                return CachedResponse(status_code=304, content=body, from_cache=True)
+
+            # Body vanished underneath us: refetch unconditionally.
+            self._drop(key)
+            resp = session.get(url, params=params, timeout=timeout)
+
+        resp.raise_for_status()
+        if self._max_bytes:
+            self._store(key, url, resp)
+        return CachedResponse(status_code=resp.status_code, content=resp.content, from_cache=False)
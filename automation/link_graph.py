@@ -0,0 +1,553 @@
+#!/usr/bin/env python3
+"""Wiki Link Graph
+
+One persistent index of every link in the wiki, built in a single pass and kept
+up to date incrementally:
+- sources: markdown files (`[text](path)`, `![alt](img)`, `[[wikilink]]`,
+  `[[note|alias]]`, `[[note#heading]]`, `![[embed]]`), Obsidian canvases (file
+  nodes + links inside text nodes) and `.base` files (wikilinks only);
+- links inside code fences, inline code and the YAML frontmatter are ignored;
+- targets are resolved the way Obsidian does: paths relative to the source file
+  or the vault root (the nearest folder with `.obsidian/`), else by file name
+  anywhere in the vault (closest / shortest path wins when ambiguous); any file
+  type can be a target, so attachment embeds resolve too;
+- `update()` stats the tree and re-parses only new/changed files (mtime + size),
+  so a rebuild after editing one note parses one note.
+
+Lookups are dict reads: `links(path)` (forward), `backlinks(path)`, plus
+`related(path)` (ranked by direct links both ways, then shared neighbours) and
+`broken()` (every link whose target does not exist). `retarget({old: new})`
+rewrites every link to `old` in place (used by attachment deduplication).
+
+The index is saved as JSON (default: data/link_graph.json); resolution is
+recomputed on load, which is cheap.
+
+Usage:
+    python link_graph.py build               # scan/update the index
+    python link_graph.py related wiki/projects/bf1-index.md
+    python link_graph.py backlinks wiki/projects/bf1-index.md
+    python link_graph.py broken              # broken-link report
+
+    from link_graph import LinkGraph
+    graph = LinkGraph.load(index_path, root)
+    graph.update(); graph.save()
+    graph.backlinks("wiki/projects/bf1-index.md")
+"""
+
+from __future__ import annotations
+
+import argparse
+import bisect
+import json
+import os
+import posixpath
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import quote, unquote
+
+from atomic_io import atomic_write_text
+
+DOC_EXTS = (".md", ".canvas", ".base")
+SKIP_DIRS = {"automation", "node_modules", "__pycache__"}
+
+_FENCE_RE = re.compile(r"^(`{3,}|~{3,}).*?^\1[ \t]*$", re.MULTILINE | re.DOTALL)
+_INLINE_CODE_RE = re.compile(r"`[^`\n]*`")
+_FRONTMATTER_RE = re.compile(r"\A---\n.*?\n---[ \t]*(\n|\Z)", re.DOTALL)
+_WIKILINK_RE = re.compile(r"(!?)\[\[([^\[\]\n]+?)\]\]")
+_MDLINK_RE = re.compile(r"(!?)\[[^\]\n]*\]\(\s*(?:<([^>\n]+)>|([^)\s]+))(?:\s+[\"'][^\"'\n]*[\"'])?\s*\)")
+_SCHEME_RE = re.compile(r"^[a-zA-Z][a-zA-Z0-9+.-]*:")
+_CANVAS_FIELD_RE = re.compile(r'("(file|text)"\s*:\s*)("(?:[^"\\]|\\.)*")')
+
+# (kind, raw target, line)
+RawLink = Tuple[str, str, int]
+
+
+@dataclass
+class Link:
+    source: str
+    raw: str
+    kind: str  # link | embed | wikilink | wikiembed | canvas
+    line: int
+    target: Optional[str]  # resolved path relative to the graph root, None if broken
+
+
+def _blank(match: "re.Match[str]") -> str:
+    # Keep newlines so line numbers of later links stay right.
+    return "\n" * match.group(0).count("\n")
+
+
+def parse_markdown(text: str) -> List[RawLink]:
+    """Links in a markdown document, ignoring code and frontmatter."""
+    text = _FRONTMATTER_RE.sub(_blank, text, count=1)
+    text = _FENCE_RE.sub(_blank, text)
+    text = _INLINE_CODE_RE.sub("", text)
+
+    out: List[RawLink] = []
+    for lineno, line in enumerate(text.split("\n"), 1):
+        if "[" not in line:
+            continue
+        for m in _WIKILINK_RE.finditer(line):
+            target = m.group(2).split("|", 1)[0].split("#", 1)[0].split("^", 1)[0].strip()
+            if target:
+                out.append(("wikiembed" if m.group(1) else "wikilink", target, lineno))
+        for m in _MDLINK_RE.finditer(line):
+            target = m.group(2) or m.group(3)
+            if target.startswith("#") or _SCHEME_RE.match(target):
+                continue
+            target = unquote(target.split("#", 1)[0])
+            if target:
+                out.append(("embed" if m.group(1) else "link", target, lineno))
+    return out
+
+
+def parse_canvas(text: str) -> List[RawLink]:
+    """File nodes and links inside text nodes of an Obsidian canvas."""
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return []
+    out: List[RawLink] = []
+    for node in data.get("nodes", []):
+        if node.get("type") == "file" and node.get("file"):
+            out.append(("canvas", node["file"], 0))
+        elif node.get("type") == "text" and node.get("text"):
+            out.extend((kind, raw, 0) for kind, raw, _ in parse_markdown(node["text"]))
+    return out
+
+
+# replace(kind, raw target) -> new target, or None to leave the link alone
+Replacer = Callable[[str, str], Optional[str]]
+
+
+def _code_spans(text: str) -> List[Tuple[int, int]]:
+    """Sorted (start, end) of the frontmatter, code fences and inline code, the
+    spans `parse_markdown` ignores."""
+    spans: List[Tuple[int, int]] = []
+
+    def mask(m: "re.Match[str]") -> str:
+        # Same length, so later spans index the original text.
+        spans.append(m.span())
+        return re.sub(r"[^\n]", " ", m.group(0))
+
+    masked = _FRONTMATTER_RE.sub(mask, text, count=1)
+    masked = _FENCE_RE.sub(mask, masked)
+    spans.extend(m.span() for m in _INLINE_CODE_RE.finditer(masked))
+    return sorted(spans)
+
+
+def _overlaps(spans: List[Tuple[int, int]], start: int, end: int) -> bool:
+    i = bisect.bisect_left(spans, (end,)) - 1
+    return i >= 0 and spans[i][1] > start
+
+
+def rewrite_markdown(text: str, replace: Replacer) -> str:
+    """Rewrite link targets in markdown, keeping aliases, fragments and titles.
+
+    Links inside code and the frontmatter are left alone, as `parse_markdown`
+    does not see them either.
+    """
+    spans: List[Tuple[int, int]] = []
+
+    def wiki(m: "re.Match[str]") -> str:
+        if _overlaps(spans, *m.span()):
+            return m.group(0)
+        inner = m.group(2)
+        cut = min([inner.find(c) for c in "|#^" if c in inner] or [len(inner)])
+        new = replace("wikiembed" if m.group(1) else "wikilink", inner[:cut].strip())
+        return m.group(0) if new is None else f"{m.group(1)}[[{new}{inner[cut:]}]]"
+
+    def md(m: "re.Match[str]") -> str:
+        group = 2 if m.group(2) is not None else 3  # <angle form> may hold spaces
+        raw = m.group(group)
+        if _overlaps(spans, m.start(), m.start() + 1) or _overlaps(spans, *m.span(group)):
+            return m.group(0)
+        if raw.startswith("#") or _SCHEME_RE.match(raw):
+            return m.group(0)
+        target, hash_, fragment = raw.partition("#")
+        new = replace("embed" if m.group(1) else "link", unquote(target))
+        if new is None:
+            return m.group(0)
+        if group == 3:
+            # A bare target ends at the first ")", so parentheses are encoded too.
+            new = quote(new, safe="/")
+        start, end = m.start(group) - m.start(), m.end(group) - m.start()
+        return m.group(0)[:start] + new + hash_ + fragment + m.group(0)[end:]
+
+    spans = _code_spans(text)
+    text = _WIKILINK_RE.sub(wiki, text)
+    spans = _code_spans(text)  # offsets moved with the rewritten wikilinks
+    return _MDLINK_RE.sub(md, text)
+
+
+def rewrite_canvas(text: str, replace: Replacer) -> str:
+    """Rewrite file nodes and links in text nodes, leaving the layout untouched."""
+
+    def field(m: "re.Match[str]") -> str:
+        value = json.loads(m.group(3))
+        if m.group(2) == "file":
+            new = replace("canvas", value)
+        else:
+            new = rewrite_markdown(value, replace)
+            new = None if new == value else new
+        return m.group(0) if new is None else m.group(1) + json.dumps(new, ensure_ascii=False)
+
+    return _CANVAS_FIELD_RE.sub(field, text)
+
+
+def parse_file(path: Path) -> List[RawLink]:
+    text = path.read_text(encoding="utf-8", errors="replace")
+    if path.suffix == ".canvas":
+        return parse_canvas(text)
+    if path.suffix == ".base":
+        # Bases are YAML queries; only explicit wikilinks point at files.
+        return [link for link in parse_markdown(text) if link[0].startswith("wiki")]
+    return parse_markdown(text)
+
+
+class LinkGraph:
+    """Forward/backward link index over a wiki tree, updated incrementally."""
+
+    VERSION = 2
+
+    def __init__(self, root: Path, *, path: Optional[Path] = None):
+        self.root = Path(root).resolve()
+        self.path = path
+        # Parsed sources: rel path -> {"m": mtime_ns, "s": size, "l": [[kind, raw, line], ...]}
+        self._sources: Dict[str, Dict] = {}
+        self._all_files: Set[str] = set()
+        self._vault_roots: List[str] = []
+
+        self._by_name: Dict[str, List[str]] = defaultdict(list)  # "name.ext" -> paths
+        self._by_stem: Dict[str, List[str]] = defaultdict(list)  # "name" -> .md paths
+        self._forward: Dict[str, Dict[str, int]] = {}
+        self._backward: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self._broken: Dict[str, List[Link]] = {}
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def load(cls, path: Path, root: Path) -> "LinkGraph":
+        graph = cls(root, path=path)
+        if path.exists():
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+            except ValueError:
+                data = {}
+            if data.get("version") == cls.VERSION and data.get("root") == str(graph.root):
+                graph._sources = data.get("sources", {})
+                graph._all_files = set(data.get("files", []))
+                graph._vault_roots = data.get("vault_roots", [])
+                graph._rebuild()
+        return graph
+
+    def save(self, path: Optional[Path] = None) -> None:
+        path = path or self.path
+        if path is None:
+            raise ValueError("No path to save the link graph to")
+        payload = {
+            "version": self.VERSION,
+            "root": str(self.root),
+            "vault_roots": self._vault_roots,
+            "files": sorted(self._all_files),
+            "sources": self._sources,
+        }
+        atomic_write_text(path, json.dumps(payload, ensure_ascii=False, separators=(",", ":")))
+
+    # ------------------------------------------------------------------
+    # Scanning
+    # ------------------------------------------------------------------
+
+    def _walk(self) -> Tuple[Set[str], List[str], Dict[str, os.stat_result]]:
+        files: Set[str] = set()
+        vault_roots: List[str] = []
+        doc_stats: Dict[str, os.stat_result] = {}
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            rel_dir = os.path.relpath(dirpath, self.root).replace(os.sep, "/")
+            rel_dir = "" if rel_dir == "." else rel_dir
+            if ".obsidian" in dirnames:
+                vault_roots.append(rel_dir)
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith(".") and d not in SKIP_DIRS)
+            for name in filenames:
+                if name.startswith("."):
+                    continue
+                rel = f"{rel_dir}/{name}" if rel_dir else name
+                files.add(rel)
+                if name.endswith(DOC_EXTS):
+                    try:
+                        doc_stats[rel] = os.stat(os.path.join(dirpath, name))
+                    except OSError:
+                        continue
+        return files, vault_roots, doc_stats
+
+    def update(self, paths: Optional[Iterable[Path]] = None) -> Dict[str, int]:
+        """Re-parse new/changed documents; with `paths`, only check those files.
+
+        Returns counts of parsed / removed sources.
+        """
+        parsed = removed = 0
+        if paths is None:
+            files, vault_roots, doc_stats = self._walk()
+            for rel in list(self._sources):
+                if rel not in doc_stats:
+                    del self._sources[rel]
+                    removed += 1
+            self._all_files = files
+            self._vault_roots = sorted(vault_roots, key=len, reverse=True)
+        else:
+            doc_stats = {}
+            for p in paths:
+                rel = self._rel(Path(p))
+                try:
+                    st = (self.root / rel).stat()
+                except OSError:
+                    self._all_files.discard(rel)
+                    removed += self._sources.pop(rel, None) is not None
+                    continue
+                self._all_files.add(rel)
+                if rel.endswith(DOC_EXTS):
+                    doc_stats[rel] = st
+
+        for rel, st in doc_stats.items():
+            entry = self._sources.get(rel)
+            if entry and entry["m"] == st.st_mtime_ns and entry["s"] == st.st_size:
+                continue
+            try:
+                links = parse_file(self.root / rel)
+            except OSError:
+                continue
+            self._sources[rel] = {"m": st.st_mtime_ns, "s": st.st_size, "l": [list(link) for link in links]}
+            parsed += 1
+
+        # Names may now resolve differently anywhere, so resolution is redone in
+        # full; it is dictionary work only, no file is re-read.
+        if parsed or removed or paths is None:
+            self._rebuild()
+        return {"parsed": parsed, "removed": removed}
+
+    def _rel(self, path: Path) -> str:
+        path = Path(path)
+        if not path.is_absolute():
+            path = Path.cwd() / path
+        return path.resolve().relative_to(self.root).as_posix()
+
+    # ------------------------------------------------------------------
+    # Resolution
+    # ------------------------------------------------------------------
+
+    def _rebuild(self) -> None:
+        self._by_name = defaultdict(list)
+        self._by_stem = defaultdict(list)
+        for rel in self._all_files:
+            name = rel.rsplit("/", 1)[-1]
+            self._by_name[name.lower()].append(rel)
+            if name.endswith(".md"):
+                self._by_stem[name[:-3].lower()].append(rel)
+
+        self._forward = {}
+        self._backward = defaultdict(dict)
+        self._broken = {}
+        for source, entry in self._sources.items():
+            out: Dict[str, int] = {}
+            for kind, raw, line in entry["l"]:
+                target = self.resolve(source, raw, kind)
+                if target is None:
+                    self._broken.setdefault(source, []).append(Link(source, raw, kind, line, None))
+                    continue
+                if target == source:
+                    continue
+                out[target] = out.get(target, 0) + 1
+            self._forward[source] = out
+            for target, n in out.items():
+                self._backward[target][source] = n
+
+    def _vault_root(self, rel: str) -> str:
+        for vr in self._vault_roots:  # longest first
+            if not vr or rel == vr or rel.startswith(vr + "/"):
+                return vr
+        return ""
+
+    def _existing(self, candidate: str) -> Optional[str]:
+        candidate = posixpath.normpath(candidate)
+        if candidate.startswith("../") or candidate == "..":
+            return None
+        if candidate in self._all_files:
+            return candidate
+        if candidate + ".md" in self._all_files:
+            return candidate + ".md"
+        return None
+
+    def resolve(self, source: str, raw: str, kind: str = "wikilink") -> Optional[str]:
+        """Resolve a link target written in `source` to a path under the root."""
+        src_dir = posixpath.dirname(source)
+        vault = self._vault_root(source)
+        raw = raw.strip().lstrip("/") if kind == "canvas" else raw.strip()
+
+        if kind in ("link", "embed"):
+            if raw.startswith("/"):
+                return self._existing(posixpath.join(vault, raw.lstrip("/")))
+            found = self._existing(posixpath.join(src_dir, raw))
+            if found or "/" in raw:
+                return found or self._existing(posixpath.join(vault, raw))
+        elif "/" in raw:
+            return self._existing(posixpath.join(vault, raw)) or self._existing(posixpath.join(src_dir, raw))
+
+        # Bare name: look it up anywhere in the vault.
+        name = raw.rsplit("/", 1)[-1].lower()
+        candidates = self._by_name.get(name) or self._by_stem.get(name[:-3] if name.endswith(".md") else name) or []
+        if vault:
+            candidates = [c for c in candidates if c.startswith(vault + "/")]
+        if not candidates:
+            return None
+        if len(candidates) == 1:
+            return candidates[0]
+        return min(candidates, key=lambda c: (posixpath.dirname(c) != src_dir, c.count("/"), c))
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def attachments(self) -> List[str]:
+        """Non-document files inside the vault(s) (everything, if no vault)."""
+        roots = self._vault_roots
+        out = []
+        for rel in self._all_files:
+            if rel.endswith(DOC_EXTS):
+                continue
+            if roots and not any(not vr or rel.startswith(vr + "/") for vr in roots):
+                continue
+            out.append(rel)
+        return sorted(out)
+
+    def link_text(self, source: str, target: str, kind: str) -> str:
+        """How `source` should spell a link of `kind` to `target`."""
+        if kind in ("link", "embed"):
+            return posixpath.relpath(target, posixpath.dirname(source) or ".")
+        vault = self._vault_root(source)
+        in_vault = target[len(vault) + 1 :] if vault else target
+        if kind == "canvas":
+            return in_vault
+        name = target.rsplit("/", 1)[-1]
+        unique = len(self._by_name.get(name.lower(), ())) == 1
+        spelled = name if unique else in_vault
+        return spelled[:-3] if spelled.endswith(".md") else spelled
+
+    def retarget(self, mapping: Dict[str, str]) -> List[str]:
+        """Point every link to a key of `mapping` at its value; returns the
+        rewritten sources (already re-indexed)."""
+        changed = []
+        for source in sorted({s for old in mapping for s in self.backlinks(old)}):
+
+            def replace(kind: str, raw: str) -> Optional[str]:
+                new = mapping.get(self.resolve(source, raw, kind) or "")
+                return None if new is None else self.link_text(source, new, kind)
+
+            path = self.root / source
+            text = path.read_text(encoding="utf-8")
+            rewrite = rewrite_canvas if source.endswith(".canvas") else rewrite_markdown
+            new_text = rewrite(text, replace)
+            if new_text != text:
+                atomic_write_text(path, new_text)
+                changed.append(source)
+        if changed:
+            self.update(self.root / rel for rel in changed)
+        return changed
+
+    def __contains__(self, rel: str) -> bool:
+        return rel in self._all_files
+
+    def __len__(self) -> int:
+        return len(self._sources)
+
+    def links(self, rel: str) -> Dict[str, int]:
+        """Targets linked from `rel` -> number of links."""
+        return self._forward.get(rel, {})
+
+    def backlinks(self, rel: str) -> Dict[str, int]:
+        """Sources linking to `rel` -> number of links."""
+        return self._backward.get(rel, {})
+
+    def broken(self) -> List[Link]:
+        return [link for source in sorted(self._broken) for link in self._broken[source]]
+
+    def related(self, rel: str, limit: int = 5) -> List[Tuple[str, float]]:
+        """Documents ranked by relatedness to `rel`.
+
+        Direct links count 3 each way; every shared neighbour (co-citation or
+        common target) adds 1; the same folder adds 0.5 as a tie-breaker only.
+        """
+        out_links = self.links(rel)
+        in_links = self.backlinks(rel)
+        neighbours = set(out_links) | set(in_links)
+
+        scores: Dict[str, float] = defaultdict(float)
+        for n in out_links:
+            scores[n] += 3
+        for n in in_links:
+            scores[n] += 3
+        for n in neighbours:
+            for m in set(self.links(n)) | set(self.backlinks(n)):
+                scores[m] += 1
+
+        folder = posixpath.dirname(rel)
+        ranked = []
+        for doc, score in scores.items():
+            if doc == rel or not doc.endswith(DOC_EXTS):
+                continue
+            if posixpath.dirname(doc) == folder:
+                score += 0.5
+            ranked.append((doc, score))
+        ranked.sort(key=lambda x: (-x[1], x[0]))
+        return ranked[:limit]
+
+
+def main() -> None:
+    script_dir = Path(__file__).resolve().parent
+    parser = argparse.ArgumentParser(description="Wiki link graph")
+    parser.add_argument("command", choices=["build", "links", "backlinks", "related", "broken"])
+    parser.add_argument("path", nargs="?", help="File (relative to --root) for links/backlinks/related")
+    parser.add_argument("--root", default=os.getenv("WIKI_ROOT") or str(script_dir.parent))
+    parser.add_argument("--index", default=str(script_dir / "data" / "link_graph.json"))
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    graph = LinkGraph.load(Path(args.index), Path(args.root))
+    counts = graph.update()
+    graph.save()
+
+    if args.command == "build":
+        n_links = sum(sum(t.values()) for t in graph._forward.values())
+        print(f"✅ Link graph: {len(graph)} documents, {n_links} links ({counts['parsed']} parsed, {counts['removed']} removed)")
+        print(f"⚠️  Broken links: {len(graph.broken())}")
+        return
+
+    if args.command == "broken":
+        broken = graph.broken()
+        for link in broken:
+            where = f"{link.source}:{link.line}" if link.line else link.source
+            print(f"{where}\t{link.kind}\t{link.raw}")
+        print(f"⚠️  {len(broken)} broken links")
+        return
+
+    if not args.path:
+        raise SystemExit(f"❌ {args.command} needs a path")
+    rel = args.path.replace(os.sep, "/")
+    if rel not in graph:
+        rel = graph._rel(Path(args.path))
+
+    if args.command == "links":
+        rows = sorted(graph.links(rel).items())
+    elif args.command == "backlinks":
+        rows = sorted(graph.backlinks(rel).items())
+    else:
+        rows = graph.related(rel, args.limit)
+    for target, value in rows:
+        print(f"{value:g}\t{target}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,47 +9,128 @@ Features:
 - Extract and structure document info
 - Maintain backward compatibility
 - Preserve existing content
+
+Performance:
+- A manifest (default: data/optimizer_manifest.json) remembers path -> (mtime,
+  size) of every file already handled; unchanged files are skipped on the next
+  run without being opened.
+- Frontmatter detection reads only the first bytes of a file.
+- Files that do need work are processed in a process pool (OPTIMIZER_WORKERS,
+  default: CPU count); per-file results are aggregated and printed by the parent.
+- `related:` comes from the wiki link graph (link_graph.py, default:
+  data/link_graph.json): documents ranked by links in both directions and
+  shared neighbours. The graph is refreshed once per run in the parent; workers
+  only read it.
 """
 
+import json
 import os
+import posixpath
 import re
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+
+from atomic_io import atomic_write_text
+from link_graph import LinkGraph
+
+FRONTMATTER_MARKER = b'---'
+# Below this many files a process pool costs more than it saves.
+MIN_PARALLEL_FILES = 16
+
+
+def has_frontmatter(file_path: Path) -> bool:
+    """True if the file starts with a YAML frontmatter marker (reads 3 bytes)."""
+    with open(file_path, 'rb') as f:
+        return f.read(len(FRONTMATTER_MARKER)) == FRONTMATTER_MARKER
+
+
+class FileManifest:
+    """path -> (mtime_ns, size, status) of files the optimizer already handled."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._entries: Dict[str, Dict] = {}
+        self._dirty = False
+        if path.exists():
+            try:
+                self._entries = json.loads(path.read_text(encoding='utf-8')).get('files', {})
+            except Exception:
+                self._entries = {}
+
+    def unchanged(self, file_path: Path, stat: os.stat_result) -> bool:
+        entry = self._entries.get(str(file_path))
+        return bool(entry) and entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size
+
+    def record(self, file_path: Path, status: str, stat: Optional[os.stat_result] = None) -> None:
+        stat = stat or file_path.stat()
+        self._entries[str(file_path)] = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'status': status}
+        self._dirty = True
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        atomic_write_text(self.path, json.dumps({'files': self._entries}, ensure_ascii=False, separators=(',', ':')) + '\n')
+        self._dirty = False
+
+
+_worker_optimizers: Dict[Tuple[str, str], "MarkdownOptimizer"] = {}
+
+
+def _optimize_worker(wiki_root: str, graph_path: str, file_path: str) -> Tuple[str, str, str]:
+    """Process-pool entry point: (path, status, message) for one file."""
+    optimizer = _worker_optimizers.get((wiki_root, graph_path))
+    if optimizer is None:
+        optimizer = _worker_optimizers[(wiki_root, graph_path)] = MarkdownOptimizer(
+            Path(wiki_root),
+            manifest_path=None,
+            workers=1,
+            link_graph_path=Path(graph_path) if graph_path else None,
+        )
+    path = Path(file_path)
+    try:
+        if not optimizer._prepend_frontmatter(path):
+            return file_path, 'frontmatter', ''
+        return file_path, 'optimized', f"✅ Added frontmatter to {path.name}"
+    except Exception as e:
+        return file_path, 'error', f"❌ Error optimizing {path.name}: {e}"
 
 
 class MarkdownOptimizer:
     """Optimize markdown files for AI comprehension."""
 
-    def __init__(self, wiki_root: Path):
+    def __init__(
+        self,
+        wiki_root: Path,
+        manifest_path: Optional[Path] = Path(__file__).resolve().parent / "data" / "optimizer_manifest.json",
+        workers: Optional[int] = None,
+        link_graph_path: Optional[Path] = Path(__file__).resolve().parent / "data" / "link_graph.json",
+    ):
         self.wiki_root = Path(wiki_root)
+        self.manifest = FileManifest(manifest_path) if manifest_path else None
+        self.workers = workers or int(os.getenv("OPTIMIZER_WORKERS") or os.cpu_count() or 1)
+        self.link_graph_path = link_graph_path
+        self._link_graph: Optional[LinkGraph] = None
+
+    def link_graph(self, refresh: bool = False) -> Optional[LinkGraph]:
+        """The wiki link graph, loaded once; `refresh` re-scans changed files and saves it."""
+        if self.link_graph_path is None:
+            return None
+        if self._link_graph is None:
+            self._link_graph = LinkGraph.load(self.link_graph_path, self.wiki_root)
+        if refresh:
+            self._link_graph.update()
+            self._link_graph.save()
+        return self._link_graph
 
     def add_frontmatter(self, file_path: Path, metadata: Optional[Dict] = None) -> bool:
         """Add YAML frontmatter to markdown file."""
         try:
-            # Read existing content
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-
-            # Check if frontmatter already exists
-            if content.startswith('---'):
+            if not self._prepend_frontmatter(file_path, metadata):
                 print(f"⚠️  {file_path.name} already has frontmatter, skipping")
                 return False
 
-            # Auto-detect metadata if not provided
-            if metadata is None:
-                metadata = self._extract_metadata(file_path, content)
-
-            # Generate frontmatter
-            frontmatter = self._generate_frontmatter(metadata)
-
-            # Combine frontmatter + content
-            new_content = f"{frontmatter}\n{content}"
-
-            # Write back
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(new_content)
-
             print(f"✅ Added frontmatter to {file_path.name}")
             return True
 
@@ -57,6 +138,18 @@ class MarkdownOptimizer:
             print(f"❌ Error processing {file_path.name}: {e}")
             return False
 
+    def _prepend_frontmatter(self, file_path: Path, metadata: Optional[Dict] = None) -> bool:
+        """Write frontmatter + content back atomically; False if it already has some."""
+        content = file_path.read_text(encoding='utf-8')
+        if content.startswith('---'):
+            return False
+
+        # Auto-detect metadata if not provided
+        if metadata is None:
+            metadata = self._extract_metadata(file_path, content)
+        atomic_write_text(file_path, f"{self._generate_frontmatter(metadata)}\n{content}")
+        return True
+
     def _extract_metadata(self, file_path: Path, content: str) -> Dict:
         """Extract metadata from file path and content."""
         # Get title from first heading or filename
@@ -68,7 +161,8 @@ class MarkdownOptimizer:
 
         # Get file stats
         stat = file_path.stat()
-        created = datetime.fromtimestamp(stat.st_birthtime).strftime('%Y-%m-%d')
+        # st_birthtime is macOS/BSD only; fall back to ctime elsewhere
+        created = datetime.fromtimestamp(getattr(stat, 'st_birthtime', stat.st_ctime)).strftime('%Y-%m-%d')
         updated = datetime.fromtimestamp(stat.st_mtime).strftime('%Y-%m-%d')
 
         # Detect document type
@@ -133,7 +227,18 @@ class MarkdownOptimizer:
             return 'note'
 
     def _find_related(self, file_path: Path, content: str) -> List[str]:
-        """Find related files mentioned in content."""
+        """Related documents, relative to the file: ranked from the link graph when
+        it covers the file, else the files its content mentions."""
+        graph = self.link_graph()
+        if graph is not None:
+            try:
+                rel = file_path.resolve().relative_to(graph.root).as_posix()
+            except ValueError:
+                rel = None
+            if rel is not None and rel in graph:
+                folder = posixpath.dirname(rel) or '.'
+                return [posixpath.relpath(doc, folder) for doc, _ in graph.related(rel, limit=5)]
+
         related = []
 
         # Find markdown links
@@ -174,11 +279,8 @@ class MarkdownOptimizer:
     def optimize_structure(self, file_path: Path) -> bool:
         """Optimize markdown structure for AI."""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-
             # Skip if already has frontmatter
-            if content.startswith('---'):
+            if has_frontmatter(file_path):
                 # Already optimized
                 return False
 
@@ -194,9 +296,11 @@ class MarkdownOptimizer:
         stats = {
             'processed': 0,
             'skipped': 0,
+            'unchanged': 0,  # skipped via the manifest, never opened
             'errors': 0,
         }
 
+        todo: List[Path] = []
         pattern = '**/*.md' if recursive else '*.md'
         for md_file in directory.glob(pattern):
             # Skip automation directory (already has docs)
@@ -209,14 +313,60 @@ class MarkdownOptimizer:
                 stats['skipped'] += 1
                 continue
 
-            # Process file
-            if self.optimize_structure(md_file):
+            try:
+                stat = md_file.stat()
+                if self.manifest and self.manifest.unchanged(md_file, stat):
+                    stats['skipped'] += 1
+                    stats['unchanged'] += 1
+                    continue
+                if has_frontmatter(md_file):
+                    stats['skipped'] += 1
+                    if self.manifest:
+                        self.manifest.record(md_file, 'frontmatter', stat)
+                    continue
+            except OSError as e:
+                print(f"❌ Error reading {md_file.name}: {e}")
+                stats['errors'] += 1
+                continue
+
+            todo.append(md_file)
+
+        if todo and self.link_graph_path is not None:
+            # Workers read the saved graph; bring it up to date once here.
+            self.link_graph(refresh=True)
+
+        for path, status, message in self._optimize_files(todo):
+            if message:
+                print(message)
+            if status == 'optimized':
                 stats['processed'] += 1
+            elif status == 'error':
+                stats['errors'] += 1
             else:
                 stats['skipped'] += 1
+            if self.manifest and status != 'error':
+                self.manifest.record(Path(path), status)
 
+        if self.manifest:
+            self.manifest.save()
         return stats
 
+    def _optimize_files(self, files: List[Path]):
+        """Yield (path, status, message) per file, in a process pool when worthwhile."""
+        root = str(self.wiki_root)
+        graph_path = str(self.link_graph_path) if self.link_graph_path else ''
+        if self.workers <= 1 or len(files) < MIN_PARALLEL_FILES:
+            for path in files:
+                yield _optimize_worker(root, graph_path, str(path))
+            return
+
+        workers = min(self.workers, len(files))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunksize = max(1, len(files) // (workers * 4))
+            yield from pool.map(
+                _optimize_worker, [root] * len(files), [graph_path] * len(files), map(str, files), chunksize=chunksize
+            )
+
 
 def main():
     """Main entry point."""
@@ -235,7 +385,7 @@ def main():
         (wiki_root / "setup", False),
     ]
 
-    total_stats = {'processed': 0, 'skipped': 0, 'errors': 0}
+    total_stats = {'processed': 0, 'skipped': 0, 'unchanged': 0, 'errors': 0}
 
     for directory, recursive in directories:
         if not directory.exists():
@@ -252,7 +402,9 @@ def main():
 
     print("✅ Optimization complete!")
     print(f"   Total processed: {total_stats['processed']}")
-    print(f"   Total skipped: {total_stats['skipped']}")
+    print(f"   Total skipped: {total_stats['skipped']} ({total_stats['unchanged']} unchanged since last run)")
+    if total_stats['errors']:
+        print(f"   Total errors: {total_stats['errors']}")
     print()
     print("📝 Files now have YAML frontmatter with:")
     print("   - Title, type, tags")
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""Markdown Section Engine
+
+Tokenizes a markdown document into `## ` (H2) sections in a single pass, so
+updaters can look up, replace and insert whole sections by header without
+rescanning the text for every operation, then serialize once with one join.
+
+Rules:
+- A section starts at a line matching `^##\\s` (H3+ lines do not split) and runs
+  until the next such line; lines inside ``` / ~~~ fences never split.
+- Headers are matched on the stripped header line (exact, not substring).
+- Text before the first section is kept verbatim as the preamble.
+- `aliases` rewrite legacy header lines while tokenizing (e.g. `## Issues` or
+  `### [Unreleased]` -> `## [Unreleased]`); an alias of any level becomes an H2
+  boundary.
+
+Usage:
+    doc = MarkdownDocument.parse(text, aliases={"## Issues": "## [Unreleased]"})
+    if not doc.has("## [Unreleased]"):
+        doc.insert("## [Unreleased]", "\\n", before="## Automation")
+    doc.set_body("## [Unreleased]", "\\n...\\n")
+    text = doc.render()
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+_H2_RE = re.compile(r"^##\s")
+_FENCE_PREFIXES = ("```", "~~~")
+
+
+@dataclass
+class Section:
+    header: str  # stripped header line, the lookup key
+    header_line: str  # header line as written (with newline when present)
+    body: str  # everything up to the next section header
+
+    def render(self) -> str:
+        return self.header_line + self.body
+
+
+class MarkdownDocument:
+    """A markdown document held as a preamble plus an ordered list of H2 sections."""
+
+    def __init__(self, preamble: str, sections: List[Section]):
+        self.preamble = preamble
+        self._sections = sections
+        self._index: Dict[str, int] = {}
+        self._reindex()
+
+    # ------------------------------------------------------------------
+    # Parsing / rendering
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def parse(cls, text: str, *, aliases: Optional[Dict[str, str]] = None) -> "MarkdownDocument":
+        aliases = aliases or {}
+        preamble: List[str] = []
+        sections: List[Section] = []
+        body: List[str] = preamble
+        in_fence = False
+
+        for line in text.splitlines(keepends=True):
+            stripped = line.strip()
+            if stripped.startswith(_FENCE_PREFIXES):
+                in_fence = not in_fence
+            elif not in_fence:
+                canonical = aliases.get(stripped)
+                if canonical is not None:
+                    line = canonical + ("\n" if line.endswith("\n") else "")
+                    stripped = canonical
+                if _H2_RE.match(line):
+                    if sections:
+                        sections[-1].body = "".join(body)
+                    sections.append(Section(header=stripped, header_line=line, body=""))
+                    body = []
+                    continue
+            body.append(line)
+
+        if sections:
+            sections[-1].body = "".join(body)
+            return cls("".join(preamble), sections)
+        return cls("".join(preamble), [])
+
+    def render(self) -> str:
+        return self.preamble + "".join(s.render() for s in self._sections)
+
+    # ------------------------------------------------------------------
+    # Lookup / edits
+    # ------------------------------------------------------------------
+
+    def _reindex(self) -> None:
+        # First occurrence wins, matching the line-scan behaviour updaters relied on.
+        self._index = {}
+        for i, sec in enumerate(self._sections):
+            self._index.setdefault(sec.header, i)
+
+    @property
+    def headers(self) -> List[str]:
+        return [s.header for s in self._sections]
+
+    def has(self, header: str) -> bool:
+        return header in self._index
+
+    def get(self, header: str) -> Optional[Section]:
+        i = self._index.get(header)
+        return self._sections[i] if i is not None else None
+
+    def body(self, header: str) -> Optional[str]:
+        sec = self.get(header)
+        return sec.body if sec else None
+
+    def set_body(self, header: str, body: str) -> None:
+        """Replace the body of an existing section (header line kept as written)."""
+        sec = self.get(header)
+        if sec is None:
+            raise KeyError(header)
+        if not sec.header_line.endswith("\n"):
+            sec.header_line += "\n"
+        sec.body = body
+
+    def insert(
+        self,
+        header: str,
+        body: str,
+        *,
+        before: Optional[str] = None,
+        index: Optional[int] = None,
+    ) -> None:
+        """Insert a new section before `before` (if present), at `index`, else append."""
+        if before is not None and before in self._index:
+            pos = self._index[before]
+        elif index is not None:
+            pos = max(0, min(index, len(self._sections)))
+        else:
+            pos = len(self._sections)
+
+        # Keep the previous chunk newline-terminated so the header starts a line.
+        if pos == 0:
+            if self.preamble and not self.preamble.endswith("\n"):
+                self.preamble += "\n"
+        else:
+            prev = self._sections[pos - 1]
+            if prev.body:
+                if not prev.body.endswith("\n"):
+                    prev.body += "\n"
+            elif not prev.header_line.endswith("\n"):
+                prev.header_line += "\n"
+
+        self._sections.insert(pos, Section(header=header, header_line=header + "\n", body=body))
+        self._reindex()
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""In-process Metrics (counters, gauges, histograms)
+
+A small, dependency-free instrumentation surface shared by the automation
+modules. Everything records into the process-wide `metrics` registry:
+
+    from metrics import metrics
+
+    metrics.inc("http_requests_total", client="forgejo", status="200")
+    metrics.inc("http_response_bytes_total", len(body), client="forgejo")
+    metrics.observe("http_request_seconds", elapsed, client="forgejo")
+    with metrics.timer("daemon_job_seconds", job="daily_briefing"):
+        ...
+    metrics.gauge_fn("telegram_outbox_pending", lambda: outbox.pending)
+
+Exposure (used by the daemon):
+- `MetricsServer(port)` serves the Prometheus text format on
+  http://127.0.0.1:<port>/metrics and a JSON snapshot on /metrics.json;
+- `MetricsFileWriter(path)` appends one JSON snapshot per interval to a JSONL
+  file (default: data/metrics.jsonl), rotated by size like a log file.
+
+Recording is a dict update under one lock, so it is cheap enough for per-request
+use. Nothing is exported unless a server or writer is started.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import bisect
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bucket bound holding the q-quantile (coarse, bucket resolution)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class Metrics:
+    """Thread-safe registry of labelled counters, gauges and histograms."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauge_fns: Dict[str, Dict[LabelKey, Callable[[], float]]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._buckets: Dict[str, Tuple[float, ...]] = {}
+        self.started = time.time()
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels: Any) -> None:
+        with self._lock:
+            self._gauges.setdefault(name, {})[_labels(labels)] = value
+
+    def gauge_fn(self, name: str, fn: Callable[[], float], **labels: Any) -> None:
+        """A gauge read at export time (queue depths, running jobs, ...)."""
+        with self._lock:
+            self._gauge_fns.setdefault(name, {})[_labels(labels)] = fn
+
+    def buckets(self, name: str, buckets: Tuple[float, ...]) -> None:
+        """Override histogram buckets for `name` (before its first observation)."""
+        with self._lock:
+            self._buckets[name] = tuple(sorted(buckets))
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = _Histogram(self._buckets.get(name, DEFAULT_BUCKETS))
+            hist.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels: Any) -> Iterator[Dict[str, Any]]:
+        """Observe the block's duration; the yielded dict may add/override labels."""
+        extra: Dict[str, Any] = {}
+        start = time.perf_counter()
+        try:
+            yield extra
+        finally:
+            self.observe(name, time.perf_counter() - start, **{**labels, **extra})
+
+    def counter(self, name: str, **labels: Any) -> float:
+        with self._lock:
+            return self._counters.get(name, {}).get(_labels(labels), 0)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    # ------------------------------------------------------------------
+    # Export
+    # ------------------------------------------------------------------
+
+    def _gauge_values(self) -> Dict[str, Dict[LabelKey, float]]:
+        with self._lock:
+            gauges = {name: dict(series) for name, series in self._gauges.items()}
+            fns = {name: dict(series) for name, series in self._gauge_fns.items()}
+        for name, series in fns.items():
+            for key, fn in series.items():
+                try:
+                    gauges.setdefault(name, {})[key] = float(fn())
+                except Exception:
+                    continue
+        return gauges
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-friendly view: counters, gauges, histogram count/sum/avg/p50/p95."""
+
+        def fmt(key: LabelKey) -> str:
+            return ",".join(f"{k}={v}" for k, v in key)
+
+        gauges = self._gauge_values()
+        with self._lock:
+            counters = {n: {fmt(k): v for k, v in s.items()} for n, s in self._counters.items()}
+            histograms = {
+                n: {
+                    fmt(k): {
+                        "count": h.count,
+                        "sum": round(h.sum, 6),
+                        "avg": round(h.sum / h.count, 6) if h.count else None,
+                        "p50": h.quantile(0.5),
+                        "p95": h.quantile(0.95),
+                    }
+                    for k, h in s.items()
+                }
+                for n, s in self._histograms.items()
+            }
+        return {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "counters": counters,
+            "gauges": {n: {fmt(k): v for k, v in s.items()} for n, s in gauges.items()},
+            "histograms": histograms,
+        }
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (0.0.4)."""
+
+        def fmt(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+            pairs = key + extra
+            if not pairs:
+                return ""
+            escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+            return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+        def num(v: float) -> str:
+            return "+Inf" if v == float("inf") else repr(float(v))
+
+        lines: List[str] = []
+        gauges = self._gauge_values()
+        with self._lock:
+            for name in sorted(self._counters):
+                lines.append(f"# TYPE {name} counter")
+                for key, v in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{fmt(key)} {num(v)}")
+            for name in sorted(gauges):
+                lines.append(f"# TYPE {name} gauge")
+                for key, v in sorted(gauges[name].items()):
+                    lines.append(f"{name}{fmt(key)} {num(v)}")
+            for name in sorted(self._histograms):
+                lines.append(f"# TYPE {name} histogram")
+                for key, h in sorted(self._histograms[name].items()):
+                    cumulative = 0
+                    for bound, n in zip(h.buckets + (float("inf"),), h.counts):
+                        cumulative += n
+                        lines.append(f"{name}_bucket{fmt(key, (('le', num(bound)),))} {cumulative}")
+                    lines.append(f"{name}_sum{fmt(key)} {num(h.sum)}")
+                    lines.append(f"{name}_count{fmt(key)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+class MetricsServer:
+    """Serves /metrics (Prometheus) and /metrics.json from a background thread."""
+
+    def __init__(self, port: int, host: str = "127.0.0.1", registry: Metrics = metrics):
+        registry_ = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # noqa: N802 (http.server API)
+                path = self.path.split("?", 1)[0]
+                if path == "/metrics":
+                    body = registry_.render_prometheus().encode("utf-8")
+                    ctype = "text/plain; version=0.0.4; charset=utf-8"
+                elif path == "/metrics.json":
+                    body = json.dumps(registry_.snapshot(), ensure_ascii=False, indent=2).encode("utf-8")
+                    ctype = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                return
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def start(self) -> "MetricsServer":
+        self._thread.start()
+        logger.info(f"Metrics endpoint: {self.url}")
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class MetricsFileWriter:
+    """Appends periodic JSON snapshots to a size-rotated JSONL file."""
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        interval: float = 60.0,
+        max_bytes: int = 5 * 1024 * 1024,
+        backups: int = 3,
+        registry: Metrics = metrics,
+    ):
+        self.path = path
+        self.interval = interval
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._registry = registry
+
+    def write(self) -> None:
+        line = json.dumps(self._registry.snapshot(), ensure_ascii=False, separators=(",", ":")) + "\n"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            if self.path.stat().st_size + len(line) > self.max_bytes:
+                self._rotate()
+        except FileNotFoundError:
+            pass
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+    def _rotate(self) -> None:
+        for i in range(self.backups - 1, 0, -1):
+            src = self.path.with_name(f"{self.path.name}.{i}")
+            if src.exists():
+                src.replace(self.path.with_name(f"{self.path.name}.{i + 1}"))
+        if self.backups > 0:
+            self.path.replace(self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink(missing_ok=True)
+
+    async def run(self, stop: asyncio.Event) -> None:
+        """Write a snapshot every `interval` seconds, and once more on stop."""
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await asyncio.to_thread(self.write)
+            except Exception as e:
+                logger.warning(f"Failed to write metrics snapshot: {e}")
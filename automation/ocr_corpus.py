@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+"""OCR Corpus Pipeline
+
+Streaming ingestion of OCR'd books (ocr/*.md, one file per page range) into a
+passage store the search, retrieval and briefing code can read:
+
+    iter_sources -> read lines lazily -> normalize_lines -> chunk_lines -> store
+
+- sources are grouped into books by file name (`<book>_trang_<from>-<to>.md`)
+  and read in page order, one line at a time; nothing holds more than one
+  passage of text, so memory stays flat however many books are dropped in;
+- normalization: Unicode NFC (OCR output mixes precomposed and combining
+  Vietnamese diacritics), zero-width / BOM / soft-hyphen / control characters
+  removed, exotic spaces folded, runs of spaces collapsed, words hyphenated
+  across line breaks re-joined, `---` separators dropped; `(Trang N)` markers
+  set the page number of the passages that follow;
+- passages are paragraphs packed up to MAX_CHUNK_CHARS under their heading
+  (longer paragraphs split at sentence ends), each with a stable id derived from
+  book + text, so an unchanged passage keeps its id across runs and files;
+- the store (default: data/ocr_corpus/) is an append-only JSONL file plus a
+  manifest of source mtime/size and, per passage, its offset and position
+  (line, page, heading). A changed source appends only passages with new text
+  and a tombstone for each passage that is gone; passages that merely moved
+  are updated in the manifest. Unchanged sources are skipped without being read. `compact()` rewrites the
+  file without dead records once they outnumber the live ones. Records written
+  after the last manifest save (a crash mid-ingest) are truncated on open.
+
+Usage:
+    python ocr_corpus.py ingest            # ocr/ -> data/ocr_corpus/
+    python ocr_corpus.py stats
+    python ocr_corpus.py show <chunk-id>
+
+    from ocr_corpus import OcrCorpus
+    corpus = OcrCorpus.open()
+    for chunk in corpus.iter_chunks(book="Dive_into_OCR_VI"):
+        print(chunk.id, chunk.page, chunk.heading, chunk.text[:80])
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from atomic_io import atomic_write_text
+
+MAX_CHUNK_CHARS = 1200
+MIN_CHUNK_CHARS = 200  # a heading change flushes; short tails merge forward otherwise
+
+_SOURCE_RE = re.compile(r"^(?P<book>.+?)_(?:trang|pages?|p)_(?P<first>\d+)-(?P<last>\d+)$", re.IGNORECASE)
+_PAGE_RE = re.compile(r"\((?:trang|page)\s+(\d+)\)", re.IGNORECASE)
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+_SEPARATOR_RE = re.compile(r"^\s*([-*_])(\s*\1){2,}\s*$")
+_INVISIBLE_RE = re.compile("[\u200b-\u200f\u2060\ufeff\u00ad\x00-\x08\x0b-\x1f\x7f]")
+_SPACES_RE = re.compile("[\u00a0\u2000-\u200a\u202f\u205f\u3000\t]")
+_MULTI_SPACE_RE = re.compile(r"(?<=\S) {2,}")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?…])\s+")
+_BLOCK_LINE_RE = re.compile(r"^\s*(?:[-*+>|]|\d+[.)])\s")
+
+
+@dataclass
+class Chunk:
+    id: str
+    book: str
+    source: str  # path relative to the corpus base
+    page: Optional[int]
+    heading: str
+    line: int  # first line of the passage in the source
+    text: str
+
+    def to_record(self) -> Dict:
+        return {"id": self.id, "b": self.book, "s": self.source, "p": self.page, "h": self.heading, "l": self.line, "t": self.text}
+
+    @classmethod
+    def from_record(cls, rec: Dict) -> "Chunk":
+        return cls(rec["id"], rec["b"], rec["s"], rec["p"], rec["h"], rec["l"], rec["t"])
+
+
+def chunk_id(book: str, text: str) -> str:
+    return hashlib.blake2b(f"{book}\x00{text}".encode("utf-8"), digest_size=8).hexdigest()
+
+
+def parse_source_name(path: Path) -> Tuple[str, int]:
+    """(book, first page) from `<book>_trang_<from>-<to>.md`; else (stem, 0)."""
+    match = _SOURCE_RE.match(path.stem)
+    if not match:
+        return path.stem, 0
+    return match.group("book"), int(match.group("first"))
+
+
+def iter_sources(base: Path, sources: Iterable[str]) -> Iterator[Tuple[str, Path]]:
+    """(book, path) of every markdown file under `sources`, in book/page order."""
+    found = []
+    for source in sources:
+        for path in (base / source).rglob("*.md"):
+            if not any(part.startswith(".") for part in path.relative_to(base).parts):
+                book, first = parse_source_name(path)
+                found.append((book, first, path))
+    for book, _, path in sorted(found, key=lambda x: (x[0], x[1], x[2].name)):
+        yield book, path
+
+
+def normalize_line(line: str) -> str:
+    line = unicodedata.normalize("NFC", line.rstrip("\r\n"))
+    line = _INVISIBLE_RE.sub("", line)
+    line = _SPACES_RE.sub(" ", line)
+    return _MULTI_SPACE_RE.sub(" ", line).rstrip()
+
+
+def normalize_lines(lines: Iterable[str]) -> Iterator[Tuple[int, str]]:
+    """(line number, normalized text); hyphenated line breaks are re-joined
+    onto the first line, the consumed continuation yields an empty line."""
+    pending: Optional[Tuple[int, str]] = None
+    for lineno, raw in enumerate(lines, 1):
+        line = normalize_line(raw)
+        if pending is not None:
+            pno, ptext = pending
+            pending = None
+            if line[:1].islower():
+                word, _, rest = line.partition(" ")
+                yield pno, ptext[:-1] + word
+                yield lineno, rest
+                continue
+            yield pno, ptext
+        if len(line) > 1 and line.endswith("-") and line[-2].isalpha():
+            pending = (lineno, line)
+            continue
+        yield lineno, line
+    if pending is not None:
+        yield pending
+
+
+def _split_long(paragraph: str) -> List[str]:
+    """Cut an over-long paragraph at sentence ends (hard cut as a last resort)."""
+    parts: List[str] = []
+    current = ""
+    for sentence in _SENTENCE_END_RE.split(paragraph):
+        while len(sentence) > MAX_CHUNK_CHARS:
+            if current:
+                parts.append(current)
+                current = ""
+            cut = sentence.rfind(" ", 0, MAX_CHUNK_CHARS)
+            cut = cut if cut > MAX_CHUNK_CHARS // 2 else MAX_CHUNK_CHARS
+            parts.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        if current and len(current) + 1 + len(sentence) > MAX_CHUNK_CHARS:
+            parts.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        parts.append(current)
+    return parts
+
+
+def chunk_lines(lines: Iterable[str], *, book: str, source: str, first_page: Optional[int] = None) -> Iterator[Chunk]:
+    """Passages of one source, streamed from its lines."""
+    heading = ""
+    page = first_page or None
+    buf: List[str] = []  # paragraphs of the passage being built
+    size = 0
+    start = 1
+    start_page = page
+    para: List[str] = []
+    para_start = 1
+    in_fence = False
+
+    def emit() -> Iterator[Chunk]:
+        nonlocal buf, size
+        if buf:
+            text = "\n\n".join(buf)
+            yield Chunk(chunk_id(book, text), book, source, start_page, heading, start, text)
+        buf, size = [], 0
+
+    def add_paragraph() -> Iterator[Chunk]:
+        nonlocal para, size, start, start_page
+        if not para:
+            return
+        # Lists, tables, quotes and code keep their lines; prose is re-flowed.
+        keep_lines = in_fence or para[0].startswith(("```", "~~~")) or any(_BLOCK_LINE_RE.match(l) for l in para)
+        text = "\n".join(para) if keep_lines else " ".join(para)
+        para = []
+        for piece in _split_long(text) if len(text) > MAX_CHUNK_CHARS else [text]:
+            if buf and size + len(piece) > MAX_CHUNK_CHARS:
+                yield from emit()
+            if not buf:
+                start, start_page = para_start, page
+            buf.append(piece)
+            size += len(piece) + 2
+
+    for lineno, line in normalize_lines(lines):
+        if line.lstrip().startswith(("```", "~~~")):
+            in_fence = not in_fence
+        match = None if in_fence else _HEADING_RE.match(line)
+        if match:
+            yield from add_paragraph()
+            title = match.group(2).strip()
+            marker = _PAGE_RE.search(title)
+            if marker:
+                page = int(marker.group(1))
+                title = _PAGE_RE.sub("", title).strip(" -—:")
+            # A new heading closes the passage unless it is still a stub.
+            if size >= MIN_CHUNK_CHARS or (buf and len(match.group(1)) <= 2):
+                yield from emit()
+            heading = title or heading
+            continue
+        if not in_fence and (not line.strip() or _SEPARATOR_RE.match(line)):
+            yield from add_paragraph()
+            continue
+        if not in_fence:
+            marker = _PAGE_RE.search(line)
+            if marker and len(line) < 40:
+                page = int(marker.group(1))
+                continue
+        if not para:
+            para_start = lineno
+        para.append(line if in_fence else line.rstrip())
+
+    yield from add_paragraph()
+    yield from emit()
+
+
+def chunk_file(path: Path, base: Path) -> Iterator[Chunk]:
+    book, first_page = parse_source_name(path)
+    rel = path.relative_to(base).as_posix()
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        yield from chunk_lines(f, book=book, source=rel, first_page=first_page)
+
+
+class OcrCorpus:
+    """Append-only JSONL passage store with a manifest of sources and offsets."""
+
+    VERSION = 1
+
+    def __init__(self, store_dir: Path, base: Path, sources: Iterable[str] = ("ocr",)):
+        self.dir = store_dir
+        self.base = Path(base).resolve()
+        self.sources = list(sources)
+        self.chunks_path = store_dir / "chunks.jsonl"
+        self.manifest_path = store_dir / "manifest.json"
+        # rel source -> {"m": mtime_ns, "s": size, "book": str, "chunks": {id: [offset, line, page, heading]}}
+        self._sources: Dict[str, Dict] = {}
+        self._dead = 0  # superseded records + tombstones in chunks.jsonl
+        self._load()
+
+    @classmethod
+    def open(cls, store_dir: Optional[Path] = None, base: Optional[Path] = None) -> "OcrCorpus":
+        script_dir = Path(__file__).resolve().parent
+        return cls(
+            store_dir or script_dir / "data" / "ocr_corpus",
+            base or Path(os.getenv("WIKI_ROOT") or script_dir.parent),
+        )
+
+    # ------------------------------------------------------------------
+    # Manifest
+    # ------------------------------------------------------------------
+
+    def _load(self) -> None:
+        size = 0
+        if self.manifest_path.exists():
+            try:
+                data = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+            except ValueError:
+                data = {}
+            if data.get("version") == self.VERSION and data.get("base") == str(self.base):
+                self._sources = data["sources"]
+                self._dead = data["dead"]
+                size = data["bytes"]
+        # Anything past the last manifest save was never committed.
+        if self.chunks_path.exists() and self.chunks_path.stat().st_size != size:
+            if size == 0 or self.chunks_path.stat().st_size < size:
+                self.chunks_path.unlink()
+                self._sources, self._dead = {}, 0
+            else:
+                with open(self.chunks_path, "r+b") as f:
+                    f.truncate(size)
+
+    def _save(self) -> None:
+        size = self.chunks_path.stat().st_size if self.chunks_path.exists() else 0
+        payload = {"version": self.VERSION, "base": str(self.base), "bytes": size, "dead": self._dead, "sources": self._sources}
+        atomic_write_text(self.manifest_path, json.dumps(payload, ensure_ascii=False, separators=(",", ":")))
+
+    # ------------------------------------------------------------------
+    # Ingestion
+    # ------------------------------------------------------------------
+
+    def ingest(self) -> Dict[str, int]:
+        """Bring the store up to date with the sources; returns counters."""
+        stats = {"sources": 0, "skipped": 0, "added": 0, "removed": 0, "kept": 0}
+        self.dir.mkdir(parents=True, exist_ok=True)
+        seen = set()
+        with open(self.chunks_path, "ab") as out:
+            for book, path in iter_sources(self.base, self.sources):
+                rel = path.relative_to(self.base).as_posix()
+                seen.add(rel)
+                st = path.stat()
+                entry = self._sources.get(rel)
+                if entry and entry["m"] == st.st_mtime_ns and entry["s"] == st.st_size:
+                    stats["skipped"] += 1
+                    continue
+                stats["sources"] += 1
+                self._ingest_source(out, rel, path, st, entry, stats)
+                out.flush()
+                self._save()  # commit per source: a crash loses at most one
+
+            for rel in [r for r in self._sources if r not in seen]:
+                for cid in self._sources.pop(rel)["chunks"]:
+                    self._append(out, {"id": cid, "del": 1})
+                    self._dead += 2
+                    stats["removed"] += 1
+            out.flush()
+        self._save()
+        if self._dead > self.live_count():
+            self.compact()
+        return stats
+
+    def _append(self, out, record: Dict) -> int:
+        offset = out.tell()
+        out.write((json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8"))
+        return offset
+
+    def _ingest_source(self, out, rel: str, path: Path, st: os.stat_result, entry: Optional[Dict], stats: Dict) -> None:
+        old: Dict[str, List] = entry["chunks"] if entry else {}
+        new: Dict[str, List] = {}
+        book = parse_source_name(path)[0]
+        for chunk in chunk_file(path, self.base):
+            if chunk.id in new:
+                continue  # identical passage repeated within the source
+            meta = [chunk.line, chunk.page, chunk.heading]
+            prev = old.get(chunk.id)
+            if prev is not None:
+                # Same text: keep the record, the manifest holds the position.
+                new[chunk.id] = [prev[0], *meta]
+                stats["kept"] += 1
+                continue
+            new[chunk.id] = [self._append(out, chunk.to_record()), *meta]
+            stats["added"] += 1
+        for cid in old:
+            if cid not in new:
+                self._append(out, {"id": cid, "del": 1})
+                self._dead += 2
+                stats["removed"] += 1
+        self._sources[rel] = {"m": st.st_mtime_ns, "s": st.st_size, "book": book, "chunks": new}
+
+    def compact(self) -> None:
+        """Rewrite chunks.jsonl with live records only (streamed, in source order)."""
+        tmp = self.chunks_path.with_suffix(".jsonl.tmp")
+        with open(self.chunks_path, "rb") as src, open(tmp, "wb") as out:
+            for entry in self._sources.values():
+                for cid, meta in entry["chunks"].items():
+                    src.seek(meta[0])
+                    line = src.readline()
+                    meta[0] = out.tell()
+                    out.write(line)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp, self.chunks_path)
+        self._dead = 0
+        self._save()
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def live_count(self) -> int:
+        return sum(len(entry["chunks"]) for entry in self._sources.values())
+
+    def books(self) -> List[str]:
+        return sorted({entry["book"] for entry in self._sources.values()})
+
+    @staticmethod
+    def _read(f, rel: str, meta: List) -> Chunk:
+        f.seek(meta[0])
+        chunk = Chunk.from_record(json.loads(f.readline()))
+        # The record keeps the position it was written with; the manifest is current.
+        chunk.source = rel
+        chunk.line, chunk.page, chunk.heading = meta[1:]
+        return chunk
+
+    def get(self, cid: str) -> Optional[Chunk]:
+        for rel, entry in self._sources.items():
+            meta = entry["chunks"].get(cid)
+            if meta is not None:
+                with open(self.chunks_path, "rb") as f:
+                    return self._read(f, rel, meta)
+        return None
+
+    def iter_chunks(self, book: Optional[str] = None) -> Iterator[Chunk]:
+        """Live passages in book/page order, read one record at a time."""
+        if not self.chunks_path.exists():
+            return
+        ordered = sorted(
+            (rel for rel, e in self._sources.items() if book is None or e["book"] == book),
+            key=lambda rel: (self._sources[rel]["book"], parse_source_name(Path(rel))[1], rel),
+        )
+        with open(self.chunks_path, "rb") as f:
+            for rel in ordered:
+                for meta in sorted(self._sources[rel]["chunks"].values(), key=lambda m: m[1]):
+                    yield self._read(f, rel, meta)
+
+    def stats(self) -> Dict[str, int]:
+        size = self.chunks_path.stat().st_size if self.chunks_path.exists() else 0
+        return {"books": len(self.books()), "sources": len(self._sources), "chunks": self.live_count(), "dead": self._dead, "bytes": size}
+
+
+def main() -> None:
+    script_dir = Path(__file__).resolve().parent
+    parser = argparse.ArgumentParser(description="Ingest OCR book chunks into the passage store")
+    parser.add_argument("command", choices=["ingest", "stats", "show", "compact"])
+    parser.add_argument("chunk_id", nargs="?")
+    parser.add_argument("--root", default=os.getenv("WIKI_ROOT") or str(script_dir.parent))
+    parser.add_argument("--store", default=str(script_dir / "data" / "ocr_corpus"))
+    parser.add_argument("--source", action="append", help="Folder(s) under --root to ingest (default: ocr)")
+    args = parser.parse_args()
+
+    corpus = OcrCorpus(Path(args.store), Path(args.root), args.source or ["ocr"])
+    if args.command == "ingest":
+        s = corpus.ingest()
+        print(
+            f"✅ {s['sources']} sources ingested ({s['skipped']} unchanged): "
+            f"+{s['added']} passages, -{s['removed']}, {s['kept']} kept"
+        )
+    elif args.command == "compact":
+        corpus.compact()
+    elif args.command == "show":
+        chunk = corpus.get(args.chunk_id or "")
+        if chunk is None:
+            raise SystemExit(f"❌ No chunk {args.chunk_id!r}")
+        print(f"📖 {chunk.book} p.{chunk.page}  {chunk.source}:{chunk.line}  § {chunk.heading}\n\n{chunk.text}")
+        return
+
+    s = corpus.stats()
+    print(f"📚 {s['books']} books, {s['sources']} sources, {s['chunks']} passages ({s['dead']} dead records, {s['bytes'] / 1024:.0f} KB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""Retrieval Context for Classification Prompts
+
+Builds the "project context" block the AI classifier puts in front of an
+issue, so a small local model sees what BF1/FMS/eGov terms mean and how
+similar issues were classified before:
+- related docs: top BM25 passages from the wiki search index (wiki_search.py,
+  restricted to AI_CONTEXT_PATH, default `wiki/`), each trimmed to a share of
+  the budget;
+- similar past issues: previously classified issues from the classification
+  cache, ranked by IDF-weighted title overlap, with their category/priority;
+- everything is packed under a token budget (AI_CONTEXT_TOKENS, default 600)
+  using a local estimate (no tokenizer download, ~1 µs per word): past issues
+  get up to 40% of it, docs the rest, so prompt size and latency stay bounded;
+- the assembled block is cached per issue hash (and budget) in
+  data/prompt_context_cache.json, capped at CACHE_ENTRIES; the cache is dropped
+  whenever the wiki index fingerprint changes.
+
+Usage:
+    from prompt_context import PromptContextBuilder
+    builder = PromptContextBuilder.open(past_issues=classifier.cache.entries)
+    context = builder.build(key, title, body, labels)
+
+    python prompt_context.py "Lỗi đồng bộ tờ khai eCUS" --body "..."   # preview
+"""
+
+from __future__ import annotations
+
+import argparse
+import heapq
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from atomic_io import atomic_write_text
+from metrics import metrics
+from wiki_search import SearchIndex, tokenize
+
+DEFAULT_BUDGET = 600
+ISSUE_SHARE = 0.4
+MAX_PASSAGE_TOKENS = 200
+MIN_PASSAGE_TOKENS = 40
+QUERY_BODY_CHARS = 400
+CACHE_ENTRIES = 5000
+
+_PIECE_RE = re.compile(r"\w+|[^\w\s]")
+ISSUES_HEADER = "Similar past issues and how they were classified:"
+DOCS_HEADER = "Related project docs:"
+
+
+def _piece_tokens(piece: str) -> int:
+    # BPE vocabularies cover common English words whole; accented Vietnamese
+    # syllables and long identifiers split into several pieces.
+    if piece.isascii():
+        return 1 + len(piece) // 8
+    return 1 + len(piece) // 3
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token count (within ~20% for English/Vietnamese prose)."""
+    return sum(_piece_tokens(p) for p in _PIECE_RE.findall(text))
+
+
+def truncate_tokens(text: str, budget: int) -> str:
+    """Longest prefix of `text` estimated at <= `budget` tokens (ellipsis
+    included), cut between words."""
+    used = 0
+    for match in _PIECE_RE.finditer(text):
+        used += _piece_tokens(match.group())
+        if used > budget - 1:
+            prefix = text[: match.start()].rstrip()
+            return f"{prefix} …" if prefix else ""
+    return text
+
+
+class PromptContextBuilder:
+    """Top-k docs + similar past issues for one issue, packed under a budget."""
+
+    def __init__(
+        self,
+        search: Optional[SearchIndex],
+        past_issues: Callable[[], Dict[str, Dict]],
+        *,
+        cache_path: Optional[Path] = None,
+        budget: Optional[int] = None,
+        passages: Optional[int] = None,
+        issues: Optional[int] = None,
+        path_prefix: Optional[str] = None,
+    ):
+        self.search = search
+        self.past_issues = past_issues
+        self.cache_path = cache_path
+        self.budget = budget or int(os.getenv("AI_CONTEXT_TOKENS") or DEFAULT_BUDGET)
+        self.passages = passages or int(os.getenv("AI_CONTEXT_PASSAGES") or 3)
+        self.issues = issues or int(os.getenv("AI_CONTEXT_ISSUES") or 5)
+        self.path_prefix = path_prefix or os.getenv("AI_CONTEXT_PATH") or "wiki/"
+        self._lock = threading.Lock()
+        self._fingerprint = search.fingerprint() if search else ""
+        self._entries: Dict[str, str] = {}
+        self._dirty = False
+        # Inverted index over past issue titles, rebuilt when the cache grows:
+        # (entry count, rows, postings), replaced as a whole so concurrent
+        # builds never see rows and postings from different rebuilds.
+        self._issue_index: Tuple[int, List[Tuple[str, Dict, set]], Dict[str, List[int]]] = (-1, [], {})
+
+        if cache_path and cache_path.exists():
+            try:
+                data = json.loads(cache_path.read_text(encoding="utf-8"))
+            except ValueError:
+                data = {}
+            if data.get("fingerprint") == self._fingerprint:
+                self._entries = data.get("entries", {})
+
+    @classmethod
+    def open(cls, past_issues: Callable[[], Dict[str, Dict]], **kwargs) -> "PromptContextBuilder":
+        """Builder over the default search index; docs are skipped if it cannot load."""
+        data_dir = Path(__file__).resolve().parent / "data"
+        try:
+            search: Optional[SearchIndex] = SearchIndex.open()
+        except OSError as e:
+            print(f"⚠️  Wiki search index unavailable, classifying without docs: {e}")
+            search = None
+        kwargs.setdefault("cache_path", data_dir / "prompt_context_cache.json")
+        return cls(search, past_issues, **kwargs)
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty or not self.cache_path:
+                return
+            entries = dict(self._entries)
+            self._dirty = False
+        atomic_write_text(
+            self.cache_path,
+            json.dumps({"fingerprint": self._fingerprint, "entries": entries}, ensure_ascii=False),
+        )
+
+    # ------------------------------------------------------------------
+    # Assembly
+    # ------------------------------------------------------------------
+
+    def build(self, key: str, title: str, body: str, labels: Sequence[str], *, budget: Optional[int] = None) -> str:
+        """Context block for one issue ("" when nothing relevant fits)."""
+        budget = budget or self.budget
+        cache_key = f"{key}:{budget}"
+        with self._lock:
+            cached = self._entries.get(cache_key)
+        if cached is not None:
+            metrics.inc("prompt_context_cache_total", result="hit")
+            return cached
+
+        # Assembled outside the lock so classifier workers retrieve in parallel;
+        # two workers missing on the same key just build the same block twice.
+        metrics.inc("prompt_context_cache_total", result="miss")
+        with metrics.timer("prompt_context_seconds"):
+            context = self._assemble(key, title, body, labels, budget)
+        metrics.observe("prompt_context_tokens", estimate_tokens(context))
+        with self._lock:
+            self._entries[cache_key] = context
+            if len(self._entries) > CACHE_ENTRIES:
+                del self._entries[next(iter(self._entries))]
+            self._dirty = True
+        return context
+
+    def _assemble(self, key: str, title: str, body: str, labels: Sequence[str], budget: int) -> str:
+        issue_lines: List[str] = []
+        used = estimate_tokens(ISSUES_HEADER)
+        for entry in self._similar_issues(key, title, labels):
+            tags = f" (labels: {', '.join(entry['labels'])})" if entry.get("labels") else ""
+            line = f"- [{entry['category']}, {entry['priority']}] {entry['title']}{tags}"
+            cost = estimate_tokens(line)
+            if used + cost > budget * ISSUE_SHARE:
+                break
+            issue_lines.append(line)
+            used += cost
+        if not issue_lines:
+            used = 0
+
+        doc_blocks: List[str] = []
+        if self.search is not None:
+            query = f"{title} {' '.join(labels)} {body[:QUERY_BODY_CHARS]}"
+            used += estimate_tokens(DOCS_HEADER)
+            for hit in self.search.search(query, limit=self.passages, path_prefix=self.path_prefix, snippets=False):
+                remaining = budget - used
+                if remaining < MIN_PASSAGE_TOKENS:
+                    break
+                header = f"[{hit.path}" + (f" § {hit.heading}]" if hit.heading else "]")
+                text = " ".join(self.search.passage(hit).split())
+                text = truncate_tokens(text, min(MAX_PASSAGE_TOKENS, remaining) - estimate_tokens(header))
+                if not text:
+                    continue
+                block = f"{header}\n{text}"
+                doc_blocks.append(block)
+                used += estimate_tokens(block)
+
+        parts = []
+        if issue_lines:
+            parts.append(ISSUES_HEADER + "\n" + "\n".join(issue_lines))
+        if doc_blocks:
+            parts.append(DOCS_HEADER + "\n" + "\n\n".join(doc_blocks))
+        return "\n\n".join(parts)
+
+    def _similar_issues(self, key: str, title: str, labels: Sequence[str]) -> List[Dict]:
+        entries = self.past_issues()
+        count, issue_rows, postings = self._issue_index
+        if len(entries) != count:
+            count, issue_rows, postings = self._issue_index = self._index_issues(entries)
+        n = len(issue_rows)
+        if not n:
+            return []
+
+        query = set(tokenize(title)) | {f"label:{lb.lower()}" for lb in labels}
+        scores: Counter = Counter()
+        for term in query:
+            rows = postings.get(term, ())
+            idf = math.log(1 + n / len(rows)) if rows else 0.0
+            for row in rows:
+                scores[row] += idf
+        # Normalize by the candidate's length before ranking, so long titles do
+        # not dominate and a short, closer title can still make the top k.
+        ranked = (
+            (score / math.sqrt(len(issue_rows[row][2])), row)
+            for row, score in scores.items()
+            if issue_rows[row][0] != key
+        )
+        return [issue_rows[row][1] for _, row in heapq.nlargest(self.issues, ranked, key=lambda x: x[0])]
+
+    @staticmethod
+    def _index_issues(entries: Dict[str, Dict]) -> Tuple[int, List[Tuple[str, Dict, set]], Dict[str, List[int]]]:
+        rows: List[Tuple[str, Dict, set]] = []
+        postings: Dict[str, List[int]] = {}
+        for entry_key, entry in entries.items():
+            if not entry.get("title") or not entry.get("category"):
+                continue
+            terms = set(tokenize(entry["title"])) | {f"label:{lb.lower()}" for lb in entry.get("labels", ())}
+            for term in terms:
+                postings.setdefault(term, []).append(len(rows))
+            rows.append((entry_key, entry, terms))
+        return len(entries), rows, postings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Preview the classifier's retrieval context for an issue")
+    parser.add_argument("title")
+    parser.add_argument("--body", default="")
+    parser.add_argument("--labels", default="", help="Comma-separated")
+    parser.add_argument("--budget", type=int)
+    args = parser.parse_args()
+
+    from ai_classifier import ClassificationCache
+
+    cache_file = os.getenv("AI_CACHE_FILE") or Path(__file__).resolve().parent / "data" / "classification_cache.json"
+    cache = ClassificationCache(Path(cache_file))
+    builder = PromptContextBuilder.open(cache.entries, cache_path=None)
+    labels = [lb.strip() for lb in args.labels.split(",") if lb.strip()]
+    context = builder.build(ClassificationCache.key(args.title, args.body, labels), args.title, args.body, labels, budget=args.budget)
+    print(context or "(no relevant context)")
+    print(f"\n📏 ~{estimate_tokens(context)} tokens (budget {args.budget or builder.budget})")
+
+
+if __name__ == "__main__":
+    main()
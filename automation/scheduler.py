@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""Timer-heap Job Scheduler
+
+Replaces fixed-interval polling with a scheduler that sleeps until the next due
+job:
+- jobs are scheduled by 5-field cron expressions (`minute hour dom month dow`,
+  with `*`, lists, ranges, `*/step`, and `@hourly` / `@daily` / `@weekly`
+  shortcuts) or a fixed interval;
+- due times live in a heap, so each wakeup only looks at the earliest job;
+- last-run times are persisted (default: data/scheduler_state.json), so a restart
+  neither re-runs a job that already fired nor silently skips one that was missed;
+- missed fire times (daemon stopped, loop stalled, laptop asleep) are handled by
+  a per-job misfire policy:
+    coalesce  run once for all missed slots, if the latest one is within `grace`
+    skip      drop missed slots and wait for the next one
+    all       run once per missed slot (capped at MAX_CATCH_UP)
+
+Sleeps are capped at `max_sleep` seconds so wall-clock jumps (suspend/resume, NTP
+or DST changes) are noticed even though asyncio timers are monotonic.
+
+Usage:
+    scheduler = Scheduler(state_path, dispatch=run_job)
+    scheduler.add(Job("daily_briefing", cron="0 7 * * *", grace=timedelta(hours=4)))
+    scheduler.add(Job("heartbeat", interval=timedelta(minutes=5), misfire="skip"))
+    await scheduler.run(stop_event)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import json
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, FrozenSet, List, Optional, Tuple
+
+from atomic_io import atomic_write_text
+
+logger = logging.getLogger(__name__)
+
+MISFIRE_POLICIES = ("coalesce", "skip", "all")
+MAX_CATCH_UP = 24
+
+_SHORTCUTS = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+    "@monthly": "0 0 1 * *",
+}
+
+
+class CronExpression:
+    """A parsed 5-field cron expression evaluated in local (naive) time."""
+
+    _FIELDS = (("minute", 0, 59), ("hour", 0, 23), ("day", 1, 31), ("month", 1, 12), ("weekday", 0, 7))
+
+    def __init__(self, expr: str):
+        self.expr = expr.strip()
+        fields = _SHORTCUTS.get(self.expr, self.expr).split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expr!r}")
+
+        parsed = [self._parse_field(f, lo, hi) for f, (_, lo, hi) in zip(fields, self._FIELDS)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        self.weekdays = frozenset(d % 7 for d in weekdays)  # 7 and 0 are both Sunday
+        # Standard cron: when both day fields are restricted, either may match.
+        self._day_any = fields[2] == "*"
+        self._weekday_any = fields[4] == "*"
+
+    @staticmethod
+    def _parse_field(field: str, lo: int, hi: int) -> FrozenSet[int]:
+        values = set()
+        for part in field.split(","):
+            rng, _, step_s = part.partition("/")
+            step = int(step_s) if step_s else 1
+            if rng == "*":
+                start, end = lo, hi
+            elif "-" in rng:
+                a, b = rng.split("-", 1)
+                start, end = int(a), int(b)
+            else:
+                start = int(rng)
+                end = hi if step_s else start
+            if step < 1 or start < lo or end > hi or start > end:
+                raise ValueError(f"Invalid cron field {field!r} (allowed {lo}-{hi})")
+            values.update(range(start, end + 1, step))
+        return frozenset(values)
+
+    def _day_matches(self, dt: datetime) -> bool:
+        dom = dt.day in self.days
+        dow = (dt.weekday() + 1) % 7 in self.weekdays  # cron: Sunday = 0
+        if self._day_any:
+            return dow
+        if self._weekday_any:
+            return dom
+        return dom or dow
+
+    def next_after(self, dt: datetime) -> datetime:
+        """First matching minute strictly after `dt`."""
+        t = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = t + timedelta(days=366 * 5)
+        while t < limit:
+            if t.month not in self.months:
+                t = (t.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+                continue
+            if not self._day_matches(t):
+                t = t.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+            if t.hour not in self.hours:
+                t = t.replace(minute=0) + timedelta(hours=1)
+                continue
+            if t.minute not in self.minutes:
+                t += timedelta(minutes=1)
+                continue
+            return t
+        raise ValueError(f"Cron expression never fires: {self.expr!r}")
+
+    def __repr__(self) -> str:
+        return f"CronExpression({self.expr!r})"
+
+
+@dataclass
+class Job:
+    name: str
+    cron: Optional[str] = None
+    interval: Optional[timedelta] = None
+    misfire: str = "coalesce"
+    grace: Optional[timedelta] = None  # coalesce: max lateness still worth running; None = any
+    # Execution hints for the dispatcher (see daemon.JobExecutor).
+    timeout: Optional[float] = None  # seconds before the run is cancelled
+    group: Optional[str] = None  # runs in the same group never overlap
+
+    def __post_init__(self) -> None:
+        if (self.cron is None) == (self.interval is None):
+            raise ValueError(f"Job {self.name!r} needs exactly one of cron / interval")
+        if self.misfire not in MISFIRE_POLICIES:
+            raise ValueError(f"Unknown misfire policy {self.misfire!r}")
+        self._cron = CronExpression(self.cron) if self.cron else None
+
+    def next_after(self, dt: datetime) -> datetime:
+        if self._cron is not None:
+            return self._cron.next_after(dt)
+        return dt + self.interval
+
+    @property
+    def spec(self) -> str:
+        return self.cron if self.cron else f"every {int(self.interval.total_seconds())}s"
+
+
+class Scheduler:
+    """Runs jobs at their due times from a heap; persists last runs between restarts."""
+
+    def __init__(
+        self,
+        state_path: Path,
+        dispatch: Callable[[str], Awaitable[None]],
+        *,
+        max_sleep: float = 300.0,
+        clock: Callable[[], datetime] = datetime.now,
+    ):
+        self.state_path = state_path
+        self._dispatch = dispatch
+        self._max_sleep = max_sleep
+        self._clock = clock
+        self._jobs: Dict[str, Job] = {}
+        self._heap: List[Tuple[datetime, str]] = []
+        self._last_runs: Dict[str, datetime] = self._load_state()
+
+    # ------------------------------------------------------------------
+    # State
+    # ------------------------------------------------------------------
+
+    def _load_state(self) -> Dict[str, datetime]:
+        if not self.state_path.exists():
+            return {}
+        try:
+            data = json.loads(self.state_path.read_text(encoding="utf-8"))
+            return {name: datetime.fromisoformat(v["last_run"]) for name, v in data.get("jobs", {}).items()}
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable scheduler state {self.state_path}: {e}")
+            return {}
+
+    def _save_state(self) -> None:
+        payload = {"jobs": {name: {"last_run": dt.isoformat()} for name, dt in sorted(self._last_runs.items())}}
+        atomic_write_text(self.state_path, json.dumps(payload, indent=2) + "\n")
+
+    def last_run(self, name: str) -> Optional[datetime]:
+        return self._last_runs.get(name)
+
+    # ------------------------------------------------------------------
+    # Jobs
+    # ------------------------------------------------------------------
+
+    def add(self, job: Job) -> None:
+        if job.name in self._jobs:
+            raise ValueError(f"Duplicate job {job.name!r}")
+        self._jobs[job.name] = job
+        last = self._last_runs.get(job.name)
+        # Never-run jobs start from now: no catch-up for slots before the first start.
+        due = job.next_after(last) if last else job.next_after(self._clock())
+        heapq.heappush(self._heap, (due, job.name))
+
+    def next_runs(self) -> List[Tuple[str, datetime]]:
+        return sorted(((name, due) for due, name in self._heap), key=lambda x: x[1])
+
+    def _missed_slots(self, job: Job, due: datetime, now: datetime) -> List[datetime]:
+        """All fire times in (.., now] starting at `due`, oldest first (bounded)."""
+        slots = [due]
+        while len(slots) <= MAX_CATCH_UP:
+            nxt = job.next_after(slots[-1])
+            if nxt > now:
+                break
+            slots.append(nxt)
+        return slots
+
+    def _runs_for(self, job: Job, slots: List[datetime], now: datetime) -> List[datetime]:
+        """Slots to actually run, per the job's misfire policy."""
+        latest = slots[-1]
+        on_time = len(slots) == 1 and now - latest < timedelta(minutes=1)
+        if on_time:
+            return slots
+        if job.misfire == "skip":
+            return []
+        if job.misfire == "all":
+            return slots[-MAX_CATCH_UP:]
+        if job.grace is not None and now - latest > job.grace:
+            return []
+        return [latest]
+
+    # ------------------------------------------------------------------
+    # Loop
+    # ------------------------------------------------------------------
+
+    async def run(self, stop: asyncio.Event) -> None:
+        """Dispatch due jobs until `stop` is set."""
+        for name, due in self.next_runs():
+            logger.info(f"Scheduled {name} ({self._jobs[name].spec}): next at {due:%Y-%m-%d %H:%M}")
+
+        while not stop.is_set() and self._heap:
+            now = self._clock()
+            due, name = self._heap[0]
+            if due > now:
+                delay = min((due - now).total_seconds(), self._max_sleep)
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._heap)
+            job = self._jobs[name]
+            slots = self._missed_slots(job, due, now)
+            runs = self._runs_for(job, slots, now)
+            if len(slots) > 1 or not runs:
+                logger.warning(
+                    f"Job {name} missed {len(slots)}{'+' if len(slots) > MAX_CATCH_UP else ''} slot(s) since {due:%Y-%m-%d %H:%M}; "
+                    f"policy={job.misfire}, running {len(runs)}"
+                )
+
+            # Record before dispatching: a crash mid-job must not replay it on restart.
+            self._last_runs[name] = slots[-1]
+            self._save_state()
+            heapq.heappush(self._heap, (job.next_after(max(slots[-1], now)), name))
+
+            for _ in runs:
+                if stop.is_set():
+                    break
+                await self._dispatch(name)
@@ -0,0 +1,573 @@
+#!/usr/bin/env python3
+"""Telegram Notifications (Bot API client + async outbox)
+
+`TelegramNotifier` is a thin Bot API client over one persistent `requests.Session`
+(keep-alive instead of a new TLS connection per message).
+
+`TelegramOutbox` sits in front of it inside the daemon's event loop:
+- `send()` / `send_document()` only enqueue; a single worker delivers in the
+  background, high priority (errors) before normal;
+- low-priority notices (heartbeats, "unchanged" reports) are coalesced into one
+  digest message per `digest_interval`; notices sharing a `coalesce` key collapse
+  to the latest one with a repeat count;
+- sends are spaced per chat (`per_chat_per_minute`, Telegram allows ~20/min in
+  groups); a 429 waits the server's `retry_after`; network errors and 5xx retry
+  with exponential backoff; a 400 "can't parse entities" is resent as plain text;
+- undelivered messages are spilled to disk (default: data/telegram_outbox.json)
+  when delivery keeps failing and on shutdown, and are re-queued on next start.
+
+Large payloads:
+- text over Telegram's 4096-character limit is split by `split_message` at the
+  best boundary available (heading > blank line > line > space); an open ```
+  fence is closed at the cut and reopened in the next part, and parts are
+  numbered "(i/n)";
+- documents larger than `compress_over` bytes are uploaded as a .zip when that
+  saves at least 20%; captions are cut to 1024 characters;
+- every uploaded document's `file_id` is cached by content hash + file name
+  (default: data/telegram_file_ids.json), so resending an unchanged file sends
+  the reference instead of re-uploading it.
+
+Env (daemon):
+    TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID
+    TELEGRAM_PER_CHAT_PER_MINUTE=20   # send rate per chat
+    TELEGRAM_DIGEST_INTERVAL=3600     # seconds between low-priority digests
+    TELEGRAM_MAX_RETRIES=8            # transient failures before spilling to disk
+    TELEGRAM_COMPRESS_OVER_KB=512     # zip documents above this size
+
+Usage:
+    notifier = TelegramNotifier(bot_token, chat_id)
+    outbox = TelegramOutbox(notifier, data_dir / "telegram_outbox.json")
+    await outbox.start()
+    outbox.send("❌ *Task failed*", priority="high")
+    outbox.send("💓 Heartbeat: 10:05", priority="low", coalesce="heartbeat")
+    await outbox.close()
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import itertools
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+import zipfile
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+from atomic_io import atomic_write_text
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+MESSAGE_LIMIT = 4096
+CAPTION_LIMIT = 1024
+
+_FENCE_RE = re.compile(r"^\s*(```|~~~)", re.MULTILINE)
+# Preferred cut points, best first: before a heading, at a blank line, at a line end, at a space.
+_BOUNDARIES = (re.compile(r"\n(?=#{1,6} )"), re.compile(r"\n\s*\n"), re.compile(r"\n"), re.compile(r" "))
+
+
+def _open_fence(text: str) -> Optional[str]:
+    """The fence marker left open at the end of `text`, if any."""
+    marker: Optional[str] = None
+    for m in _FENCE_RE.finditer(text):
+        marker = None if marker else m.group(1)
+    return marker
+
+
+def split_message(text: str, limit: int = MESSAGE_LIMIT) -> List[str]:
+    """Split `text` into parts of at most `limit` characters at safe boundaries."""
+    if len(text) <= limit:
+        return [text]
+
+    budget = limit - 16  # room for the "(i/n)" suffix and fence repair
+    parts: List[str] = []
+    rest = text
+    reopen = ""
+    while rest:
+        rest = reopen + rest
+        if len(rest) <= budget:
+            parts.append(rest)
+            break
+
+        window = rest[:budget]
+        cut = 0
+        for boundary in _BOUNDARIES:
+            # Only accept a boundary in the back half, so parts don't get tiny.
+            hits = [m.start() for m in boundary.finditer(window) if m.start() > budget // 2]
+            if hits:
+                cut = hits[-1]
+                break
+        if not cut:
+            cut = budget
+
+        part, rest = rest[:cut].rstrip(), rest[cut:].lstrip("\n")
+        fence = _open_fence(part)
+        if fence:
+            part += "\n" + fence
+            reopen = fence + "\n"
+        else:
+            reopen = ""
+        parts.append(part)
+
+    total = len(parts)
+    return [f"{p}\n({i}/{total})" for i, p in enumerate(parts, 1)]
+
+
+class FileIdCache:
+    """Content hash -> Telegram file_id of a document already uploaded by this bot."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        if path.exists():
+            try:
+                self._entries = json.loads(path.read_text(encoding="utf-8")).get("files", {})
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable file_id cache {path}: {e}")
+
+    @staticmethod
+    def key(file_path: Path) -> str:
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return f"{digest.hexdigest()}:{file_path.name}"
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry["file_id"] if entry else None
+
+    def put(self, key: str, file_id: str) -> None:
+        with self._lock:
+            self._entries[key] = {"file_id": file_id, "sent_at": datetime.now().isoformat(timespec="seconds")}
+            self._save_locked()
+
+    def drop(self, key: str) -> None:
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._save_locked()
+
+    def _save_locked(self) -> None:
+        payload = json.dumps({"files": self._entries}, indent=2, sort_keys=True) + "\n"
+        atomic_write_text(self.path, payload)
+
+
+class TelegramAPIError(Exception):
+    """Non-2xx Bot API response."""
+
+    def __init__(self, status: int, description: str, retry_after: Optional[float] = None):
+        super().__init__(f"{status}: {description}")
+        self.status = status
+        self.description = description
+        self.retry_after = retry_after
+
+    @property
+    def transient(self) -> bool:
+        return self.status == 429 or self.status >= 500
+
+
+class TelegramNotifier:
+    """Send notifications via Telegram bot."""
+
+    def __init__(
+        self,
+        bot_token: str,
+        chat_id: str,
+        *,
+        session: Optional[requests.Session] = None,
+        file_ids: Optional[FileIdCache] = None,
+        compress_over: int = 512 * 1024,
+    ):
+        self.bot_token = bot_token
+        self.chat_id = chat_id
+        self.base_url = f"https://api.telegram.org/bot{bot_token}"
+        self._session = session or requests.Session()
+        self._file_ids = file_ids
+        self._compress_over = compress_over
+
+    def close(self) -> None:
+        self._session.close()
+
+    def request(
+        self,
+        method: str,
+        data: Dict[str, Any],
+        *,
+        file_path: Optional[Path] = None,
+        file_name: Optional[str] = None,
+        file_field: str = "document",
+        timeout: float = 30,
+    ) -> Dict[str, Any]:
+        """Call a Bot API method; raises TelegramAPIError / requests exceptions."""
+        url = f"{self.base_url}/{method}"
+        start = time.perf_counter()
+        try:
+            if file_path is not None:
+                metrics.inc("http_request_bytes_total", file_path.stat().st_size, client="telegram")
+                with open(file_path, "rb") as f:
+                    files = {file_field: (file_name or file_path.name, f)}
+                    resp = self._session.post(url, data=data, files=files, timeout=timeout)
+            else:
+                resp = self._session.post(url, json=data, timeout=timeout)
+        except Exception:
+            metrics.inc("http_requests_total", client="telegram", method=method, status="error")
+            raise
+        metrics.observe("http_request_seconds", time.perf_counter() - start, client="telegram")
+        metrics.inc("http_requests_total", client="telegram", method=method, status=str(resp.status_code))
+
+        try:
+            body = resp.json()
+        except ValueError:
+            body = {}
+        if resp.ok and body.get("ok", True):
+            return body.get("result") or {}
+
+        retry_after = (body.get("parameters") or {}).get("retry_after")
+        raise TelegramAPIError(
+            resp.status_code,
+            str(body.get("description") or resp.reason),
+            float(retry_after) if retry_after is not None else None,
+        )
+
+    def deliver_document(self, chat_id: str, file_path: Path, caption: str = "") -> None:
+        """sendDocument by cached file_id when possible, else upload (zipped if large)."""
+        caption = caption[:CAPTION_LIMIT]
+        key = FileIdCache.key(file_path) if self._file_ids else None
+        file_id = self._file_ids.get(key) if key else None
+        if file_id:
+            try:
+                self.request("sendDocument", {"chat_id": chat_id, "document": file_id, "caption": caption})
+                metrics.inc("telegram_file_id_reuse_total")
+                logger.info(f"Telegram document re-sent by file_id: {file_path.name}")
+                return
+            except TelegramAPIError as e:
+                if e.status != 400:
+                    raise
+                logger.info(f"Cached file_id rejected ({e.description}); uploading again")
+                self._file_ids.drop(key)
+
+        upload, name, cleanup = self._prepare_upload(file_path)
+        try:
+            result = self.request(
+                "sendDocument", {"chat_id": chat_id, "caption": caption}, file_path=upload, file_name=name, timeout=120
+            )
+        finally:
+            if cleanup:
+                upload.unlink(missing_ok=True)
+        logger.info(f"Telegram document sent: {name}")
+
+        file_id = (result.get("document") or {}).get("file_id")
+        if key and file_id:
+            self._file_ids.put(key, file_id)
+
+    def _prepare_upload(self, file_path: Path) -> Tuple[Path, str, bool]:
+        """(path to upload, file name, is temporary): zip when large and compressible."""
+        size = file_path.stat().st_size
+        if not self._compress_over or size <= self._compress_over:
+            return file_path, file_path.name, False
+
+        fd, tmp_name = tempfile.mkstemp(prefix="telegram-", suffix=".zip")
+        os.close(fd)
+        tmp = Path(tmp_name)
+        with zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=9) as zf:
+            zf.write(file_path, arcname=file_path.name)
+        if tmp.stat().st_size > size * 0.8:
+            tmp.unlink(missing_ok=True)
+            return file_path, file_path.name, False
+        logger.info(f"Compressed {file_path.name}: {size} -> {tmp.stat().st_size} bytes")
+        return tmp, f"{file_path.name}.zip", True
+
+    def send_message(self, text: str, parse_mode: str = "Markdown") -> bool:
+        """Send text message to Telegram (synchronous, errors are logged)."""
+        try:
+            for part in split_message(text):
+                self.request("sendMessage", {"chat_id": self.chat_id, "text": part, "parse_mode": parse_mode}, timeout=10)
+            logger.info("Telegram message sent successfully")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to send Telegram message: {e}")
+            return False
+
+    def send_document(self, file_path: Path, caption: str = "") -> bool:
+        """Send document to Telegram (synchronous, errors are logged)."""
+        try:
+            self.deliver_document(self.chat_id, file_path, caption)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to send Telegram document: {e}")
+            return False
+
+
+@dataclass
+class OutboundMessage:
+    chat_id: str
+    text: str = ""  # message text, or document caption
+    parse_mode: Optional[str] = "Markdown"
+    document: Optional[str] = None  # file path for sendDocument
+    priority: str = "normal"
+    attempts: int = 0
+    created: float = field(default_factory=time.time)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "OutboundMessage":
+        known = {k: v for k, v in data.items() if k in cls.__dataclass_fields__}
+        return cls(**known)
+
+
+class TelegramOutbox:
+    """Asynchronous, rate-limited, persistent delivery queue for TelegramNotifier."""
+
+    def __init__(
+        self,
+        notifier: TelegramNotifier,
+        spill_path: Path,
+        *,
+        per_chat_per_minute: float = 20,
+        digest_interval: float = 3600,
+        max_retries: int = 8,
+        max_backoff: float = 300,
+    ):
+        self._notifier = notifier
+        self._spill_path = spill_path
+        self._min_gap = 60.0 / per_chat_per_minute if per_chat_per_minute > 0 else 0.0
+        self._digest_interval = digest_interval
+        self._max_retries = max_retries
+        self._max_backoff = max_backoff
+
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._seq = itertools.count()
+        self._next_send: Dict[str, float] = {}  # chat_id -> loop time of next allowed send
+        self._digest: Dict[str, List[Tuple[str, int, str]]] = {}  # chat -> [(key, count, text)]
+        self._held: List[OutboundMessage] = []  # gave up for now; spilled to disk
+        self._tasks: List[asyncio.Task] = []
+        self._closing = False
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    async def start(self) -> None:
+        self._queue = asyncio.PriorityQueue()
+        restored = self._load_spill()
+        if restored:
+            logger.info(f"Re-queued {len(restored)} undelivered Telegram message(s)")
+        for msg in restored:
+            self._put(msg)
+        self._tasks = [
+            asyncio.create_task(self._worker(), name="telegram-outbox"),
+            asyncio.create_task(self._digest_loop(), name="telegram-digest"),
+        ]
+
+    async def close(self, timeout: float = 10.0) -> None:
+        """Flush digests, try to drain the queue for `timeout` seconds, spill the rest."""
+        if self._queue is None:
+            return
+        self._closing = True
+        self._flush_digests()
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Telegram outbox not drained before shutdown")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+        while not self._queue.empty():
+            self._held.append(self._queue.get_nowait()[2])
+            self._queue.task_done()
+        self._save_spill()
+
+    # ------------------------------------------------------------------
+    # Enqueue
+    # ------------------------------------------------------------------
+
+    def send(
+        self,
+        text: str,
+        *,
+        priority: str = "normal",
+        coalesce: Optional[str] = None,
+        chat_id: Optional[str] = None,
+        parse_mode: Optional[str] = "Markdown",
+    ) -> None:
+        """Queue a text message; low priority goes into the next digest."""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority {priority!r}")
+        chat = str(chat_id or self._notifier.chat_id)
+        if priority == "low" and not self._closing:
+            self._add_to_digest(chat, text, coalesce)
+            metrics.inc("telegram_coalesced_total")
+            return
+        self._put(OutboundMessage(chat_id=chat, text=text, parse_mode=parse_mode, priority=priority))
+
+    def send_document(self, file_path: Path, caption: str = "", *, chat_id: Optional[str] = None) -> None:
+        chat = str(chat_id or self._notifier.chat_id)
+        self._put(OutboundMessage(chat_id=chat, text=caption, parse_mode=None, document=str(file_path)))
+
+    def _put(self, msg: OutboundMessage) -> None:
+        if self._queue is None:
+            raise RuntimeError("TelegramOutbox.start() has not been called")
+        if msg.document or len(msg.text) <= MESSAGE_LIMIT:
+            self._queue.put_nowait((PRIORITIES[msg.priority], next(self._seq), msg))
+            return
+        # Queue each part on its own so a retry or spill never resends the others.
+        for part in split_message(msg.text):
+            piece = OutboundMessage(chat_id=msg.chat_id, text=part, parse_mode=msg.parse_mode, priority=msg.priority)
+            self._queue.put_nowait((PRIORITIES[msg.priority], next(self._seq), piece))
+
+    @property
+    def pending(self) -> int:
+        return (self._queue.qsize() if self._queue else 0) + len(self._held)
+
+    # ------------------------------------------------------------------
+    # Digest
+    # ------------------------------------------------------------------
+
+    def _add_to_digest(self, chat: str, text: str, key: Optional[str]) -> None:
+        entries = self._digest.setdefault(chat, [])
+        if key is not None:
+            for i, (k, count, _) in enumerate(entries):
+                if k == key:
+                    entries[i] = (k, count + 1, text)
+                    return
+        entries.append((key or "", 1, text))
+
+    def _flush_digests(self) -> None:
+        for chat, entries in self._digest.items():
+            if not entries:
+                continue
+            lines = [f"{text} (×{count})" if count > 1 else text for _, count, text in entries]
+            header = f"🗒️ *Digest* ({datetime.now().strftime('%H:%M')})"
+            self._put(OutboundMessage(chat_id=chat, text=header + "\n\n" + "\n".join(lines)))
+        self._digest = {}
+
+    async def _digest_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._digest_interval)
+            self._flush_digests()
+
+    # ------------------------------------------------------------------
+    # Delivery
+    # ------------------------------------------------------------------
+
+    async def _worker(self) -> None:
+        assert self._queue is not None
+        while True:
+            _, _, msg = await self._queue.get()
+            try:
+                await self._deliver(msg)
+            except asyncio.CancelledError:
+                self._held.append(msg)
+                raise
+            except Exception as e:
+                logger.error(f"Dropping Telegram message after unexpected error: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _pace(self, chat: str) -> None:
+        loop = asyncio.get_running_loop()
+        wait = self._next_send.get(chat, 0.0) - loop.time()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        self._next_send[chat] = loop.time() + self._min_gap
+
+    def _hold_off(self, chat: str, seconds: float) -> None:
+        loop = asyncio.get_running_loop()
+        self._next_send[chat] = max(self._next_send.get(chat, 0.0), loop.time() + seconds)
+
+    async def _deliver(self, msg: OutboundMessage) -> None:
+        while True:
+            await self._pace(msg.chat_id)
+            try:
+                await asyncio.to_thread(self._request, msg)
+                if self._held:
+                    # Back online: give spilled messages another chance.
+                    for held in self._held:
+                        held.attempts = 0
+                        self._put(held)
+                    self._held = []
+                    self._save_spill()
+                return
+            except TelegramAPIError as e:
+                if e.status == 429:
+                    metrics.inc("telegram_rate_limited_total")
+                    delay = e.retry_after if e.retry_after is not None else self._backoff(msg)
+                    logger.warning(f"Telegram rate limited, retrying in {delay:.0f}s")
+                    self._hold_off(msg.chat_id, delay)
+                    continue
+                if e.status == 400 and msg.parse_mode and "parse" in e.description.lower():
+                    logger.warning("Telegram could not parse markup; resending as plain text")
+                    msg.parse_mode = None
+                    continue
+                if not e.transient:
+                    logger.error(f"Telegram rejected message ({e}); dropping")
+                    return
+                error: Exception = e
+            except (requests.RequestException, OSError) as e:
+                error = e
+
+            msg.attempts += 1
+            if msg.attempts >= self._max_retries:
+                logger.error(f"Telegram unreachable after {msg.attempts} attempts ({error}); spilling to disk")
+                metrics.inc("telegram_spilled_total")
+                self._held.append(msg)
+                self._save_spill()
+                return
+            delay = self._backoff(msg)
+            logger.warning(f"Telegram send failed ({error}); retry {msg.attempts} in {delay:.0f}s")
+            self._hold_off(msg.chat_id, delay)
+
+    def _backoff(self, msg: OutboundMessage) -> float:
+        return min(self._max_backoff, 2.0 ** max(0, msg.attempts))
+
+    def _request(self, msg: OutboundMessage) -> None:
+        if msg.document:
+            path = Path(msg.document)
+            if not path.exists():
+                logger.warning(f"Skipping Telegram document, file is gone: {path}")
+                return
+            self._notifier.deliver_document(msg.chat_id, path, msg.text)
+            return
+
+        data: Dict[str, Any] = {"chat_id": msg.chat_id, "text": msg.text}
+        if msg.parse_mode:
+            data["parse_mode"] = msg.parse_mode
+        self._notifier.request("sendMessage", data, timeout=10)
+        logger.info("Telegram message sent successfully")
+
+    # ------------------------------------------------------------------
+    # Spill file
+    # ------------------------------------------------------------------
+
+    def _load_spill(self) -> List[OutboundMessage]:
+        if not self._spill_path.exists():
+            return []
+        try:
+            data = json.loads(self._spill_path.read_text(encoding="utf-8"))
+            return [OutboundMessage.from_dict(m) for m in data.get("messages", [])]
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable Telegram outbox {self._spill_path}: {e}")
+            return []
+
+    def _save_spill(self) -> None:
+        if not self._held:
+            self._spill_path.unlink(missing_ok=True)
+            return
+        payload = {"messages": [m.to_dict() for m in self._held]}
+        atomic_write_text(self._spill_path, json.dumps(payload, ensure_ascii=False, indent=2) + "\n")
@@ -0,0 +1,477 @@
+#!/usr/bin/env python3
+"""Wiki Full-text Search (BM25)
+
+An inverted index over the markdown under wiki/ and ocr/ (configurable), so the
+briefing generator, the classifier prompts and humans can pull context from the
+project docs and the Vietnamese OCR book:
+- documents are split into passages: one per heading section, long sections
+  are cut at blank lines (~MAX_PASSAGE_CHARS), so a hit points at a section,
+  not at a 60 KB book chunk;
+- tokenization is Vietnamese-aware: text is NFC-normalized, lowercased and
+  diacritic-folded (`học sâu` -> `hoc sau`, `đ` -> `d`), so queries match with
+  or without accents; adjacent syllable pairs are indexed as bigrams, which
+  ranks multi-syllable words and phrases (`hoc sau`, `nhan dang`) above passages
+  that merely contain both syllables somewhere;
+- files under CORPUS_SOURCES (ocr/) are OCR book chunks: their passages come
+  from the OCR corpus pipeline (ocr_corpus.py: normalized text, page numbers),
+  with the same boundaries as the passage store;
+- heading words count twice (they describe the whole passage);
+- ranking is Okapi BM25 (k1=1.2, b=0.75);
+- the index is incremental: `update()` stats the sources and re-tokenizes only
+  new/changed files (mtime + size). Passages of changed/removed files become
+  tombstones (skipped by queries), new postings go to an in-memory delta that
+  `save()` merges; postings are rewritten without tombstones only once they
+  exceed COMPACT_RATIO of the index;
+- it is stored gzip-compressed (default: data/search_index.bin.gz) as a small
+  JSON header (files, passages), the vocabulary as one newline-joined string and
+  all postings as one packed uint32 `[passage, tf, ...]` array plus offsets.
+  Loading is a decompress, a split and two `array.frombytes` calls; a query
+  slices out the postings of its terms only.
+
+Usage:
+    python wiki_search.py "kafka consumer group"
+    python wiki_search.py "nhận dạng văn bản" -n 5 --path ocr/
+    python wiki_search.py --stats
+
+    from wiki_search import SearchIndex
+    index = SearchIndex.open()          # load + update + save
+    for hit in index.search("keycloak forgot password", limit=5):
+        print(hit.path, hit.heading, hit.score, hit.snippet)
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import struct
+import sys
+import heapq
+import json
+import math
+import os
+import re
+import time
+import unicodedata
+from array import array
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from atomic_io import atomic_write_bytes
+from ocr_corpus import chunk_lines, parse_source_name
+
+DEFAULT_SOURCES = ("wiki", "ocr")
+CORPUS_SOURCES = ("ocr",)
+MAX_PASSAGE_CHARS = 1500
+SNIPPET_CHARS = 200
+K1 = 1.2
+B = 0.75
+# Rewrite postings without removed passages once they are this share of the index.
+COMPACT_RATIO = 0.2
+GZIP_LEVEL = 3
+
+_TOKEN_RE = re.compile(r"\w+")
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+_FOLD = str.maketrans({"đ": "d", "Đ": "d"})
+
+
+def fold(text: str) -> str:
+    """Lowercase and strip diacritics (Vietnamese tone and vowel marks, đ)."""
+    decomposed = unicodedata.normalize("NFD", text.translate(_FOLD).lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(fold(text))
+
+
+def terms(tokens: Sequence[str]) -> List[str]:
+    """Index terms: the tokens plus adjacent-token bigrams (`"hoc sau"`)."""
+    return list(tokens) + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+
+def split_passages(text: str) -> Iterator[Tuple[str, int, str]]:
+    """(heading, first line, text) per heading section; long sections are split
+    at blank lines. Headings inside code fences are ignored."""
+    heading = ""
+    start = 1
+    buf: List[str] = []
+    size = 0
+    in_fence = False
+
+    for lineno, line in enumerate(text.split("\n"), 1):
+        if line.lstrip().startswith(("```", "~~~")):
+            in_fence = not in_fence
+        match = None if in_fence else _HEADING_RE.match(line)
+        if match or (size >= MAX_PASSAGE_CHARS and not in_fence and not line.strip()):
+            if any(part.strip() for part in buf):
+                yield heading, start, "\n".join(buf)
+            buf, size, start = [], 0, lineno
+            if match:
+                heading = match.group(2).strip()
+        buf.append(line)
+        size += len(line) + 1
+
+    if any(part.strip() for part in buf):
+        yield heading, start, "\n".join(buf)
+
+
+@dataclass
+class SearchResult:
+    path: str  # relative to the index base
+    heading: str
+    line: int
+    score: float
+    snippet: str = ""
+
+
+class SearchIndex:
+    """Incremental BM25 index over markdown passages, stored gzip-compressed."""
+
+    VERSION = 2
+
+    def __init__(self, path: Optional[Path], base: Path, sources: Sequence[str] = DEFAULT_SOURCES):
+        self.path = path
+        self.base = Path(base).resolve()
+        self.sources = list(sources)
+        # rel path -> [mtime_ns, size, [passage ids]]
+        self._files: Dict[str, List] = {}
+        # passage id -> [rel path, heading, line, length in terms]
+        self._passages: Dict[int, List] = {}
+        # Packed postings: term -> slot; data[offsets[slot]:offsets[slot + 1]] is
+        # [passage id, tf, passage id, tf, ...].
+        self._vocab: Dict[str, int] = {}
+        self._offsets = array("I", [0])
+        self._data = array("I")
+        # Postings added since the last pack, same layout.
+        self._delta: Dict[str, List[int]] = {}
+        # Passages removed from _passages but still present in postings.
+        self._dead = 0
+        self._next_id = 0
+        self._norms: Optional[Dict[int, float]] = None
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def load(cls, path: Path, base: Path, sources: Sequence[str] = DEFAULT_SOURCES) -> "SearchIndex":
+        index = cls(path, base, sources)
+        if not path.exists():
+            return index
+        try:
+            blob = gzip.decompress(path.read_bytes())
+            (header_len,) = struct.unpack_from("<I", blob)
+            header = json.loads(blob[4 : 4 + header_len])
+        except (OSError, ValueError, struct.error):
+            return index
+        if (
+            header.get("version") != cls.VERSION
+            or header.get("base") != str(index.base)
+            or header.get("sources") != index.sources
+        ):
+            return index
+
+        pos = 4 + header_len
+        vocab_len, offsets_len, data_len = header["sizes"]
+        vocab = blob[pos : pos + vocab_len].decode("utf-8").split("\n") if vocab_len else []
+        pos += vocab_len
+        offsets, data = array("I"), array("I")
+        offsets.frombytes(blob[pos : pos + offsets_len])
+        pos += offsets_len
+        data.frombytes(blob[pos : pos + data_len])
+        if header["byteorder"] != sys.byteorder:
+            offsets.byteswap()
+            data.byteswap()
+
+        index._vocab = dict(zip(vocab, range(len(vocab))))
+        index._offsets, index._data = offsets, data
+        index._files = header["files"]
+        index._passages = {p[0]: p[1:] for p in header["passages"]}
+        index._dead = header["dead"]
+        index._next_id = header["next_id"]
+        return index
+
+    @classmethod
+    def open(cls, path: Optional[Path] = None, base: Optional[Path] = None, *, update: bool = True) -> "SearchIndex":
+        """The default index (WIKI_ROOT or the repo root), updated and saved."""
+        script_dir = Path(__file__).resolve().parent
+        path = path or script_dir / "data" / "search_index.bin.gz"
+        base = base or Path(os.getenv("WIKI_ROOT") or script_dir.parent)
+        index = cls.load(path, base)
+        if update:
+            counts = index.update()
+            if counts["indexed"] or counts["removed"]:
+                index.save()
+        return index
+
+    def save(self, path: Optional[Path] = None) -> None:
+        path = path or self.path
+        if path is None:
+            raise ValueError("No path to save the search index to")
+        self._pack()
+        vocab_bytes = "\n".join(sorted(self._vocab, key=self._vocab.__getitem__)).encode("utf-8")
+        offsets, data = self._offsets, self._data
+
+        header = {
+            "version": self.VERSION,
+            "base": str(self.base),
+            "sources": self.sources,
+            "next_id": self._next_id,
+            "dead": self._dead,
+            "byteorder": sys.byteorder,
+            "sizes": [len(vocab_bytes), len(offsets) * offsets.itemsize, len(data) * data.itemsize],
+            "files": self._files,
+            "passages": [[pid, *meta] for pid, meta in self._passages.items()],
+        }
+        header_bytes = json.dumps(header, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        blob = b"".join(
+            [struct.pack("<I", len(header_bytes)), header_bytes, vocab_bytes, offsets.tobytes(), data.tobytes()]
+        )
+        atomic_write_bytes(path, gzip.compress(blob, compresslevel=GZIP_LEVEL))
+
+    def _pack(self) -> None:
+        """Merge the delta into the packed arrays; drop dead passages once they
+        make up more than COMPACT_RATIO of the index."""
+        compact = self._dead > COMPACT_RATIO * (len(self._passages) + self._dead)
+        if not self._delta and not compact:
+            return
+
+        live = self._passages
+        offsets, data = self._offsets, self._data
+        vocab: Dict[str, int] = {}
+        new_offsets, new_data = array("I", [0]), array("I")
+        for term in list(self._vocab) + [t for t in self._delta if t not in self._vocab]:
+            i = self._vocab.get(term)
+            plist: Sequence[int] = data[offsets[i] : offsets[i + 1]] if i is not None else ()
+            extra = self._delta.get(term)
+            if compact:
+                merged = list(plist) + (extra or [])
+                plist = [x for j in range(0, len(merged), 2) if merged[j] in live for x in merged[j : j + 2]]
+                extra = None
+            if not plist and not extra:
+                continue
+            vocab[term] = len(vocab)
+            new_data.extend(plist)
+            if extra:
+                new_data.extend(extra)
+            new_offsets.append(len(new_data))
+
+        self._vocab, self._offsets, self._data = vocab, new_offsets, new_data
+        self._delta = {}
+        if compact:
+            self._dead = 0
+
+    def _plist(self, term: str) -> Sequence[int]:
+        i = self._vocab.get(term)
+        packed = self._data[self._offsets[i] : self._offsets[i + 1]] if i is not None else ()
+        extra = self._delta.get(term)
+        if extra:
+            return list(packed) + extra if packed else extra
+        return packed
+
+    # ------------------------------------------------------------------
+    # Indexing
+    # ------------------------------------------------------------------
+
+    def _scan(self) -> Dict[str, os.stat_result]:
+        found: Dict[str, os.stat_result] = {}
+        for source in self.sources:
+            top = self.base / source
+            for dirpath, dirnames, filenames in os.walk(top):
+                dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+                for name in filenames:
+                    if not name.endswith(".md") or name.startswith("."):
+                        continue
+                    full = os.path.join(dirpath, name)
+                    try:
+                        found[os.path.relpath(full, self.base).replace(os.sep, "/")] = os.stat(full)
+                    except OSError:
+                        continue
+        return found
+
+    def update(self) -> Dict[str, int]:
+        """Re-index new/changed files and forget removed ones."""
+        found = self._scan()
+        changed = [
+            rel
+            for rel, st in found.items()
+            if rel not in self._files or self._files[rel][:2] != [st.st_mtime_ns, st.st_size]
+        ]
+        removed = [rel for rel in self._files if rel not in found]
+
+        # Old passages become tombstones: gone from _passages, so queries skip
+        # them; their postings are purged by a later compacting save.
+        for rel in removed + changed:
+            entry = self._files.pop(rel, None)
+            for pid in entry[2] if entry else ():
+                if self._passages.pop(pid, None) is not None:
+                    self._dead += 1
+
+        for rel in changed:
+            st = found[rel]
+            try:
+                text = (self.base / rel).read_text(encoding="utf-8", errors="replace")
+            except OSError:
+                continue
+            self._files[rel] = [st.st_mtime_ns, st.st_size, self._add_document(rel, text)]
+
+        if changed or removed:
+            self._norms = None
+        return {"indexed": len(changed), "removed": len(removed), "files": len(self._files)}
+
+    def _split(self, rel: str, text: str) -> Iterator[Tuple[str, int, str]]:
+        if rel.split("/", 1)[0] in CORPUS_SOURCES:
+            book, first_page = parse_source_name(Path(rel))
+            for chunk in chunk_lines(text.split("\n"), book=book, source=rel, first_page=first_page):
+                heading = f"{chunk.heading} (p. {chunk.page})" if chunk.page else chunk.heading
+                yield heading, chunk.line, chunk.text
+        else:
+            yield from split_passages(unicodedata.normalize("NFC", text))
+
+    def _add_document(self, rel: str, text: str) -> List[int]:
+        pids = []
+        for heading, line, body in self._split(rel, text):
+            tokens = tokenize(body)
+            if heading:
+                tokens += tokenize(heading)
+            counts = Counter(terms(tokens))
+            if not counts:
+                continue
+            pid = self._next_id
+            self._next_id += 1
+            pids.append(pid)
+            self._passages[pid] = [rel, heading, line, sum(counts.values())]
+            for term, tf in counts.items():
+                plist = self._delta.get(term)
+                if plist is None:
+                    self._delta[term] = [pid, tf]
+                else:
+                    plist += (pid, tf)
+        return pids
+
+    # ------------------------------------------------------------------
+    # Querying
+    # ------------------------------------------------------------------
+
+    def _length_norms(self) -> Dict[int, float]:
+        if self._norms is None:
+            total = sum(meta[3] for meta in self._passages.values())
+            avgdl = total / len(self._passages) if self._passages else 1.0
+            self._norms = {pid: K1 * (1 - B + B * meta[3] / avgdl) for pid, meta in self._passages.items()}
+        return self._norms
+
+    def search(self, query: str, limit: int = 10, path_prefix: Optional[str] = None, snippets: bool = True) -> List[SearchResult]:
+        """Top passages for `query` by BM25; `path_prefix` restricts to a folder."""
+        query_terms = Counter(terms(tokenize(unicodedata.normalize("NFC", query))))
+        if not query_terms or not self._passages:
+            return []
+
+        norms = self._length_norms()
+        n_docs = len(self._passages)
+        scores: Dict[int, float] = defaultdict(float)
+        for term, qtf in query_terms.items():
+            plist = self._plist(term)
+            if not plist:
+                continue
+            # df counts tombstoned passages until the next compaction; close enough.
+            df = len(plist) // 2
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5)) * qtf
+            for i in range(0, len(plist), 2):
+                norm = norms.get(plist[i])
+                if norm is not None:
+                    tf = plist[i + 1]
+                    scores[plist[i]] += idf * tf * (K1 + 1) / (tf + norm)
+
+        candidates: Iterable[Tuple[int, float]] = scores.items()
+        if path_prefix:
+            prefix = path_prefix.replace(os.sep, "/").removeprefix("./")
+            candidates = ((pid, s) for pid, s in candidates if self._passages[pid][0].startswith(prefix))
+        top = heapq.nlargest(limit, candidates, key=lambda x: x[1])
+
+        results = []
+        for pid, score in top:
+            rel, heading, line, _ = self._passages[pid]
+            results.append(SearchResult(rel, heading, line, round(score, 4)))
+        if snippets:
+            self._fill_snippets(results, set(tokenize(query)))
+        return results
+
+    def _fill_snippets(self, results: List[SearchResult], words: set) -> None:
+        """Best-matching line of each hit's passage, read back from the file."""
+        cache: Dict[str, List[str]] = {}
+        for hit in results:
+            lines = cache.get(hit.path)
+            if lines is None:
+                try:
+                    text = (self.base / hit.path).read_text(encoding="utf-8", errors="replace")
+                except OSError:
+                    text = ""
+                lines = cache[hit.path] = unicodedata.normalize("NFC", text).split("\n")
+            window = lines[hit.line - 1 : hit.line - 1 + 60]
+            best = max(window, key=lambda l: len(words.intersection(tokenize(l))), default="")
+            hit.snippet = " ".join(best.split())[:SNIPPET_CHARS]
+
+    def passage(self, hit: SearchResult) -> str:
+        """Full text of a hit's passage, re-split from the current file."""
+        try:
+            text = (self.base / hit.path).read_text(encoding="utf-8", errors="replace")
+        except OSError:
+            return ""
+        for _, line, body in self._split(hit.path, text):
+            if line == hit.line:
+                return body
+        return ""
+
+    def fingerprint(self) -> str:
+        """Digest of the indexed file states; changes whenever `update()` re-indexes."""
+        state = json.dumps(sorted((rel, e[0], e[1]) for rel, e in self._files.items()))
+        return hashlib.blake2b(state.encode("utf-8"), digest_size=8).hexdigest()
+
+    def stats(self) -> Dict[str, int]:
+        n_terms = len(self._vocab) + sum(1 for t in self._delta if t not in self._vocab)
+        return {"files": len(self._files), "passages": len(self._passages), "terms": n_terms}
+
+
+def main() -> None:
+    script_dir = Path(__file__).resolve().parent
+    parser = argparse.ArgumentParser(description="Full-text search over the wiki and OCR notes")
+    parser.add_argument("query", nargs="*", help="Search words (accents optional)")
+    parser.add_argument("-n", "--limit", type=int, default=10)
+    parser.add_argument("--path", help="Only results under this folder, e.g. wiki/projects")
+    parser.add_argument("--root", default=os.getenv("WIKI_ROOT") or str(script_dir.parent))
+    parser.add_argument("--index", default=str(script_dir / "data" / "search_index.bin.gz"))
+    parser.add_argument("--no-update", action="store_true", help="Query the saved index as is")
+    parser.add_argument("--stats", action="store_true", help="Print index statistics")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = SearchIndex.open(Path(args.index), Path(args.root), update=not args.no_update)
+    loaded = time.perf_counter()
+
+    if args.stats or not args.query:
+        s = index.stats()
+        size = Path(args.index).stat().st_size if Path(args.index).exists() else 0
+        print(f"📚 {s['files']} files, {s['passages']} passages, {s['terms']} terms ({size / 1024:.0f} KB on disk)")
+        print(f"⏱️  Load + update: {(loaded - start) * 1000:.0f} ms")
+        if not args.query:
+            return
+
+    query = " ".join(args.query)
+    hits = index.search(query, limit=args.limit, path_prefix=args.path)
+    elapsed = (time.perf_counter() - loaded) * 1000
+    if not hits:
+        print(f"🔍 No results for {query!r}")
+        return
+    print(f"🔍 {len(hits)} results for {query!r} ({elapsed:.1f} ms)")
+    for hit in hits:
+        where = f"{hit.path}:{hit.line}"
+        print(f"\n{hit.score:7.2f}  {where}" + (f"  § {hit.heading}" if hit.heading else ""))
+        if hit.snippet:
+            print(f"         {hit.snippet}")
+
+
+if __name__ == "__main__":
+    main()